@@ -0,0 +1,18 @@
+# ============================================================================
+# Group Allocator - allocates students to balanced groups
+#
+# Headless version of solve_script.py: read a roster, solve the ENGGEN403
+# model and write the results without SolverStudio or Excel.
+# ============================================================================
+from group_allocator.anytime import Incumbents
+from group_allocator.decompose import decompose
+from group_allocator.heuristics import snake_draft
+from group_allocator.incremental import reallocate, update_roster
+from group_allocator.model import DEFAULT_WEIGHTS, Model, Targets
+from group_allocator.pairing import Pairing, PairedModel
+from group_allocator.parallel import multi_start
+from group_allocator.report import Summary, write_results
+from group_allocator.roster import Roster, read_roster
+from group_allocator.score import Scorer
+from group_allocator.search import LocalSearch
+from group_allocator.stream import StreamModel
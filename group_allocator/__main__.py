@@ -0,0 +1,7 @@
+import sys
+
+from group_allocator.cli import main
+
+# The guard keeps the process pool of --starts from running main again
+if __name__ == '__main__':
+    sys.exit(main())
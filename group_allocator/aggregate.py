@@ -0,0 +1,170 @@
+# ============================================================================
+# Group Allocator - aggregated model over student profiles
+#
+# Students with the same gender, specialisation, ethnicity and outstanding
+# status and a similar GPA are interchangeable to the model, so instead of a
+# binary x[(s, g)] per student and group the aggregated model has an integer
+# y[(c, g)]: how many students of class c go to group g. The students of
+# each class are then dealt to the groups it was split between.
+# ============================================================================
+import heapq
+from math import floor
+
+import pulp
+
+from group_allocator.model import ASSIGNMENT_TOLERANCE, OUTSTANDING_GPA, \
+    Model
+
+# Width of the GPA buckets that split the students of a profile into classes
+GPA_BUCKET = 1.0
+
+
+def profile_classes(roster, gpa_bucket=GPA_BUCKET):
+    """Split the students into classes of the same profile and GPA bucket.
+
+    The profile is gender, specialisation, ethnicity, any further attribute
+    (ignoring case) and whether the student is outstanding. With no
+    ``gpa_bucket`` each profile is one class. Returns the students of each
+    class by decreasing GPA.
+    """
+    classes = {}
+    for s in roster.students:
+        gpa = roster.gpa[s]
+        key = (gpa >= OUTSTANDING_GPA, roster.gender[s].lower(),
+               roster.specialisation[s].lower(), roster.ethnicity[s].lower()) \
+            + tuple(roster.extra[name][s].lower()
+                    for name in sorted(roster.extra)) \
+            + (int(floor(gpa / gpa_bucket)) if gpa_bucket else 0,)
+        classes.setdefault(key, []).append(s)
+    return [sorted(classes[key], key=lambda s: -roster.gpa[s])
+            for key in sorted(classes)]
+
+
+class AggregateModel(Model):
+    """The ENGGEN403 model over classes of students (see ``profile_classes``).
+
+    The category counts of a group are exact, while its GPA mean and
+    variance are taken from the class means, so are approximate within the
+    width of a GPA bucket. ``assignment`` deals the students of each class
+    so as to keep the group GPAs level. There is no symmetry breaking.
+    """
+
+    def __init__(self, roster, number_groups, weights=None,
+                 gpa_bucket=GPA_BUCKET):
+        self.classes = profile_classes(roster, gpa_bucket)
+        self.student_class = [None] * roster.number_students
+        for c, members in enumerate(self.classes):
+            for s in members:
+                self.student_class[s] = c
+        self._count_classes = {}
+        Model.__init__(self, roster, number_groups, weights)
+
+    def _add_assignment(self):
+        roster = self.roster
+        t = self.targets
+        problem = self.problem
+        classes = range(len(self.classes))
+        groups = t.groups
+
+        # y = number of students of class c assigned to group g
+        self.y = y = pulp.LpVariable.dicts(
+            'y', [(c, g) for c in classes for g in groups], 0, None,
+            pulp.LpInteger)
+        for (c, g), variable in y.items():
+            variable.upBound = min(len(self.classes[c]), t.size(g))
+
+        # Every student of a class is assigned to a group
+        for c in classes:
+            problem += pulp.lpSum([y[(c, g)] for g in groups]) == \
+                len(self.classes[c]), 'class_total_%d' % c
+
+        self.class_gpa = gpa = [
+            sum(roster.gpa[s] for s in members) / len(members)
+            for members in self.classes]
+        self.class_deviation = deviation = [
+            sum(t.gpa_deviation[s] for s in members) / len(members)
+            for members in self.classes]
+        for g in groups:
+            problem += pulp.lpSum([y[(c, g)] for c in classes]) == \
+                t.size(g), 'size_g%d' % g
+            self._add_gpa_bounds(
+                g, pulp.lpSum([gpa[c] * y[(c, g)] for c in classes]),
+                pulp.lpSum([deviation[c] * y[(c, g)] for c in classes]))
+
+    def _count(self, students, g):
+        # Every class is all in or all out of a category, so the students
+        # of a category are the whole of some classes
+        key = id(students)
+        if key not in self._count_classes:
+            self._count_classes[key] = (students, sorted(set(
+                self.student_class[s] for s in students)))
+        return pulp.lpSum([self.y[(c, g)]
+                           for c in self._count_classes[key][1]])
+
+    def set_start(self, groups):
+        """As ``Model.set_start``, with the GPA bounds from class means."""
+        Model.set_start(self, groups)
+        t = self.targets
+        gpa = dict((g, 0.0) for g in t.groups)
+        deviation = dict((g, 0.0) for g in t.groups)
+        for s, g in enumerate(groups):
+            gpa[g] += self.class_gpa[self.student_class[s]] / t.size(g)
+            deviation[g] += \
+                self.class_deviation[self.student_class[s]] / t.size(g)
+        self.gpa_min.setInitialValue(min(gpa.values()))
+        self.gpa_max.setInitialValue(max(gpa.values()))
+        self.gpa_variance_min.setInitialValue(min(deviation.values()))
+        self.gpa_variance_max.setInitialValue(max(deviation.values()))
+
+    def _set_assignment_start(self, groups):
+        counts = {}
+        for s, g in enumerate(groups):
+            key = (self.student_class[s], g)
+            counts[key] = counts.get(key, 0) + 1
+        for key, variable in self.y.items():
+            variable.setInitialValue(counts.get(key, 0))
+
+    def assignment(self, tolerance=ASSIGNMENT_TOLERANCE):
+        """Group of each student, indexed by student.
+
+        The students of each class are dealt by decreasing GPA, each to
+        the group (among those the class is split between) whose GPA total
+        is furthest below the mean for the students it has so far. The
+        students of a class with a count that is not within ``tolerance``
+        of a whole number, or left over, are listed in ``unclear``.
+        """
+        roster = self.roster
+        t = self.targets
+        groups = [None] * t.number_students
+        gpa_total = dict((g, 0.0) for g in t.groups)
+        filled = dict((g, 0) for g in t.groups)
+        self.unclear = []
+        for c, members in enumerate(self.classes):
+            quota = {}
+            clear = True
+            for g in t.groups:
+                value = self.y[(c, g)].varValue
+                if value is None or abs(value - round(value)) > tolerance:
+                    clear = False
+                if value is not None and value > 0.5:
+                    quota[g] = int(round(value))
+            if not clear:
+                self.unclear.extend(members)
+            heap = [(gpa_total[g] - t.gpa_mean * filled[g], g)
+                    for g in quota]
+            heapq.heapify(heap)
+            for s in members:
+                if not heap:
+                    break
+                g = heapq.heappop(heap)[1]
+                groups[s] = g
+                gpa_total[g] += roster.gpa[s]
+                filled[g] += 1
+                quota[g] -= 1
+                if quota[g]:
+                    heapq.heappush(
+                        heap, (gpa_total[g] - t.gpa_mean * filled[g], g))
+        unclear = set(self.unclear)
+        self.unclear.extend(s for s in roster.students
+                            if groups[s] is None and s not in unclear)
+        return groups
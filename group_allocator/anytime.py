@@ -0,0 +1,106 @@
+# ============================================================================
+# Group Allocator - anytime results
+#
+# Keeps the best allocation of a running solve or search on disk, so that
+# a run that is killed or hits its time limit has already written its
+# latest incumbent, and logs every incumbent with its time so the objective
+# can be watched as it improves:
+#
+#   tail -f results/incumbents.csv
+# ============================================================================
+import json
+import os
+import threading
+import time
+
+from group_allocator.report import allocation_table, write_csv
+from group_allocator.score import Scorer
+
+# Every incumbent as it arrives: seconds, objective, source and whether its
+# allocation is known
+INCUMBENT_LOG = 'incumbents.csv'
+
+# The best allocation so far and its statistics
+INCUMBENT_ALLOCATION = 'incumbent.csv'
+INCUMBENT_REPORT = 'incumbent.json'
+
+# Seconds between writes of the best allocation
+INTERVAL = 5.0
+
+
+class Incumbents(object):
+    """The best allocation of a run, written to ``directory``.
+
+    ``found`` takes each incumbent, from the solver thread or the search,
+    with its allocation if known (CBC only reports the objective of its
+    incumbents until it finishes or is interrupted). Each is appended to
+    INCUMBENT_LOG straight away, marked by whether its allocation is known;
+    only those can be written. The best allocation is written at most every
+    ``interval`` seconds, and by ``close``, to INCUMBENT_ALLOCATION laid
+    out like allocation.csv with its objective, GPA spreads and slack in
+    INCUMBENT_REPORT. Each file is replaced whole, so a reader never sees
+    half of one.
+    """
+
+    def __init__(self, directory, roster, number_groups, weights=None,
+                 interval=INTERVAL):
+        self.directory = directory
+        self.roster = roster
+        self.scorer = Scorer(roster, number_groups, weights)
+        self.interval = interval
+        self.began = time.time()
+        self.written = None
+        self.objective = None
+        self.groups = None
+        self.source = None
+        self.pending = False
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._log = open(os.path.join(directory, INCUMBENT_LOG), 'w')
+        self._log.write('seconds,objective,source,allocation\n')
+        self._log.flush()
+
+    def found(self, objective, groups=None, source='solver'):
+        """Record an incumbent; ``groups`` is copied if it is written."""
+        with self._lock:
+            seconds = time.time() - self.began
+            self._log.write('%.3f,%.6f,%s,%s\n' % (
+                seconds, objective, source, 'no' if groups is None else 'yes'))
+            self._log.flush()
+            if groups is None or (self.objective is not None and
+                                  objective >= self.objective):
+                return
+            self.objective = objective
+            self.source = source
+            self.groups = list(groups)
+            self.pending = True
+            if self.written is None or \
+                    time.time() - self.written >= self.interval:
+                self._write()
+
+    def close(self):
+        """Write the best allocation if it changed since the last write."""
+        with self._lock:
+            if self.pending:
+                self._write()
+            self._log.close()
+
+    def _write(self):
+        score = self.scorer.score(self.groups)
+        gpa_spread, variance_spread = score.spreads()
+        report = {'seconds': round(time.time() - self.began, 3),
+                  'source': self.source, 'objective': score.objective,
+                  'gpa_spread': gpa_spread,
+                  'variance_spread': variance_spread,
+                  'relaxation': dict(score.relaxation)}
+        path = os.path.join(self.directory, INCUMBENT_ALLOCATION)
+        write_csv(path + '.tmp', allocation_table(self.roster, self.groups))
+        os.replace(path + '.tmp', path)
+        path = os.path.join(self.directory, INCUMBENT_REPORT)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(path + '.tmp', path)
+        self.written = time.time()
+        self.pending = False
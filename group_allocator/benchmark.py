@@ -0,0 +1,294 @@
+# ============================================================================
+# Group Allocator - benchmarks
+#
+# Solves synthetic cohorts of 100 to 20,000 students with each solving mode
+# and MIP solver and records build and solve time, objective, gap, GPA
+# spread, slack and peak memory as JSON, so versions, and the solvers for
+# each size of cohort, can be compared on the same cases.
+#
+#   python -m group_allocator.benchmark --output bench.json
+#   python -m group_allocator.benchmark --cases 500x50 --compare bench.json
+#   python -m group_allocator.benchmark --solvers cbc,highs --threads 4
+# ============================================================================
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+from group_allocator.aggregate import AggregateModel
+from group_allocator.decompose import decompose
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import Model, Targets
+from group_allocator.runreport import peak_memory
+from group_allocator.score import Scorer
+from group_allocator.search import LocalSearch
+from group_allocator.solvers import DEFAULT_SOLVER, SOLVERS, \
+    available_solvers
+from group_allocator.stream import StreamModel
+from group_allocator.synthetic import synthetic_roster
+
+# (students, groups) of the default sweep
+CASES = ((100, 10), (500, 50), (1000, 100), (2000, 200), (5000, 500),
+         (10000, 1000), (20000, 2000))
+
+MODES = ('mip', 'aggregate', 'stream', 'search', 'decompose')
+
+# Modes that solve with a MIP solver, run once for each solver
+MIP_MODES = ('mip', 'aggregate', 'stream', 'decompose')
+
+# Largest cohorts solved by each mode; beyond these the model does not fit
+# in memory or time and the case is recorded as skipped
+MAX_STUDENTS = {'mip': 1000, 'aggregate': 5000, 'stream': 2000}
+
+
+def run_case(number_students, number_groups, mode, time_limit=30.0,
+             seed=0, block_time=2.0, solver=DEFAULT_SOLVER, threads=None):
+    """Solve one synthetic cohort with ``mode`` and return its record.
+
+    The MIP_MODES solve with ``solver`` on ``threads`` threads.
+    """
+    if mode not in MIP_MODES:
+        solver = threads = None
+    record = {'students': number_students, 'groups': number_groups,
+              'mode': mode, 'solver': solver, 'threads': threads,
+              'seed': seed, 'time_limit': time_limit,
+              'build_seconds': None, 'solve_seconds': None, 'status': None,
+              'objective': None, 'gap': None, 'gpa_spread': None,
+              'variance_spread': None, 'slack': None}
+    if number_students > MAX_STUDENTS.get(mode, number_students) or \
+            (mode == 'stream' and solver != 'cbc'):
+        record['status'] = 'Skipped'
+        return record
+    roster = synthetic_roster(number_students, seed=seed)
+    targets = Targets(roster, number_groups)
+    began = time.time()
+    if mode in ('mip', 'aggregate', 'stream'):
+        if mode == 'aggregate':
+            model = AggregateModel(roster, number_groups)
+        elif mode == 'stream':
+            model = StreamModel(roster, number_groups)
+        else:
+            model = Model(roster, number_groups)
+        record['build_seconds'] = time.time() - began
+        record['model'] = model.size()
+        directory = tempfile.mkdtemp()
+        try:
+            began = time.time()
+            record['status'] = model.solve(
+                time_limit, log_path=os.path.join(directory, 'solver.log'),
+                solver=solver, threads=threads)
+            record['solve_seconds'] = time.time() - began
+        finally:
+            shutil.rmtree(directory)
+        record['gap'] = model.solver_log['gap']
+        groups = model.assignment()
+    elif mode == 'search':
+        search = LocalSearch(roster, targets, snake_draft(roster, targets),
+                             seed=seed)
+        record['build_seconds'] = time.time() - began
+        began = time.time()
+        groups = search.run(time_limit)
+        record['solve_seconds'] = time.time() - began
+        record['status'] = 'Searched'
+    else:
+        groups, _ = decompose(roster, number_groups, time_limit=block_time,
+                              repair_time=time_limit, seed=seed,
+                              stopping={'solver': solver, 'threads': threads})
+        record['solve_seconds'] = time.time() - began
+        record['status'] = 'Decomposed'
+    if None not in groups:
+        best = Scorer(roster, number_groups).score(groups)
+        record['objective'] = best.objective
+        record['gpa_spread'], record['variance_spread'] = best.spreads()
+        record['slack'] = sum(total for _, total in best.relaxation)
+    record['peak_memory_mb'], record['solver_peak_memory_mb'] = \
+        peak_memory()
+    return record
+
+
+def _run_case(arguments, connection):
+    try:
+        connection.send((run_case(*arguments), None))
+    except Exception as error:
+        connection.send((None, error))
+    finally:
+        connection.close()
+
+
+def run_case_process(arguments):
+    """``run_case`` of ``arguments`` in a fresh process, so its peak memory
+    is its own. The process is not a daemon, unlike those of a
+    multiprocessing.Pool, so decompose can start a pool of its own."""
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target=_run_case,
+                                      args=(arguments, sender))
+    process.start()
+    sender.close()
+    try:
+        record, error = receiver.recv()
+    except EOFError:
+        raise RuntimeError('Benchmark case %s stopped without a result'
+                           % (arguments[:3],))
+    finally:
+        receiver.close()
+        process.join()
+    if error is not None:
+        raise error
+    return record
+
+
+def run_benchmark(cases=CASES, modes=('mip', 'search'), time_limit=30.0,
+                  seed=0, block_time=2.0, label=None,
+                  solvers=(DEFAULT_SOLVER,), threads=None):
+    """Run every case with every mode, and every solver of the MIP_MODES,
+    each in a fresh process so its peak memory is its own, and return the
+    results with details of the run."""
+    results = []
+    for number_students, number_groups in cases:
+        for mode in modes:
+            for solver in solvers if mode in MIP_MODES else (None,):
+                record = run_case_process((
+                    number_students, number_groups, mode, time_limit, seed,
+                    block_time, solver, threads))
+                print(format_record(record))
+                results.append(record)
+    return {'label': label or _version(), 'created':
+            datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': multiprocessing.cpu_count(), 'results': results}
+
+
+def _version():
+    """Commit of the working tree, if it is a git checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unlabelled'
+
+
+# ============================================================================
+# Reporting
+
+def _number(value, form='%.2f'):
+    return '-' if value is None else form % value
+
+
+def _method(record):
+    """Mode of a record, with the solver of the MIP_MODES (CBC in runs
+    from before the solver was recorded)."""
+    if record['mode'] not in MIP_MODES:
+        return record['mode']
+    return '%s/%s' % (record['mode'], record.get('solver') or 'cbc')
+
+
+def format_record(record):
+    return '%6d %5d  %-16s %-11s build %7s solve %7s  objective %12s ' \
+        'gap %6s  GPA spread %5s  slack %5s' % (
+            record['students'], record['groups'], _method(record),
+            record['status'], _number(record['build_seconds'], '%.1fs'),
+            _number(record['solve_seconds'], '%.1fs'),
+            _number(record['objective']), _number(record['gap']),
+            _number(record['gpa_spread']), _number(record['slack'], '%.0f'))
+
+
+def compare(base, new):
+    """Lines comparing the cases two benchmark runs have in common."""
+    lines = ['%-20s %-16s %25s %25s' % (
+        'case', 'mode', 'objective %s -> %s' % (base['label'], new['label']),
+        'seconds %s -> %s' % (base['label'], new['label']))]
+    old = dict(((r['students'], r['groups'], _method(r)), r)
+               for r in base['results'])
+    for record in new['results']:
+        key = (record['students'], record['groups'], _method(record))
+        if key not in old:
+            continue
+        before = old[key]
+        seconds = [None if r['solve_seconds'] is None else
+                   (r['build_seconds'] or 0) + r['solve_seconds']
+                   for r in (before, record)]
+        lines.append('%-20s %-16s %25s %25s' % (
+            '%d x %d' % key[:2], key[2],
+            '%s -> %s' % (_number(before['objective']),
+                          _number(record['objective'])),
+            '%s -> %s' % (_number(seconds[0], '%.1f'),
+                          _number(seconds[1], '%.1f'))))
+    return lines
+
+
+def parse_cases(text):
+    """Cases written as STUDENTSxGROUPS separated by commas."""
+    cases = []
+    for case in text.split(','):
+        number_students, number_groups = case.lower().split('x')
+        cases.append((int(number_students), int(number_groups)))
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='group_allocator.benchmark',
+        description='Benchmark the solving modes on synthetic cohorts.')
+    parser.add_argument('--cases', type=parse_cases, default=CASES,
+                        help='STUDENTSxGROUPS,... (default %s)' % ','.join(
+                            '%dx%d' % case for case in CASES))
+    parser.add_argument('--modes', default='mip,search',
+                        help='comma separated modes from %s (default '
+                             'mip,search)' % ', '.join(MODES))
+    parser.add_argument('-t', '--time-limit', type=float, default=30.0,
+                        help='seconds to solve or search each case')
+    parser.add_argument('--solvers', default=DEFAULT_SOLVER,
+                        help='comma separated MIP solvers from %s for the '
+                             'modes %s (default %s)' % (
+                                 ', '.join(SOLVERS), ', '.join(MIP_MODES),
+                                 DEFAULT_SOLVER))
+    parser.add_argument('--threads', type=int, default=None,
+                        help='threads of each MIP solve (default the '
+                             "solver's own)")
+    parser.add_argument('--block-time', type=float, default=2.0,
+                        help='seconds for each block of decompose')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the synthetic cohorts and searches')
+    parser.add_argument('--label', default=None,
+                        help='name of this run (default the git commit)')
+    parser.add_argument('-o', '--output', default='benchmark.json',
+                        help='JSON file for the results')
+    parser.add_argument('--compare', default=None, metavar='JSON',
+                        help='earlier results to compare with')
+    args = parser.parse_args(argv)
+    modes = args.modes.split(',')
+    for mode in modes:
+        if mode not in MODES:
+            parser.error('unknown mode %s' % mode)
+    solvers = args.solvers.split(',')
+    for solver in solvers:
+        if solver not in SOLVERS:
+            parser.error('unknown solver %s' % solver)
+        if solver not in available_solvers():
+            parser.error('%s is not installed' % solver)
+
+    results = run_benchmark(args.cases, modes, args.time_limit, args.seed,
+                            args.block_time, args.label, solvers,
+                            args.threads)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print('Wrote %s' % args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        print('\n'.join(compare(base, results)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
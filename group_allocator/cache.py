@@ -0,0 +1,148 @@
+# ============================================================================
+# Group Allocator - model cache
+#
+# Tuning the weighting factors means solving the same cohort over and over,
+# and for a large cohort building the model takes as long as a short solve.
+# Built models are pickled to a cache directory, keyed by a hash of the
+# roster, the number of groups and the model options. The weights are only
+# in the objective, so a cached model takes new weights by rebuilding its
+# objective, and starts from the allocation of the last solve of the same
+# model. The least recently used models are evicted beyond a size limit.
+# ============================================================================
+import hashlib
+import json
+import os
+import pickle
+
+import pulp
+
+from group_allocator.aggregate import GPA_BUCKET, AggregateModel
+from group_allocator.model import Model
+
+CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache',
+                               'group_allocator')
+
+# Largest total size of the cache in bytes
+CACHE_SIZE = 512 * 1024 * 1024
+
+# Changed whenever the model changes, so older models are not used
+CACHE_VERSION = 3
+
+
+def model_key(roster, number_groups, symmetry_breaking=False,
+              aggregate=False, gpa_bucket=GPA_BUCKET):
+    """Hash of everything a model is built from except the weights."""
+    digest = hashlib.sha256()
+    digest.update(repr((CACHE_VERSION, pulp.__version__, int(number_groups),
+                        bool(symmetry_breaking), bool(aggregate),
+                        float(gpa_bucket) if aggregate else None)).encode())
+    for column in (roster.ids, roster.gpa, roster.gender,
+                   roster.specialisation, roster.ethnicity):
+        digest.update(repr(list(column)).encode())
+    for name in sorted(roster.extra):
+        digest.update(repr((name, list(roster.extra[name]))).encode())
+    return digest.hexdigest()
+
+
+class ModelCache(object):
+    """Built models in ``directory``, at most ``max_bytes`` of them.
+
+    Each entry is the pickled model as built (KEY.model) and the last
+    allocation solved with it (KEY.start.json).
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def load(self, key):
+        """The cached model and last allocation of ``key``; None for
+        either that is not cached."""
+        path = self._path(key, '.model')
+        if not os.path.exists(path):
+            return None, None
+        try:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+        except Exception:
+            # Unreadable, e.g. written by an older version of the package
+            os.remove(path)
+            return None, None
+        # Most recently used, for eviction
+        os.utime(path, None)
+        groups = None
+        start = self._path(key, '.start.json')
+        if os.path.exists(start):
+            with open(start) as f:
+                groups = json.load(f)
+        return model, groups
+
+    def store(self, key, model):
+        """Cache ``model``, which must not have been solved."""
+        path = self._path(key, '.model')
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(model, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        self.evict(keep=key)
+
+    def store_start(self, key, groups):
+        """Keep ``groups`` as the start of the next solve of ``key``."""
+        path = self._path(key, '.start.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(list(groups), f)
+        os.replace(path + '.tmp', path)
+
+    def evict(self, keep=None):
+        """Remove the least recently used models, with their allocations,
+        until the cache is within ``max_bytes`` (``keep`` is never
+        removed)."""
+        entries = {}
+        for name in os.listdir(self.directory):
+            key = name.split('.', 1)[0]
+            path = os.path.join(self.directory, name)
+            size, used = entries.get(key, (0, 0))
+            entries[key] = (size + os.path.getsize(path),
+                            max(used, os.path.getmtime(path)
+                                if name.endswith('.model') else 0))
+        total = sum(size for size, _ in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for suffix in ('.model', '.start.json'):
+                if os.path.exists(self._path(key, suffix)):
+                    os.remove(self._path(key, suffix))
+            total -= entries[key][0]
+
+
+def cached_model(cache, roster, number_groups, weights=None,
+                 symmetry_breaking=False, aggregate=False,
+                 gpa_bucket=GPA_BUCKET):
+    """The model of ``roster`` with ``weights``, from ``cache`` if there.
+
+    A cached model gets the weights and, if one was stored, the last
+    allocation solved with it as its start; a new model is built and
+    cached. Returns the model, its key and whether it came from the cache.
+    """
+    key = model_key(roster, number_groups, symmetry_breaking, aggregate,
+                    gpa_bucket)
+    model, groups = cache.load(key)
+    if model is not None:
+        model.set_weights(weights)
+        if groups is not None:
+            model.set_start(groups)
+        return model, key, True
+    if aggregate:
+        model = AggregateModel(roster, number_groups, weights,
+                               gpa_bucket=gpa_bucket)
+    else:
+        model = Model(roster, number_groups, weights,
+                      symmetry_breaking=symmetry_breaking)
+    cache.store(key, model)
+    return model, key, False
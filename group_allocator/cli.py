@@ -0,0 +1,652 @@
+# ============================================================================
+# Group Allocator - command line entry point
+#
+#   python -m group_allocator students.csv --groups 60 --time-limit 300
+# ============================================================================
+import argparse
+import os
+import signal
+from contextlib import contextmanager
+
+from group_allocator.aggregate import GPA_BUCKET, AggregateModel
+from group_allocator.anytime import INTERVAL, Incumbents
+from group_allocator.cache import CACHE_DIRECTORY, CACHE_SIZE, \
+    ModelCache, cached_model
+from group_allocator.decompose import BLOCK_STUDENTS, BLOCK_TIME_LIMIT, \
+    decompose
+from group_allocator.heuristics import snake_draft
+from group_allocator.incremental import MOVE_PENALTY, NEIGHBOURHOOD, \
+    reallocate, update_roster
+from group_allocator.model import DEFAULT_WEIGHTS, SOLVER_SETTINGS, \
+    STOPPING_RULES, Model, Targets
+from group_allocator.pairing import Pairing, PairedModel, paired_draft, \
+    read_pairs
+from group_allocator.parallel import multi_start, spread
+from group_allocator.report import Summary, allocation_table, write_csv, \
+    write_results
+from group_allocator.roster import BUILT_IN_ATTRIBUTES, read_roster
+from group_allocator.runreport import SOLVER_LOG, RunReport
+from group_allocator.score import Scorer
+from group_allocator.search import LocalSearch
+from group_allocator.solvers import DEFAULT_SOLVER, SOLVERS, \
+    available_solvers
+from group_allocator.stream import StreamModel
+from group_allocator.sweep import SWEEP_ALLOCATION, SWEEP_RESULTS, \
+    pareto_front, sweep, sweep_table, weight_grid, weight_sample
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='group_allocator',
+        description='Allocate students to groups that balance GPA, gender, '
+                    'specialisation and ethnicity.')
+    parser.add_argument('roster',
+                        help='CSV or XLSX file with the columns of the '
+                             'Student_Data sheet')
+    parser.add_argument('-g', '--groups', type=int, required=True,
+                        help='number of groups')
+    parser.add_argument('-t', '--time-limit', type=float, default=None,
+                        help='solver time limit in seconds (default 10 for '
+                             'search, and for each block of decompose)')
+    parser.add_argument('--gap', type=float, default=None,
+                        help='stop once the objective is within this '
+                             'fraction of the best bound')
+    parser.add_argument('--gap-abs', type=float, default=None,
+                        help='stop once the objective is within this '
+                             'amount of the best bound')
+    parser.add_argument('--stall', type=float, default=None,
+                        metavar='SECONDS',
+                        help='stop after this many seconds without a '
+                             'better allocation')
+    parser.add_argument('--target', type=float, default=None,
+                        metavar='OBJECTIVE',
+                        help='stop at an allocation with this objective or '
+                             'less, e.g. 0.05 for a GPA spread below 0.05 '
+                             'with no slack')
+    parser.add_argument('--solver', choices=SOLVERS, default=DEFAULT_SOLVER,
+                        help='MIP solver (default %s; installed: %s)'
+                             % (DEFAULT_SOLVER,
+                                ', '.join(available_solvers())))
+    parser.add_argument('--threads', type=int, default=None,
+                        help='threads of each solve (default the '
+                             "solver's own)")
+    parser.add_argument('--anytime', type=float, nargs='?', const=INTERVAL,
+                        default=None, metavar='SECONDS',
+                        help='log each incumbent to incumbents.csv as it is '
+                             'found and keep the best allocation so far in '
+                             'incumbent.csv and incumbent.json, written at '
+                             'most every SECONDS (default %s)' % INTERVAL)
+    parser.add_argument('--mode', choices=('mip', 'search', 'decompose',
+                                           'incremental'),
+                        default='mip',
+                        help='solve the model with CBC (mip), swap '
+                             'students between groups from a snake draft '
+                             '(search), solve blocks of the cohort in '
+                             'parallel and repair across them (decompose), '
+                             'or update the allocation in the Allocated '
+                             'Group column for --add and --drop '
+                             '(incremental); search and decompose are for '
+                             'cohorts too large for the model')
+    parser.add_argument('--blocks', type=int, default=None,
+                        help='number of blocks of decompose (default one '
+                             'per %d students)' % BLOCK_STUDENTS)
+    parser.add_argument('--repair-time', type=float, default=10.0,
+                        help='seconds of search across the blocks of '
+                             'decompose (default 10)')
+    parser.add_argument('--add', default=None, metavar='FILE',
+                        help='roster of late enrolments to allocate in '
+                             'incremental mode')
+    parser.add_argument('--drop', default='', metavar='IDS',
+                        help='comma separated IDs of the students who '
+                             'withdrew, for incremental mode')
+    parser.add_argument('--neighbourhood', type=int, default=NEIGHBOURHOOD,
+                        help='groups re-allocated in incremental mode '
+                             'besides those that changed, from the ends of '
+                             'the GPA range (default %d)' % NEIGHBOURHOOD)
+    parser.add_argument('--move-penalty', type=float, default=MOVE_PENALTY,
+                        help='objective penalty for each student moved out '
+                             'of their group in incremental mode (default '
+                             '%s)' % MOVE_PENALTY)
+    parser.add_argument('--seed', type=int, default=None,
+                        help='random seed of the search')
+    parser.add_argument('--starts', type=int, default=1,
+                        help='solve this many times from different student '
+                             'orders and seeds, in parallel, and keep the '
+                             'best allocation')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='starts or blocks solved at once (default one per '
+                             'core)')
+    parser.add_argument('--balance', action='append', default=[],
+                        metavar='COLUMN[=WEIGHT]',
+                        help='also balance the categories of this roster '
+                             'column between groups, with this weighting '
+                             'factor (default 1; repeat for more columns)')
+    parser.add_argument('--together', default=None, metavar='FILE',
+                        help='CSV file of student IDs to keep in one group, '
+                             'a line per set of students (mip mode)')
+    parser.add_argument('--apart', default=None, metavar='FILE',
+                        help='CSV file of student IDs to keep in different '
+                             'groups, a line per set of students (mip mode)')
+    parser.add_argument('--sweep', action='append', default=[],
+                        metavar='FACTOR=VALUES',
+                        help='solve for every combination of these values '
+                             'of weighting factors, e.g. gpamean=1,5,10 '
+                             '(repeat for more factors), in parallel, and '
+                             'report the allocations that trade off GPA '
+                             'spread, variance spread and slack best')
+    parser.add_argument('--samples', type=int, default=None,
+                        help='with --sweep, solve this many random sets of '
+                             'weights between the least and greatest value '
+                             'of each factor instead of every combination')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='directory for the result files')
+    parser.add_argument('--symmetry-breaking', action='store_true',
+                        help='only allow the k-th student into the first k '
+                             'groups of each size')
+    parser.add_argument('--stream', action='store_true',
+                        help='write the model straight to an MPS file for '
+                             'CBC instead of building it in PuLP (much less '
+                             'memory and build time for large cohorts)')
+    parser.add_argument('--aggregate', action='store_true',
+                        help='solve for the number of students of each '
+                             'profile and GPA bucket in each group instead '
+                             'of for each student (much smaller model for '
+                             'large cohorts)')
+    parser.add_argument('--gpa-bucket', type=float, default=GPA_BUCKET,
+                        metavar='WIDTH',
+                        help='width of the GPA buckets of --aggregate, 0 '
+                             'for one bucket per profile (default %s)'
+                             % GPA_BUCKET)
+    parser.add_argument('--warm-start', action='store_true',
+                        help='start the solver from a stratified snake '
+                             'draft allocation')
+    parser.add_argument('--cache', action='store_true',
+                        help='keep built models in --cache-dir, so a run '
+                             'of the same roster and groups with other '
+                             'weights only rebuilds the objective and '
+                             'starts from the last allocation')
+    parser.add_argument('--cache-dir', default=CACHE_DIRECTORY,
+                        help='directory of the model cache (default %s)'
+                             % CACHE_DIRECTORY)
+    parser.add_argument('--cache-size', type=float,
+                        default=CACHE_SIZE / (1024 * 1024), metavar='MB',
+                        help='largest size of the model cache, beyond which '
+                             'the least recently used models are removed '
+                             '(default %d)' % (CACHE_SIZE / (1024 * 1024)))
+    parser.add_argument('--sheet', default='Student_Data',
+                        help='sheet holding the students of an XLSX roster')
+    parser.add_argument('--chart-only', action='store_true',
+                        help='only score and report the allocation in the '
+                             'Allocated Group column (do not run model)')
+    parser.add_argument('--excel', action='store_true',
+                        help='also write Summary_Results, the charts and '
+                             'the Student View workbook through Excel '
+                             '(XLSX roster on Windows with pywin32 only)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='hide the solver log')
+    weights = parser.add_argument_group('weighting factors')
+    for name in sorted(DEFAULT_WEIGHTS):
+        weights.add_argument('--factor-%s' % name, type=float,
+                             default=DEFAULT_WEIGHTS[name], metavar='W')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = RunReport(**vars(args))
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    weights = dict((name, getattr(args, 'factor_%s' % name))
+                   for name in DEFAULT_WEIGHTS)
+    balanced = []
+    for column in args.balance:
+        name, _, weight = column.partition('=')
+        name = name.strip().lower()
+        if name in BUILT_IN_ATTRIBUTES or name in DEFAULT_WEIGHTS:
+            print('--balance %s: %s is already balanced or a weighting '
+                  'factor' % (column, name))
+            return 1
+        balanced.append(name)
+        try:
+            weights[name] = float(weight) if weight else 1.0
+        except ValueError:
+            print('--balance %s: the weight must be a number' % column)
+            return 1
+    with report.phase('read roster'):
+        try:
+            roster = read_roster(args.roster, sheet=args.sheet,
+                                 attributes=balanced)
+        except ValueError as error:
+            print(error)
+            return 1
+    report.update(students=roster.number_students, groups=args.groups)
+    if not 0 < args.groups <= roster.number_students:
+        print('Cannot split %d students into %d groups'
+              % (roster.number_students, args.groups))
+        return 1
+    stopping = dict((name, getattr(args, name))
+                    for name in STOPPING_RULES + SOLVER_SETTINGS
+                    if getattr(args, name) is not None)
+
+    pairing = None
+    if args.together or args.apart:
+        with report.phase('read pairing'):
+            try:
+                pairing = Pairing(
+                    roster,
+                    read_pairs(args.together) if args.together else (),
+                    read_pairs(args.apart) if args.apart else ())
+            except ValueError as error:
+                print(error)
+                return 1
+        report.update(components=len(pairing.components),
+                      apart=len(pairing.apart))
+        if not args.chart_only and (
+                args.mode != 'mip' or args.starts > 1 or args.sweep or
+                args.aggregate or args.symmetry_breaking or args.cache or
+                args.stream):
+            print('--together and --apart are only for a single solve of '
+                  'the model (--mode mip, without --starts, --sweep, '
+                  '--aggregate, --symmetry-breaking, --cache or --stream)')
+            return 1
+    if args.sweep and not args.chart_only and (
+            args.mode not in ('mip', 'search') or args.starts > 1 or
+            args.aggregate or args.symmetry_breaking or args.cache or
+            args.stream or args.anytime is not None):
+        print('--sweep solves the model or searches once for each set of '
+              'weights (--mode mip or search, without --starts, '
+              '--aggregate, --symmetry-breaking, --cache, --stream or '
+              '--anytime)')
+        return 1
+    if args.stream and (args.aggregate or args.cache):
+        print('--stream writes the model for each student, so cannot be '
+              'used with --aggregate or --cache')
+        return 1
+    if args.stream and args.solver != 'cbc':
+        print('--stream writes the model for CBC, so cannot be used with '
+              '--solver %s' % args.solver)
+        return 1
+    if args.solver not in available_solvers():
+        print('%s is not installed (installed: %s)'
+              % (args.solver, ', '.join(available_solvers())))
+        return 1
+
+    if args.chart_only:
+        groups = roster.groups
+        best = evaluate(report, roster, args.groups, groups, weights)
+        print('Objective: %.2f' % best.objective)
+        print_solution(best.spreads(), best.relaxation)
+        if pairing is not None:
+            broken = pairing.violations(groups)
+            print('%d sets of students kept together or apart are broken'
+                  % len(broken))
+            report.update(broken=[[roster.ids[s] for s in students]
+                                  for students in broken])
+    elif args.mode == 'decompose':
+        print('Solving blocks . . .')
+        with report.phase('solve blocks and repair'):
+            groups, results = decompose(
+                roster, args.groups, weights, number_blocks=args.blocks,
+                time_limit=args.time_limit or BLOCK_TIME_LIMIT,
+                repair_time=args.repair_time,
+                aggregate=args.aggregate, gpa_bucket=args.gpa_bucket,
+                processes=args.processes, seed=args.seed,
+                stopping=stopping)
+        print_starts(results, 'Block')
+        report.update(blocks=starts_report(results))
+        best = evaluate(report, roster, args.groups, groups, weights)
+        print('\n')
+        print('Objective after repair: %.2f' % best.objective)
+        print_solution(best.spreads(), best.relaxation)
+    elif args.mode == 'incremental':
+        if None in roster.groups:
+            print('Every student of %s needs an Allocated Group for '
+                  'incremental mode' % args.roster)
+            return 1
+        dropped = [i.strip() for i in args.drop.split(',') if i.strip()]
+        with report.phase('read changes'):
+            added = None
+            dropped_groups = set(roster.groups[s] for s in roster.students
+                                 if roster.ids[s] in dropped)
+            published = roster
+            try:
+                if args.add:
+                    added = read_roster(args.add, sheet=args.sheet,
+                                        attributes=balanced)
+                roster = update_roster(roster, added, dropped)
+            except ValueError as error:
+                print(error)
+                return 1
+            outside = sorted(set(g for g in published.groups
+                                 if not 0 < g <= args.groups))
+            if outside:
+                print('Published groups %s are not among groups 1 to %d'
+                      % (', '.join(str(g) for g in outside), args.groups))
+                return 1
+        print('Re-allocating for %d added and %d dropped students . . .'
+              % (added.number_students if added else 0, len(dropped)))
+        with report.phase('solve model'):
+            groups, targets, freed, model = reallocate(
+                roster, args.groups, weights, dropped_groups,
+                neighbourhood=args.neighbourhood,
+                move_penalty=args.move_penalty,
+                time_limit=args.time_limit or 10.0, msg=not args.quiet,
+                **stopping)
+        moved = [s for s in roster.students if roster.groups[s] is not None
+                 and groups[s] != roster.groups[s]]
+        print('Re-allocated groups %s: %d students moved'
+              % (', '.join(str(g) for g in freed), len(moved)))
+        for s in moved:
+            print('  %s: group %s -> %s' % (roster.ids[s], roster.groups[s],
+                                           groups[s]))
+        report.update(students=roster.number_students,
+                      published_students=published.number_students,
+                      freed_groups=freed, stop_reason=model.stop_reason,
+                      moved=[roster.ids[s] for s in moved])
+        # Scored with the new group sizes, which Targets would not know
+        best = evaluate(report, roster, args.groups, groups, weights,
+                        targets)
+        print('Objective: %.2f' % best.objective)
+        print_solution(best.spreads(), best.relaxation)
+    elif args.sweep:
+        values = {}
+        for factor in args.sweep:
+            name, _, numbers = factor.partition('=')
+            if name not in weights:
+                print('No weighting factor %s to sweep (one of %s)'
+                      % (name, ', '.join(sorted(weights))))
+                return 1
+            values[name] = [float(n) for n in numbers.split(',')]
+        if args.samples:
+            points = weight_sample(values, args.samples, weights, args.seed)
+        else:
+            points = weight_grid(values, weights)
+        print('Sweeping %d sets of weights . . .' % len(points))
+        with report.phase('sweep'):
+            results = sweep(roster, args.groups, points, mode=args.mode,
+                            time_limit=args.time_limit,
+                            warm_start=args.warm_start,
+                            processes=args.processes, stopping=stopping)
+        front = pareto_front(results)
+        with report.phase('write results'):
+            path = os.path.join(args.output_dir, SWEEP_RESULTS)
+            write_csv(path, sweep_table(results))
+            print('Wrote %s' % path)
+            for result in front:
+                path = os.path.join(args.output_dir,
+                                    SWEEP_ALLOCATION % result.point)
+                write_csv(path, allocation_table(roster, result.groups))
+        print_front(front)
+        report.update(sweep=[{
+            'point': result.point, 'weights': result.weights,
+            'start_from': result.neighbour, 'status': result.status,
+            'stop_reason': result.stop_reason,
+            'objective': result.objective, 'gpa_spread': result.gpa_spread,
+            'variance_spread': result.variance_spread,
+            'slack': result.slack, 'seconds': result.seconds,
+            'pareto': result.pareto} for result in results])
+        print('Wrote %s' % report.write(args.output_dir))
+        return 0
+    elif args.starts > 1:
+        print('Solving %d starts . . .' % args.starts)
+        with report.phase('solve starts'):
+            results = multi_start(roster, args.groups, args.starts, weights,
+                                  mode=args.mode, time_limit=args.time_limit,
+                                  symmetry_breaking=args.symmetry_breaking,
+                                  warm_start=args.warm_start,
+                                  aggregate=args.aggregate,
+                                  gpa_bucket=args.gpa_bucket,
+                                  processes=args.processes,
+                                  stopping=stopping)
+        print_starts(results)
+        print_spread(results)
+        report.update(starts=starts_report(results), spread=spread(results))
+        if results[0].objective is None:
+            print('No start found an allocation')
+            report.write(args.output_dir)
+            return 1
+        groups = results[0].groups
+        best = evaluate(report, roster, args.groups, groups, weights)
+        print_solution(best.spreads(), best.relaxation)
+    elif args.mode == 'search':
+        print('Searching . . .')
+        with report.phase('snake draft'):
+            targets = Targets(roster, args.groups)
+            draft = snake_draft(roster, targets)
+        incumbents = anytime(args, roster, weights)
+        with report.phase('search'):
+            search = LocalSearch(roster, targets, draft, weights,
+                                 seed=args.seed)
+            on_incumbent = None
+            if incumbents is not None:
+                on_incumbent = lambda objective, groups: incumbents.found(
+                    objective, groups, 'search')
+                on_incumbent(search.best_objective, search.best_groups)
+            try:
+                groups = search.run(args.time_limit or 10.0,
+                                    stall=args.stall, target=args.target,
+                                    on_incumbent=on_incumbent)
+            finally:
+                if incumbents is not None:
+                    incumbents.close()
+        print('Finished Searching (%d swaps tried, stopped on %s)'
+              % (search.iterations, search.stop_reason))
+        report.update(swaps_tried=search.iterations,
+                      stop_reason=search.stop_reason)
+        best = evaluate(report, roster, args.groups, groups, weights)
+        print('Objective: %.2f' % best.objective)
+        print_solution(best.spreads(), best.relaxation)
+    else:
+        print('Creating model...')
+        cache = None
+        with report.phase('build model'):
+            if pairing is not None:
+                try:
+                    model = PairedModel(roster, args.groups, pairing,
+                                        weights)
+                except ValueError as error:
+                    print(error)
+                    return 1
+                print('%d students in %d components, %d sets kept apart'
+                      % (roster.number_students, len(pairing.components),
+                         len(pairing.apart)))
+            elif args.cache:
+                cache = ModelCache(args.cache_dir,
+                                   int(args.cache_size * 1024 * 1024))
+                model, key, hit = cached_model(
+                    cache, roster, args.groups, weights,
+                    symmetry_breaking=args.symmetry_breaking,
+                    aggregate=args.aggregate, gpa_bucket=args.gpa_bucket)
+                print('Model %s the cache%s' % (
+                    'from' if hit else 'added to',
+                    ', starting from its last allocation'
+                    if model.warm_start else ''))
+                report.update(cache={'key': key, 'hit': hit,
+                                     'start': model.warm_start})
+            elif args.stream:
+                model = StreamModel(roster, args.groups, weights,
+                                    symmetry_breaking=args.symmetry_breaking)
+            elif args.aggregate:
+                model = AggregateModel(roster, args.groups, weights,
+                                       gpa_bucket=args.gpa_bucket)
+            else:
+                model = Model(roster, args.groups, weights,
+                              symmetry_breaking=args.symmetry_breaking)
+            if args.aggregate:
+                print('%d classes of students' % len(model.classes))
+            draft = None
+            if pairing is not None and (args.warm_start or
+                                        args.anytime is not None):
+                try:
+                    draft = paired_draft(roster, model.targets, pairing)
+                except ValueError as error:
+                    # The greedy draft can miss an allocation the solver
+                    # finds, so solve from scratch instead
+                    print('Warning: no paired draft (%s); starting from '
+                          'scratch' % error)
+            elif args.warm_start or args.anytime is not None:
+                draft = snake_draft(roster, model.targets)
+            if args.warm_start and not model.warm_start and \
+                    draft is not None:
+                model.set_start(draft)
+        print('Presolve removed %(rows)d rows and %(columns)d columns'
+              % model.presolved)
+        report.update(model=model.size(), presolve=model.presolved)
+        incumbents = anytime(args, roster, weights)
+        if incumbents is not None and draft is not None:
+            # On disk until the solver has an allocation of its own
+            incumbents.found(Scorer(roster, args.groups, weights).score(
+                draft).objective, draft, 'snake draft')
+        print('Solving . . .')
+        try:
+            with report.phase('solve'), terminate_as_interrupt():
+                status = model.solve(
+                    args.time_limit, msg=not args.quiet,
+                    log_path=os.path.join(args.output_dir, SOLVER_LOG),
+                    on_incumbent=incumbents and incumbents.found,
+                    **stopping)
+            print('Finished Solving (%s, stopped on %s)'
+                  % (status, model.stop_reason))
+            report.update(status=status, solver=model.solver_log,
+                          stop_reason=model.stop_reason)
+            with report.phase('extract solution'):
+                groups = model.assignment()
+            if model.unclear:
+                print('Warning: %d students have no clear group in the '
+                      'solution: %s' % (len(model.unclear), ', '.join(
+                          roster.ids[s] for s in model.unclear)))
+            report.update(unclear_students=[roster.ids[s]
+                                            for s in model.unclear])
+            if cache is not None and None not in groups:
+                cache.store_start(key, groups)
+            if incumbents is not None and None not in groups:
+                incumbents.found(Scorer(roster, args.groups, weights).score(
+                    groups).objective, groups)
+        finally:
+            if incumbents is not None:
+                incumbents.close()
+        if None in groups:
+            print('The solver found no allocation (%s): %d students have no '
+                  'group. Try a longer --time-limit or --warm-start'
+                  % (status, groups.count(None)))
+            report.write(args.output_dir)
+            return 1
+        if args.aggregate:
+            # The GPA bounds of the model are from class means
+            best = evaluate(report, roster, args.groups, groups, weights)
+            print_solution(best.spreads(), best.relaxation)
+        else:
+            report.update(objective=model.objective(),
+                          relaxation=dict(model.relaxation()))
+            print_solution((model.gpa_max.value() - model.gpa_min.value(),
+                            model.gpa_variance_max.value() -
+                            model.gpa_variance_min.value()),
+                           model.relaxation())
+
+    with report.phase('write results'):
+        summary = Summary(roster, groups, args.groups)
+        for path in write_results(args.output_dir, summary):
+            print('Wrote %s' % path)
+
+    if args.excel:
+        write_excel(args.roster, summary, args.output_dir, report)
+    print('Wrote %s' % report.write(args.output_dir))
+    return 0
+
+
+@contextmanager
+def terminate_as_interrupt():
+    """Take SIGTERM as Ctrl-C while the block runs, so a solve that is
+    killed interrupts CBC and still returns its incumbent."""
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+    previous = signal.signal(signal.SIGTERM, interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def anytime(args, roster, weights):
+    """The ``Incumbents`` of the run with ``--anytime``, else None."""
+    if args.anytime is None:
+        return None
+    return Incumbents(args.output_dir, roster, args.groups, weights,
+                      args.anytime)
+
+
+def evaluate(report, roster, number_groups, groups, weights, targets=None):
+    """Score ``groups`` as the model would and add it to ``report``."""
+    with report.phase('score allocation'):
+        best = Scorer(roster, number_groups, weights, targets).score(groups)
+    report.update(objective=best.objective,
+                  relaxation=dict(best.relaxation))
+    return best
+
+
+def starts_report(results):
+    return [{'start': result.start, 'status': result.status,
+             'objective': result.objective, 'seconds': result.seconds,
+             'stop_reason': result.stop_reason}
+            for result in sorted(results, key=lambda result: result.start)]
+
+
+def print_solution(spreads, relaxation):
+    print('\n')
+    print('Biggest difference in mean GPA: %.2f' % spreads[0])
+    print('Biggest difference in GPA variance: %.2f' % spreads[1])
+    print('\n')
+    print('Values of artificial variables for relaxation')
+    for name, total in relaxation:
+        print('%s: %.0f' % (name, total))
+    print('\n')
+
+
+def print_starts(results, label='Start'):
+    print('\n')
+    print('%5s  %-20s  Objective   Seconds  Stopped on' % (label, 'Status'))
+    for result in sorted(results, key=lambda result: result.start):
+        objective = '-' if result.objective is None else \
+            '%.2f' % result.objective
+        print('%5d  %-20s %10s %9.1f  %s' % (result.start, result.status,
+                                             objective, result.seconds,
+                                             result.stop_reason or '-'))
+
+
+def print_front(front):
+    print('\n')
+    print('Pareto frontier (allocations in %s)'
+          % SWEEP_ALLOCATION.replace('%d', 'POINT'))
+    print('%5s  %10s %15s %8s  %s' % ('Point', 'GPA Spread',
+                                      'Variance Spread', 'Slack', 'Weights'))
+    for result in front:
+        print('%5d  %10.3f %15.3f %8.0f  %s' % (
+            result.point, result.gpa_spread, result.variance_spread,
+            result.slack, ' '.join('%s=%g' % (name, result.weights[name])
+                                   for name in sorted(result.weights))))
+
+
+def print_spread(results):
+    values = spread(results)
+    if values:
+        print('\n')
+        print('Best start: %d' % results[0].start)
+        print('Objective over %(found)d starts: best %(best).2f, median '
+              '%(median).2f, mean %(mean).2f, worst %(worst).2f, standard '
+              'deviation %(stdev).2f' % values)
+
+
+def write_excel(path, summary, output_dir, report):
+    from group_allocator import excel
+    with report.phase('open workbook'):
+        Application = excel.excel_application()
+        wb = Application.Workbooks.Open(os.path.abspath(path))
+    with report.phase('summary results'):
+        excel.write_summary_results(Application, summary)
+    with report.phase('charts'):
+        excel.write_charts(Application, summary)
+    with report.phase('student view'):
+        excel.write_student_view(Application, summary,
+                                 os.path.abspath(output_dir))
+    with report.phase('save workbook'):
+        wb.Save()
@@ -0,0 +1,117 @@
+# ============================================================================
+# Group Allocator - decomposition of large cohorts
+#
+# A single model of 10,000 students in 1,000 groups has ten million binary
+# variables. Instead the cohort is split into blocks of a few hundred
+# students, each a stratified slice of the students with a proportional
+# share of the groups, and the model of each block is solved in its own
+# process. The blocks are balanced within themselves but not against each
+# other, so a swap search over the whole cohort then repairs the spread of
+# group GPAs across blocks. With blocks of a fixed size the work grows
+# linearly with the cohort.
+# ============================================================================
+from group_allocator.aggregate import GPA_BUCKET
+from group_allocator.heuristics import snake_draft, stratum
+from group_allocator.model import Targets
+from group_allocator.parallel import Start, solve_all
+from group_allocator.search import LocalSearch
+
+# Students in each block
+BLOCK_STUDENTS = 200
+
+# Seconds to solve the model of each block
+BLOCK_TIME_LIMIT = 10.0
+
+
+def split_blocks(roster, targets, number_blocks):
+    """Split the groups and students of a cohort into ``number_blocks``.
+
+    Each block gets consecutive groups from a list that interleaves the
+    two group sizes, so it has its share of each size, and the students
+    to fill them dealt in stratum and decreasing GPA order, so it has its
+    share of every category and of high and low GPAs.
+
+    Returns the (students, groups) of each block.
+    """
+    groups = sorted(targets.groups, key=lambda g: (
+        ((g - 1 if g <= targets.j1 else g - 1 - targets.j1) + 0.5) /
+        (targets.j1 if g <= targets.j1 else targets.j2), g))
+    block_groups = []
+    for b in range(number_blocks):
+        count = targets.number_groups // number_blocks + \
+            (b < targets.number_groups % number_blocks)
+        block_groups.append(sorted(groups[:count]))
+        groups = groups[count:]
+
+    # Each student goes to the block furthest behind its share so far
+    capacity = [sum(targets.size(g) for g in block)
+                for block in block_groups]
+    students = sorted(roster.students, key=lambda s: (stratum(roster, s),
+                                                      -roster.gpa[s], s))
+    block_students = [list() for block in block_groups]
+    n = float(len(students))
+    for i, s in enumerate(students):
+        b = max((b for b in range(number_blocks)
+                 if len(block_students[b]) < capacity[b]),
+                key=lambda b: capacity[b] * (i + 1) / n -
+                len(block_students[b]))
+        block_students[b].append(s)
+    return [(sorted(members), block)
+            for members, block in zip(block_students, block_groups)]
+
+
+def decompose(roster, number_groups, weights=None, number_blocks=None,
+              time_limit=BLOCK_TIME_LIMIT, repair_time=10.0, warm_start=True,
+              aggregate=False, gpa_bucket=GPA_BUCKET, processes=None,
+              seed=None, stopping=None):
+    """Allocate a large cohort block by block and repair across blocks.
+
+    The model of each block is solved under ``time_limit`` (a ``Model``,
+    or an ``AggregateModel`` with ``aggregate``), ``processes`` blocks at
+    a time, by default from a snake draft of the block. A block without
+    an allocation keeps the snake draft. The combined allocation is then
+    improved by ``LocalSearch`` for ``repair_time`` seconds. Of the
+    ``stopping`` rules, the gaps and stall apply to each block and the
+    stall and objective target to the repair.
+
+    Returns the allocation and the ``Start`` of each block.
+    """
+    stopping = stopping or {}
+    block_stopping = dict((name, value) for name, value in stopping.items()
+                          if name != 'target')
+    targets = Targets(roster, number_groups)
+    if number_blocks is None:
+        number_blocks = int(round(roster.number_students /
+                                  float(BLOCK_STUDENTS)))
+    number_blocks = max(1, min(number_blocks, number_groups))
+    blocks = split_blocks(roster, targets, number_blocks)
+    block_rosters = [roster.reordered(students) for students, _ in blocks]
+    results = solve_all([(block_roster, len(block_groups), 0, weights,
+                          'mip', time_limit, False, warm_start, aggregate,
+                          gpa_bucket, block_stopping)
+                         for block_roster, (_, block_groups)
+                         in zip(block_rosters, blocks)], processes)
+
+    groups = [None] * roster.number_students
+    for b, (students, block_groups) in enumerate(blocks):
+        result = results[b]
+        block_targets = Targets(block_rosters[b], len(block_groups))
+        if result.objective is None:
+            results[b] = result = Start(
+                b, '%s (snake draft)' % result.status, None,
+                snake_draft(block_rosters[b], block_targets), result.seconds,
+                result.stop_reason)
+        result.start = b
+        # The groups of each size in the block are the groups of that size
+        # in the cohort given to the block
+        labels = dict(zip(sorted(block_targets.groups,
+                                 key=block_targets.size),
+                          sorted(block_groups, key=targets.size)))
+        for s, g in zip(students, result.groups):
+            groups[s] = labels[g]
+
+    search = LocalSearch(roster, targets, groups, weights, seed=seed)
+    if repair_time:
+        groups = search.run(repair_time, stall=stopping.get('stall'),
+                            target=stopping.get('target'))
+    return groups, results
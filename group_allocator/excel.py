@@ -0,0 +1,286 @@
+# ============================================================================
+# Group Allocator - optional Excel reporting through COM
+#
+# Writes the Summary_Results sheet, the charts and the Student View workbook
+# exactly as the SolverStudio script does. ``Application`` is the Excel COM
+# object: the one SolverStudio injects, or one from ``excel_application``
+# (requires pywin32 on Windows).
+# ============================================================================
+import datetime
+import os
+
+# Excel constants
+xlY = 1
+xlPlusValues = 2
+xlCustom = -4114
+xlLeft = -4131
+xlEdgeBottom = 10
+
+
+def excel_application(visible=False):
+    """Start (or attach to) Excel through pywin32."""
+    try:
+        import win32com.client
+    except ImportError:
+        raise ImportError('The Excel report requires Excel on Windows and '
+                          'pywin32 (pip install pywin32)')
+    Application = win32com.client.Dispatch('Excel.Application')
+    Application.Visible = visible
+    return Application
+
+
+def _table_values(rows):
+    """``rows`` as a 2-D array that can be assigned to a Range in one call.
+
+    Under SolverStudio (IronPython) this is a .NET object array; through
+    pywin32 a tuple of row tuples.
+    """
+    width = max(len(values) for values in rows)
+    try:
+        from System import Array
+    except ImportError:
+        return tuple(tuple(values) + (None,) * (width - len(values))
+                     for values in rows)
+    array = Array.CreateInstance(object, len(rows), width)
+    for i, values in enumerate(rows):
+        for j, value in enumerate(values):
+            array[i, j] = value
+    return array
+
+
+def _write_table(ws, row, column, rows, bold_header=True):
+    """Write ``rows`` with its top-left corner at (row, column).
+
+    The whole table is a single Range assignment, and the header is made
+    bold with a single call on its range, as every COM call is a round
+    trip to Excel.
+    """
+    width = max(len(values) for values in rows)
+    ws.Range(ws.Cells(row, column),
+             ws.Cells(row + len(rows) - 1, column + width - 1)).Value = \
+        _table_values(rows)
+    if bold_header:
+        ws.Range(ws.Cells(row, column),
+                 ws.Cells(row, column + width - 1)).Font.Bold = True
+
+
+def _autofit(Application, ws):
+    ws.Activate()
+    ws.Cells.Select()
+    Application.Selection.Columns.AutoFit()
+
+
+# ============================================================================
+# Summary_Results
+
+def write_summary_results(Application, summary):
+    """Fill the Summary_Results sheet of the active workbook."""
+    number_groups = len(summary.group_numbers)
+    number_categories = len(summary.specialisations) + \
+        len(summary.ethnicities) + len(summary.extra_columns())
+    ws = Application.Worksheets('Summary_Results')
+    ws.Cells.Clear()
+
+    table = summary.table()
+    _write_table(ws, 1, 1, table)
+    column = 7
+    for categories, colour in ((summary.specialisations, 5),
+                               (summary.ethnicities, 6),
+                               (summary.extra_columns(), 7)):
+        if categories:
+            ws.Range(ws.Cells(1, column),
+                     ws.Cells(1, column + len(categories) - 1)
+                     ).Interior.ThemeColor = colour
+        column += len(categories)
+
+    # Data for box plots, one blank column after the table
+    box_plot = summary.box_plot_table()
+    _write_table(ws, 1, len(table[0]) + 2, box_plot[:1], bold_header=False)
+    _write_table(ws, 3, len(table[0]) + 2, box_plot[1:], bold_header=False)
+
+    _autofit(Application, ws)
+    ws.Range(ws.Cells(2, 5), ws.Cells(number_groups + 2, 6)).NumberFormat = \
+        '0.00'
+    ws.Range(ws.Cells(2, 1),
+             ws.Cells(2, 6 + number_categories)).Style = 'Good'
+    ws.Range(ws.Cells(1, 1), ws.Cells(number_groups + 2, 1)).Borders(
+        xlEdgeBottom).LineStyle = 1
+    ws.Range(ws.Cells(1, 1),
+             ws.Cells(number_groups + 2, 1)).HorizontalAlignment = xlLeft
+    ws.Cells(number_groups + 5, 1).Select()
+
+
+# ============================================================================
+# Charts
+
+def _count_chart(Application, ws, summary, series, title, y_title, sheet):
+    """Clustered column chart of the given (name, column) series."""
+    number_groups = len(summary.group_numbers)
+    x_axis_range = ws.Range(ws.Cells(3, 1), ws.Cells(2 + number_groups, 1))
+    ws.Activate()
+    ws.Cells(number_groups + 5, 1).Select()
+    ws.Shapes.AddChart(201, 54).Select()
+    a = Application.ActiveChart
+    for i, (name, column) in enumerate(series, 1):
+        a.SeriesCollection().NewSeries()
+        a.SeriesCollection(i).Name = name
+        a.SeriesCollection(i).Values = ws.Range(
+            ws.Cells(3, column), ws.Cells(2 + number_groups, column))
+        a.SeriesCollection(i).XValues = x_axis_range
+    a.SetElement(2)
+    a.SetElement(306)
+    a.SetElement(301)
+    a.SetElement(102)
+    a.ChartTitle.Text = title
+    a.Axes(1, 1).HasTitle = True
+    a.Axes(1, 1).AxisTitle.Text = 'Group'
+    a.Axes(2, 1).HasTitle = True
+    a.Axes(2, 1).AxisTitle.Text = y_title
+    a.Axes(2).MaximumScale = max(summary.sizes().values()) + 1
+    a.Axes(2).MinimumScale = 0
+    a.Location(Where=1, Name=sheet)
+    return a
+
+
+def write_charts(Application, summary):
+    """Replace the *_Chart sheets with charts of Summary_Results."""
+    number_groups = len(summary.group_numbers)
+    wb = Application.ActiveWorkbook
+    ws = Application.Worksheets('Summary_Results')
+    box_column = len(summary.table()[0]) + 2
+
+    # Delete all existing charts
+    for sheet in Application.Charts:
+        if sheet.Name.endswith('_Chart'):
+            Application.DisplayAlerts = False
+            sheet.Delete()
+            Application.DisplayAlerts = True
+
+    # GPA Box Plot Chart, stacked from the gpa_d_* columns
+    print('Charting GPA . . .')
+    ws.Shapes.AddChart().Select()
+    a = Application.ActiveChart
+    a.ChartType = 52
+    a.SetSourceData(Source=ws.Range(ws.Cells(3, box_column + 5),
+                                    ws.Cells(2 + number_groups,
+                                             box_column + 9)))
+    for i in (1, 2, 5):
+        a.SeriesCollection(i).Select()
+        Application.Selection.Format.Fill.Visible = 0
+        Application.Selection.Format.Line.Visible = 0
+    a.SeriesCollection(2).HasErrorBars = True
+    a.SeriesCollection(2).ErrorBar(Direction=1, Include=3, Type=2, Amount=100)
+    a.SeriesCollection(4).HasErrorBars = True
+    a.SeriesCollection(4).ErrorBar(Direction=xlY, Include=xlPlusValues,
+                                   Type=xlCustom, MinusValues='={0}',
+                                   Amount=ws.Range(
+                                       ws.Cells(3, box_column + 9),
+                                       ws.Cells(2 + number_groups,
+                                                box_column + 9)))
+    for i in (4, 3):
+        a.SeriesCollection(i).Select()
+        Application.Selection.Format.Fill.Visible = 0
+        Application.Selection.Format.Line.Visible = 1
+        Application.Selection.Format.Line.ForeColor.ObjectThemeColor = 13
+    a.SetElement(2)
+    a.SetElement(306)
+    a.SetElement(301)
+    a.SetElement(102)
+    a.Legend.Select()
+    Application.Selection.Delete()
+    a.ChartTitle.Text = ('GPA spread per group'
+                         ' (lines bottom to top = Min, Q1, Median, Q3, Max)')
+    a.Axes(1, 1).HasTitle = True
+    a.Axes(1, 1).AxisTitle.Text = 'Group'
+    a.Axes(2, 1).HasTitle = True
+    a.Axes(2, 1).AxisTitle.Text = 'GPA'
+    a.Axes(2).MaximumScale = 9
+    a.Axes(2).MinimumScale = 0
+    a.Location(Where=1, Name='GPA_Chart')
+    a.deselect()
+
+    # Gender
+    print('Charting Gender . . .')
+    a = _count_chart(Application, ws, summary, [('Male', 3), ('Female', 4)],
+                     'Number of Males and Females in each group',
+                     'Number of Students', 'Gender_Chart')
+    a.deselect()
+
+    # Specialisations and ethnicities, one chart each
+    print('Charting Specialisations . . .')
+    column = 6
+    for k in summary.specialisations:
+        column += 1
+        title = '%s_Chart' % k
+        a = _count_chart(Application, ws, summary, [(k, column)],
+                         '%s students in each group' % k.title(),
+                         'Number of Students', title)
+        wb.Sheets(title).Tab.ThemeColor = 9
+        wb.Sheets(title).Tab.TintAndShade = 0
+        a.deselect()
+
+    print('Charting Ethnic Groups . . .')
+    for e in summary.ethnicities:
+        column += 1
+        title = '%s(E)_Chart' % e
+        a = _count_chart(Application, ws, summary, [(e, column)],
+                         '%s students in each group' % e.title(),
+                         'Number of Students', title)
+        wb.Sheets(title).Tab.ThemeColor = 6
+        wb.Sheets(title).Tab.TintAndShade = 0
+        a.deselect()
+
+    Application.Worksheets('Summary_Results').\
+        Move(after=Application.Worksheets('Student_Data'))
+
+
+# ============================================================================
+# Student View workbook
+
+def write_student_view(Application, summary, directory):
+    """Save a Groups_StudentView workbook of group lists in ``directory``.
+
+    Returns the path of the workbook.
+    """
+    now = datetime.datetime.now()
+    name = 'Groups_StudentView_%s.xlsx' % now.strftime('%Y-%m-%d_%H.%M.%S')
+    path = os.path.join(directory, name)
+    Application.Workbooks.Add()
+    Application.ActiveWorkbook.SaveAs(Filename=path)
+    wb = Application.Workbooks(name)
+
+    # All groups
+    wb.Sheets.Add()
+    wb.ActiveSheet.Name = 'All_Groups'
+    ws = wb.Worksheets('All_Groups')
+    _write_table(ws, 1, 1, summary.group_list())
+    _autofit(Application, ws)
+    ws.Cells(1, 1).Select()
+
+    for sheet in wb.Worksheets:
+        if sheet.Name != 'All_Groups':
+            Application.DisplayAlerts = False
+            sheet.Delete()
+            Application.DisplayAlerts = True
+
+    # Make a sheet for each group
+    for g in summary.group_numbers:
+        wb.Sheets.Add(After=wb.Sheets(wb.Sheets.Count))
+        wb.ActiveSheet.Name = 'Group_%s' % g
+        ws = wb.Worksheets('Group_%s' % g)
+        _write_table(ws, 1, 1, summary.group_list(g))
+        _autofit(Application, ws)
+        ws.Cells(1, 1).Select()
+
+    wb.Worksheets('All_Groups').Activate()
+    wb.Save()
+    return path
+
+
+def write_report(Application, summary, directory=None):
+    """Summary_Results, charts and Student View in one go."""
+    if directory is None:
+        directory = Application.ActiveWorkbook.Path
+    write_summary_results(Application, summary)
+    write_charts(Application, summary)
+    return write_student_view(Application, summary, directory)
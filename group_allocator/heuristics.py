@@ -0,0 +1,119 @@
+# ============================================================================
+# Group Allocator - construction heuristics
+# ============================================================================
+import random
+from math import ceil
+
+from group_allocator.model import OUTSTANDING_GPA
+
+# Number of groups along the snake considered for each student
+SNAKE_WINDOW = 256
+
+
+def snake_draft(roster, targets, seed=None):
+    """Allocate students by a stratified snake draft.
+
+    Students are sorted into strata (outstanding students first, then by
+    gender, specialisation, ethnicity and any further attribute) and by
+    decreasing GPA within each stratum, then dealt to the groups in snake
+    order (1, 2, .., G, G, .., 2, 1, 1, 2, ..). Each student goes to the
+    next group along the snake with room that is still below the minimum of
+    each of the student's categories, failing that to the next one below
+    the maximum, and failing that to the next one with room. Every group
+    therefore gets a similar share of each category and of high and low
+    GPAs. ``seed`` shuffles the order of the strata of each gender and of
+    the groups to give different allocations of similar quality.
+
+    Returns the group of each student, indexed by student.
+    """
+    rng = random.Random(seed)
+    strata = {}
+    for s in roster.students:
+        strata.setdefault(stratum(roster, s), []).append(s)
+    keys = sorted(strata)
+    order = list(targets.groups)
+    if seed is not None:
+        rng.shuffle(keys)
+        keys.sort(key=lambda key: key[:2])
+        rng.shuffle(order)
+
+    # Least and most students of each category a group can take without
+    # relaxation. Categories with only a minimum in the model (gender and
+    # outstanding students) are capped at their share here, as a group
+    # with more than its share of one gender leaves another group short.
+    limits = []
+    for balance in targets.balances:
+        maximum = balance.maximum
+        if maximum is None:
+            maximum = int(ceil(float(len(balance.students)) /
+                               targets.number_groups))
+        limits.append((balance.minimum, maximum))
+
+    counts = dict((g, dict()) for g in targets.groups)
+    capacity = dict((g, targets.size(g)) for g in targets.groups)
+    groups = [None] * roster.number_students
+    position = 0
+    step = 1
+    for key in keys:
+        # Students of a stratum share their balances
+        categories = targets.incidence[strata[key][0]]
+        for s in sorted(strata[key], key=lambda s: -roster.gpa[s]):
+            # Best tier among the next groups along the snake: 0 below
+            # every minimum, 1 below every maximum, 2 only room. ``order``
+            # only holds groups with room.
+            best = None
+            for _ in range(min(2 * len(order), SNAKE_WINDOW)):
+                tier = _tier(counts[order[position]], categories, limits)
+                if best is None or tier < best[0]:
+                    best = (tier, position, step)
+                    if tier == 0:
+                        break
+                position, step = _advance(position, step, len(order))
+            tier, position, step = best
+            g = order[position]
+            groups[s] = g
+            capacity[g] -= 1
+            for c in categories:
+                counts[g][c] = counts[g].get(c, 0) + 1
+            if capacity[g] > 0:
+                position, step = _advance(position, step, len(order))
+            elif len(order) > 1:
+                # Drop the full group; the next one along the snake moves
+                # into its position when going forwards
+                del order[position]
+                if step > 0:
+                    position, step = _advance(position - 1, step,
+                                              len(order))
+                else:
+                    position, step = _advance(position, step, len(order))
+    return groups
+
+
+def stratum(roster, s):
+    """Stratum of student ``s``: outstanding students first, then gender,
+    specialisation, ethnicity and any further attribute ignoring case."""
+    return (roster.gpa[s] < OUTSTANDING_GPA, roster.gender[s].lower(),
+            roster.specialisation[s].lower(),
+            roster.ethnicity[s].lower()) + tuple(
+                roster.extra[name][s].lower() for name in sorted(roster.extra))
+
+
+def _tier(counts, categories, limits):
+    tier = 0
+    for c in categories:
+        minimum, maximum = limits[c]
+        count = counts.get(c, 0)
+        if count >= maximum:
+            return 2
+        if count >= minimum:
+            tier = 1
+    return tier
+
+
+def _advance(position, step, length):
+    position += step
+    if position == length:
+        return length - 1, -1
+    if position < 0:
+        return 0, 1
+    return position, step
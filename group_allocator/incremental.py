@@ -0,0 +1,213 @@
+# ============================================================================
+# Group Allocator - incremental re-allocation
+#
+# Once groups are published a few students enrol late or withdraw. Rather
+# than re-solving the cohort, which reshuffles everyone, every group that
+# lost a student, must change size or has room for a late student is
+# freed, with a few groups at the ends of the GPA range. Only the students
+# of the freed groups and the late enrolments are re-allocated, by the same
+# model restricted to them and to the freed groups. The other groups keep
+# their students and bound the GPA spread as constants. Moving a student
+# out of their published group costs a small penalty, so students move
+# only for a better balance.
+# ============================================================================
+import pulp
+
+from group_allocator.model import Model, Targets, incidence
+from group_allocator.roster import Roster
+
+# Groups freed beyond those affected, taken from the lowest and highest
+# group GPA means alternately
+NEIGHBOURHOOD = 2
+
+# Objective penalty for each student moved out of their published group
+MOVE_PENALTY = 1e-3
+
+
+def update_roster(roster, added=None, dropped=()):
+    """The students of ``roster`` without the IDs in ``dropped``, followed
+    by the students of the roster ``added`` (their groups are ignored)."""
+    dropped = set(dropped)
+    unknown = dropped - set(roster.ids)
+    if unknown:
+        raise ValueError('No student with ID %s to drop'
+                         % ', '.join(sorted(unknown)))
+    kept = [s for s in roster.students if roster.ids[s] not in dropped]
+    columns = dict((name, [getattr(roster, name)[s] for s in kept])
+                   for name in ('ids', 'gpa', 'gender', 'specialisation',
+                                'ethnicity', 'names', 'upi', 'groups'))
+    extra = dict((name, [column[s] for s in kept])
+                 for name, column in roster.extra.items())
+    if added is not None:
+        if set(added.extra) != set(extra):
+            raise ValueError('Late enrolments must have the columns %s'
+                             % ', '.join(sorted(extra)))
+        for name in columns:
+            if name == 'groups':
+                columns[name].extend([None] * added.number_students)
+            else:
+                columns[name].extend(getattr(added, name))
+        for name in extra:
+            extra[name].extend(added.extra[name])
+    if len(set(columns['ids'])) != len(columns['ids']):
+        raise ValueError('A late enrolment has the ID of an enrolled student')
+    return Roster(extra=list(extra.items()), **columns)
+
+
+class PartialTargets(object):
+    """The targets of a cohort, ``targets``, restricted to the ``students``
+    (as 0, 1, ... in that order) and groups of ``sizes`` (one per group, as
+    1, 2, ...). The bounds on each category stay those of the cohort.
+
+    With every student and group it is the cohort with the group sizes of
+    an incremental allocation, which need not be in the order of Targets.
+    """
+
+    def __init__(self, targets, students, sizes):
+        position = dict((s, i) for i, s in enumerate(students))
+        self.number_groups = len(sizes)
+        self.number_students = len(students)
+        self.groups = range(1, self.number_groups + 1)
+        self._sizes = list(sizes)
+        self.gpa_mean = targets.gpa_mean
+        self.gpa_deviation = [targets.gpa_deviation[s] for s in students]
+        self.gpa_variance = targets.gpa_variance
+        self.attributes = targets.attributes
+        self.balances = [balance.restricted(position)
+                         for balance in targets.balances]
+        self.incidence = incidence(self.balances, self.number_students)
+        self.relaxation_names = targets.relaxation_names
+
+    def size(self, g):
+        return self._sizes[g - 1]
+
+
+def plan_sizes(roster, targets, dropped_groups=()):
+    """Size of each published group in the new cohort, and the groups that
+    must be freed: those that lost a student (``dropped_groups``) or are
+    not at their size. The largest groups keep the larger size."""
+    counts = dict((g, 0) for g in targets.groups)
+    for g in roster.groups:
+        if g is not None:
+            counts[g] += 1
+    order = sorted(targets.groups, key=lambda g: (-counts[g], g))
+    sizes = dict((g, targets.m2 if i < targets.j2 else targets.m1)
+                 for i, g in enumerate(order))
+    affected = set(g for g in targets.groups
+                   if counts[g] != sizes[g] or g in dropped_groups)
+    return sizes, affected
+
+
+def reallocate(roster, number_groups, weights=None, dropped_groups=(),
+               neighbourhood=NEIGHBOURHOOD, move_penalty=MOVE_PENALTY,
+               time_limit=10.0, msg=False, **stopping):
+    """Allocate the students of ``roster`` without a group, keeping the
+    published groups of the rest as far as possible.
+
+    ``dropped_groups`` are the groups that students withdrew from. The
+    affected groups and ``neighbourhood`` more are freed and re-solved
+    from a greedy fill, which is kept if the solver returns no allocation;
+    every other student keeps their group. The solve is under
+    ``time_limit`` and the ``stopping`` rules, which may also hold the
+    ``SOLVER_SETTINGS``, as for ``Model.solve``.
+
+    Returns the allocation of the roster, the targets of the cohort with
+    its new group sizes, the freed groups and the model of the freed part.
+    """
+    targets = Targets(roster, number_groups)
+    for g in roster.groups:
+        if g is not None and g not in targets.groups:
+            raise ValueError('Published group %s is not one of groups 1 to '
+                             '%d' % (g, number_groups))
+    sizes, freed = plan_sizes(roster, targets, dropped_groups)
+
+    # Extra groups with the lowest and highest GPA means
+    mean = {}
+    for g in targets.groups:
+        members = [s for s in roster.students if roster.groups[s] == g]
+        if members:
+            mean[g] = sum(roster.gpa[s] for s in members) / len(members)
+    spare = sorted((g for g in mean if g not in freed), key=mean.get)
+    while spare and neighbourhood > 0:
+        freed.add(spare.pop(0))
+        neighbourhood -= 1
+        if spare and neighbourhood > 0:
+            freed.add(spare.pop())
+            neighbourhood -= 1
+
+    freed = sorted(freed)
+    label = dict((g, i + 1) for i, g in enumerate(freed))
+    students = [s for s in roster.students
+                if roster.groups[s] is None or roster.groups[s] in label]
+    partial = PartialTargets(targets, students, [sizes[g] for g in freed])
+    model = Model(roster.reordered(students), len(freed), weights,
+                  targets=partial)
+
+    # The groups kept as published bound the GPA range. Presolve bounded
+    # it by the freed students alone, so the bounds are widened to them
+    for g in targets.groups:
+        if g in label:
+            continue
+        members = [s for s in roster.students if roster.groups[s] == g]
+        gpa = sum(roster.gpa[s] for s in members) / len(members)
+        deviation = sum(targets.gpa_deviation[s]
+                        for s in members) / len(members)
+        model.gpa_min.lowBound = min(model.gpa_min.lowBound, gpa)
+        model.gpa_max.upBound = max(model.gpa_max.upBound, gpa)
+        model.gpa_variance_min.lowBound = min(
+            model.gpa_variance_min.lowBound, deviation)
+        model.gpa_variance_max.upBound = max(
+            model.gpa_variance_max.upBound, deviation)
+        model.problem += model.gpa_min <= gpa, 'kept_min_gpa_g%d' % g
+        model.problem += model.gpa_max >= gpa, 'kept_max_gpa_g%d' % g
+        model.problem += model.gpa_variance_min <= deviation, \
+            'kept_gpa_variance_min_g%d' % g
+        model.problem += model.gpa_variance_max >= deviation, \
+            'kept_gpa_variance_max_g%d' % g
+
+    # Penalty for leaving the published group
+    stay = [model.x[(i, label[roster.groups[s]])]
+            for i, s in enumerate(students) if roster.groups[s] is not None]
+    if stay and move_penalty:
+        model.problem.setObjective(model.problem.objective + move_penalty *
+                                   (len(stay) - pulp.lpSum(stay)))
+        model.problem.objective.name = 'objective'
+
+    start = _fill(roster, students, label, partial)
+    model.set_start(start)
+    model.solve(time_limit, msg=msg, **stopping)
+    partial_groups = model.assignment()
+    if None in partial_groups:
+        # No allocation within the time limit: keep the greedy fill
+        partial_groups = start
+
+    groups = list(roster.groups)
+    for i, s in enumerate(students):
+        groups[s] = freed[partial_groups[i] - 1]
+    return groups, PartialTargets(targets, roster.students, [
+        sizes[g] for g in targets.groups]), freed, model
+
+
+def _fill(roster, students, label, targets):
+    """Freed students in their published group where it has room, and the
+    rest by decreasing GPA to the group with the lowest GPA total for its
+    size among those with room."""
+    groups = [None] * len(students)
+    filled = dict((g, 0) for g in targets.groups)
+    total = dict((g, 0.0) for g in targets.groups)
+    waiting = []
+    for i, s in enumerate(students):
+        g = label.get(roster.groups[s])
+        if g is not None and filled[g] < targets.size(g):
+            groups[i] = g
+            filled[g] += 1
+            total[g] += roster.gpa[s]
+        else:
+            waiting.append(i)
+    for i in sorted(waiting, key=lambda i: -roster.gpa[students[i]]):
+        g = min((g for g in targets.groups if filled[g] < targets.size(g)),
+                key=lambda g: (total[g] / targets.size(g), g))
+        groups[i] = g
+        filled[g] += 1
+        total[g] += roster.gpa[students[i]]
+    return groups
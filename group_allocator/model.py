@@ -0,0 +1,856 @@
+# ============================================================================
+# Group Allocator - the ENGGEN403 mixed integer program
+# ============================================================================
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from array import array
+from contextlib import contextmanager
+from math import ceil
+
+try:
+    import pty
+except ImportError:
+    # Not available on Windows
+    pty = None
+
+import pulp
+
+from group_allocator.solvers import backend, stop_reason
+
+# beta is the number to adjust the upper bound on number of
+# type of people in a group
+BETA = 0
+
+# The GPA of an 'oustanding' student
+OUTSTANDING_GPA = 8.00
+
+# Penalty on the artificial variables of the semi-relaxed constraints
+ARTIFICIAL_PENALTY = 1e4
+
+# A student is clearly in a group when its x is within this of 1 there and
+# the x of its other groups add up to no more than this
+ASSIGNMENT_TOLERANCE = 1e-4
+
+# Margin of the GPA and variance bounds found by presolve, for the
+# rounding of the group sums
+BOUND_TOLERANCE = 1e-6
+
+# Keyword arguments of Model.solve that stop the solver before its time limit
+STOPPING_RULES = ('gap', 'gap_abs', 'stall', 'target')
+
+# Settings of Model.solve choosing the MIP solver and its threads, passed on
+# with the stopping rules
+SOLVER_SETTINGS = ('solver', 'threads')
+
+# Weightings, named after the factor_* cells of the Student_Data sheet
+DEFAULT_WEIGHTS = {
+    'gpamean': 1.0,
+    'gpavar': 1.0,
+    'spec': 1.0,
+    'gender': 1.0,
+    'eth': 1.0,
+    'out': 1.0,
+}
+
+
+class VariableGrid(object):
+    """Variables indexed by (student, group), kept in one list by student
+    then group instead of a dictionary keyed by tuples. Named as by
+    ``pulp.LpVariable.dicts``."""
+
+    def __init__(self, name, students, groups, category):
+        self.students = students
+        self.groups = groups
+        self.number_groups = len(groups)
+        self.first = groups[0]
+        self.variables = [
+            pulp.LpVariable('%s_(%d,_%d)' % (name, s, g), cat=category)
+            for s in students for g in groups]
+
+    def __getitem__(self, key):
+        s, g = key
+        return self.variables[s * self.number_groups + g - self.first]
+
+    def __len__(self):
+        return len(self.variables)
+
+    def row(self, s):
+        """Variables of student ``s``, one per group."""
+        return self.variables[s * self.number_groups:
+                              (s + 1) * self.number_groups]
+
+    def keys(self):
+        return ((s, g) for s in self.students for g in self.groups)
+
+    def values(self):
+        return iter(self.variables)
+
+    def items(self):
+        return zip(self.keys(), self.variables)
+
+
+class Attribute(object):
+    """A balanced attribute of the students and the names the model gives
+    its slack.
+
+    Each category of ``name`` (a roster attribute, or 'outstanding' for
+    the students with a GPA of at least OUTSTANDING_GPA) should have at
+    least its share of the students of every group rounded down and, with
+    ``maximum``, at most its share rounded up plus BETA. The students short
+    of or over these are artificial variables penalised by the weighting
+    factor ``weight`` (``name`` if not given). ``categories`` fixes the
+    categories, by default every value in the roster but Not Applicable.
+
+    ``variable``, ``constraint`` and ``relaxation`` name the artificial
+    variables, constraints and relaxation totals of each bound, from
+    %(attribute)s, %(Attribute)s, %(category)s, %(Category)s, %(bound)s
+    ('min' or 'max'), %(Bound)s and %(g)d. Variables are named like
+    ``pulp.LpVariable.dicts`` indexed by (category, group), or by group
+    alone without ``by_category``.
+    """
+
+    def __init__(self, name, weight=None, maximum=True, categories=None,
+                 variable='%(attribute)s_artificial_%(bound)s',
+                 constraint='%(bound)s_%(attribute)s%(category)s_g%(g)d',
+                 relaxation='%(Attribute)s %(Bound)s', by_category=True):
+        self.name = name
+        self.weight = weight or name
+        self.maximum = maximum
+        self.categories = categories
+        self.variable = variable
+        self.constraint = constraint
+        self.relaxation = relaxation
+        self.by_category = by_category
+
+    def bounds(self):
+        return ('min', 'max') if self.maximum else ('min',)
+
+    def name_of(self, template, category, bound, g=0):
+        return template % {'attribute': self.name, 'category': category,
+                           'Attribute': self.name.capitalize(),
+                           'Category': category.capitalize(),
+                           'bound': bound, 'Bound': bound.capitalize(),
+                           'g': g}
+
+    def relaxation_names(self):
+        """Names of the relaxation totals of the attribute, each once."""
+        names = []
+        for bound in self.bounds():
+            for category in self.categories or ('',):
+                name = self.name_of(self.relaxation, category, bound)
+                if name not in names:
+                    names.append(name)
+        return names
+
+
+# The attributes balanced by the ENGGEN403 model, named as in
+# solve_script.py. Further roster attributes are balanced after these,
+# named by the defaults of Attribute.
+ATTRIBUTES = (
+    Attribute('gender', maximum=False, categories=('female', 'male'),
+              variable='%(category)s_artificial',
+              constraint='min_%(category)ss_g%(g)d',
+              relaxation='%(Category)ss Min', by_category=False),
+    Attribute('specialisation', 'spec',
+              constraint='%(bound)s_spec%(category)s_g%(g)d',
+              relaxation='Specialisations %(Bound)s'),
+    Attribute('ethnicity', 'eth',
+              constraint='%(bound)s_eth%(category)s_g%(g)d',
+              relaxation='Ethnicities %(Bound)s'),
+    Attribute('outstanding', 'out', maximum=False, categories=('',),
+              variable='oustanding_gpa_artificial',
+              constraint='out_gpa_g%(g)d', relaxation='Oustanding GPA Min',
+              by_category=False),
+)
+
+
+class Balance(object):
+    """One category of a balanced attribute: its ``students`` and the
+    least and most of them each group should have (``maximum`` None if
+    unbounded)."""
+
+    __slots__ = ('attribute', 'category', 'students', 'minimum', 'maximum')
+
+    def __init__(self, attribute, category, students, minimum, maximum):
+        self.attribute = attribute
+        self.category = category
+        self.students = students
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def variable(self, bound, g):
+        """Name of the artificial variable of ``bound`` in group ``g``."""
+        attribute = self.attribute
+        index = (self.category, g) if attribute.by_category else g
+        return '%s_%s' % (attribute.name_of(attribute.variable,
+                                            self.category, bound), index)
+
+    def constraint(self, bound, g):
+        return self.attribute.name_of(self.attribute.constraint,
+                                      self.category, bound, g)
+
+    def relaxation(self, bound):
+        return self.attribute.name_of(self.attribute.relaxation,
+                                      self.category, bound)
+
+    def restricted(self, position):
+        """The same balance over the students in ``position``, numbered
+        by it."""
+        return Balance(self.attribute, self.category,
+                       [position[s] for s in self.students if s in position],
+                       self.minimum, self.maximum)
+
+
+def incidence(balances, number_students):
+    """The balances of each student, from the students of each balance."""
+    rows = [list() for _ in range(number_students)]
+    for i, balance in enumerate(balances):
+        for s in balance.students:
+            rows[s].append(i)
+    return [tuple(row) for row in rows]
+
+
+class Targets(object):
+    """Group sizes and balancing targets of a roster split into groups.
+
+    ``attributes`` are the balanced attributes, by default ATTRIBUTES and
+    then every further attribute of the roster. Each of their categories is
+    a ``Balance`` in ``balances``, and ``incidence`` holds the balances of
+    each student.
+    """
+
+    def __init__(self, roster, number_groups, attributes=None):
+        number_groups = int(number_groups)
+        number_students = roster.number_students
+        if not 0 < number_groups <= number_students:
+            raise ValueError('Cannot split %d students into %d groups'
+                             % (number_students, number_groups))
+        self.number_groups = number_groups
+        self.number_students = number_students
+
+        # Set for all groups
+        self.groups = range(1, number_groups + 1)
+
+        # Group sizes and the number of groups of each size
+        self.m1 = int(number_students / number_groups)
+        self.m2 = self.m1 + 1
+        self.j2 = int(number_students - self.m1 * number_groups)
+        self.j1 = int(number_groups - self.j2)
+        self.groups1 = range(1, self.j1 + 1)
+        self.groups2 = range(self.j1 + 1, number_groups + 1)
+
+        # Average GPA and squared deviation of each student from it
+        self.gpa_mean = sum(roster.gpa) / number_students
+        self.gpa_deviation = array('d', [pow(value - self.gpa_mean, 2)
+                                         for value in roster.gpa])
+        self.gpa_variance = sum(self.gpa_deviation) / number_students
+
+        # Students, minimum and maximum per group of each category of each
+        # balanced attribute, from one pass over its codes
+        if attributes is None:
+            attributes = list(ATTRIBUTES) + [Attribute(name)
+                                             for name in roster.extra]
+        self.attributes = attributes
+        self.balances = []
+        for attribute in attributes:
+            if attribute.name == 'outstanding':
+                categories = attribute.categories
+                codes = [0 if value >= OUTSTANDING_GPA else -1
+                         for value in roster.gpa]
+            else:
+                categories = attribute.categories or \
+                    roster.categories(attribute.name)
+                codes = roster.codes(attribute.name, categories)
+            members = [list() for _ in categories]
+            for s, k in enumerate(codes):
+                if k >= 0:
+                    members[k].append(s)
+            for category, students in zip(categories, members):
+                maximum = None
+                if attribute.maximum:
+                    maximum = int(ceil(len(students) / number_groups) + BETA)
+                self.balances.append(Balance(
+                    attribute, category, students,
+                    int(len(students) / number_groups), maximum))
+        self.incidence = incidence(self.balances, number_students)
+        self.relaxation_names = [name for attribute in attributes
+                                 for name in attribute.relaxation_names()]
+
+    def size(self, g):
+        """Number of students in group ``g``."""
+        return self.m1 if g <= self.j1 else self.m2
+
+
+class Model(object):
+    """The ENGGEN403 model for allocating a roster to ``number_groups``.
+
+    Groups of the same size are interchangeable, so every allocation has
+    many relabelled copies. With ``symmetry_breaking`` the k-th student can
+    only be in the first k groups of each size, which removes many of the
+    copies: any allocation can be relabelled to satisfy it by numbering the
+    groups of each size in order of their first member.
+
+    ``targets`` replaces the targets of the roster itself, e.g. those of a
+    whole cohort when only part of it is allocated.
+
+    With ``presolve`` the artificial variables and the GPA and variance
+    bounds are bounded by what the data allows (see ``_presolve``), and
+    the balance constraints that can never be broken are left out with
+    their artificial variables; ``presolved`` counts the rows and columns
+    left out.
+    """
+
+    def __init__(self, roster, number_groups, weights=None,
+                 symmetry_breaking=False, targets=None, presolve=True):
+        self.roster = roster
+        self.targets = targets or Targets(roster, number_groups)
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.symmetry_breaking = symmetry_breaking
+        self.presolve = presolve
+        self.warm_start = False
+        self.problem = pulp.LpProblem('ENGGEN403', pulp.LpMinimize)
+        self._build()
+
+    def _build(self):
+        self._presolve()
+        self._add_objective()
+        self._add_assignment()
+        self._add_balance()
+
+    def _presolve(self):
+        """Bounds of the artificial variables and of the GPA and variance
+        bounds, from the data.
+
+        A group of size m has at least n_k - (n - m) and at most
+        min(m, n_k) of the n_k students of a category, so is short of the
+        minimum by at most the minimum less the former and over the maximum
+        by at most the latter less the maximum. Where that is 0 the
+        constraint always holds and is left out. The lowest group mean lies
+        between the mean of the m smallest values of the smallest group
+        size and the cohort mean, and the highest between the cohort mean
+        and the mean of the m largest.
+        """
+        t = self.targets
+        n = t.number_students
+        self.short_bounds = []
+        self.over_bounds = []
+        self.presolved = {'rows': 0, 'columns': 0}
+        for balance in t.balances:
+            n_k = len(balance.students)
+            bounds = [dict((g, n) for g in t.groups), {}]
+            if balance.maximum is not None:
+                bounds[1] = dict((g, n) for g in t.groups)
+            if self.presolve:
+                bounds[0] = dict(
+                    (g, balance.minimum - max(0, n_k - n + t.size(g)))
+                    for g in t.groups)
+                if balance.maximum is not None:
+                    bounds[1] = dict(
+                        (g, min(t.size(g), n_k) - balance.maximum)
+                        for g in t.groups)
+            for bound in bounds:
+                for g in list(bound):
+                    if bound[g] <= 0:
+                        del bound[g]
+                        self.presolved['rows'] += 1
+                        self.presolved['columns'] += 1
+            self.short_bounds.append(bounds[0])
+            self.over_bounds.append(bounds[1])
+
+        self.gpa_bounds = ((0, 9), (0, 9), (0, 25), (0, 25))
+        if self.presolve:
+            m = min(t.size(g) for g in t.groups)
+            gpa = sorted(self.roster.gpa)
+            deviation = sorted(t.gpa_deviation)
+            bounds = []
+            for values in (gpa, deviation):
+                mean = sum(values) / n
+                lowest = sum(values[:m]) / m
+                highest = sum(values[-m:]) / m
+                bounds.extend([(lowest - BOUND_TOLERANCE,
+                                mean + BOUND_TOLERANCE),
+                               (mean - BOUND_TOLERANCE,
+                                highest + BOUND_TOLERANCE)])
+            self.gpa_bounds = tuple(bounds)
+
+    def _add_objective(self):
+        t = self.targets
+
+        # ====================================================================
+        #   Decision Variables
+
+        # Students short of the minimum and over the maximum of each
+        # balance, by group, where the constraint can be broken
+        self.artificial_min = [
+            dict((g, pulp.LpVariable(balance.variable('min', g), 0, upper))
+                 for g, upper in sorted(bounds.items()))
+            for balance, bounds in zip(t.balances, self.short_bounds)]
+        self.artificial_max = [
+            dict((g, pulp.LpVariable(balance.variable('max', g), 0, upper))
+                 for g, upper in sorted(bounds.items()))
+            for balance, bounds in zip(t.balances, self.over_bounds)]
+        gpa_min, gpa_max, variance_min, variance_max = self.gpa_bounds
+        self.gpa_min = pulp.LpVariable('gpa_min', *gpa_min)
+        self.gpa_max = pulp.LpVariable('gpa_max', *gpa_max)
+        self.gpa_variance_min = pulp.LpVariable('gpa_variance_min',
+                                                *variance_min)
+        self.gpa_variance_max = pulp.LpVariable('gpa_variance_max',
+                                                *variance_max)
+
+        # ====================================================================
+        #   Objective Function
+
+        self.problem += self._objective(), 'objective'
+
+    def _objective(self):
+        t = self.targets
+        w = self.weights
+        slack = []
+        for balance, short, over in zip(t.balances, self.artificial_min,
+                                        self.artificial_max):
+            penalty = ARTIFICIAL_PENALTY * w.get(balance.attribute.weight,
+                                                 1.0)
+            slack.extend((variable, penalty) for variable in short.values())
+            slack.extend((variable, penalty) for variable in over.values())
+        return (
+            w['gpamean'] * (self.gpa_max - self.gpa_min)
+            + w['gpavar'] * (self.gpa_variance_max - self.gpa_variance_min)
+            + pulp.LpAffineExpression(slack)
+        )
+
+    def set_weights(self, weights):
+        """Change the weighting factors, which only rebuilds the objective."""
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.problem.setObjective(self._objective())
+        self.problem.objective.name = 'objective'
+
+    def _add_assignment(self):
+        roster = self.roster
+        t = self.targets
+        problem = self.problem
+        students = roster.students
+        groups = t.groups
+
+        # x = 1 if student s is assigned to group g, else 0
+        self.x = x = VariableGrid('x', students, groups, pulp.LpBinary)
+
+        # ====================================================================
+        #   Constraints
+
+        # Every student is assigned to exactly one group
+        for s in students:
+            problem += pulp.LpAffineExpression(
+                [(variable, 1) for variable in x.row(s)]) == 1, \
+                'single_group_%d' % s
+
+        for g in groups:
+            m = t.size(g)
+            column = [x[(s, g)] for s in students]
+
+            # Size of group is m1 or m2
+            problem += pulp.LpAffineExpression(
+                [(variable, 1) for variable in column]) == m, 'size_g%d' % g
+
+            # Minimum and maximum GPA are given by the groups with the
+            # lowest and highest GPA
+            group_gpa = pulp.LpAffineExpression(zip(column, roster.gpa))
+            self._add_gpa_bounds(g, group_gpa, pulp.LpAffineExpression(
+                zip(column, t.gpa_deviation)))
+
+        # The k-th student can only be in the first k groups of each size
+        if self.symmetry_breaking:
+            for size_groups in (t.groups1, t.groups2):
+                for k, s in enumerate(students[:len(size_groups) - 1]):
+                    for g in size_groups[k + 1:]:
+                        x[(s, g)].upBound = 0
+
+    def _add_gpa_bounds(self, g, group_gpa, group_deviation):
+        problem = self.problem
+        m = self.targets.size(g)
+        problem += group_gpa >= m * self.gpa_min, \
+            'calculate_min_gpa_g%d' % g
+        problem += group_gpa <= m * self.gpa_max, \
+            'calculate_max_gpa_g%d' % g
+
+        # Minimum and maximum variance of GPA are given by the groups
+        # with the lowest and highest variance
+        problem += group_deviation >= m * self.gpa_variance_min, \
+            'calculate_gpa_variance_min_g%d' % g
+        problem += group_deviation <= m * self.gpa_variance_max, \
+            'calculate_gpa_variance_max_g%d' % g
+
+    def _count(self, students, g):
+        """Expression for the number of ``students`` in group ``g``."""
+        x = self.x
+        return pulp.LpAffineExpression([(x[(s, g)], 1) for s in students])
+
+    def _add_balance(self):
+        t = self.targets
+        problem = self.problem
+
+        # Semi-relaxed constraints to enforce the distribution of every
+        # category of every balanced attribute: at least the minimum and
+        # at most any maximum, where presolve kept them
+        for g in t.groups:
+            for balance, short, over in zip(t.balances, self.artificial_min,
+                                            self.artificial_max):
+                if g in short:
+                    problem += self._count(balance.students, g) + \
+                        short[g] >= balance.minimum, \
+                        balance.constraint('min', g)
+                if g in over:
+                    problem += self._count(balance.students, g) - \
+                        over[g] <= balance.maximum, \
+                        balance.constraint('max', g)
+
+    # ========================================================================
+    #   Starting solution
+
+    def set_start(self, groups):
+        """Give the solver the allocation ``groups`` as its first incumbent.
+
+        Every variable is set to its value in that allocation: x, the GPA
+        and variance bounds and the artificial variables. ``groups`` must
+        respect the group sizes; it is relabelled if needed to satisfy the
+        symmetry breaking.
+        """
+        t = self.targets
+        if self.symmetry_breaking:
+            groups = self._relabel(groups)
+        members = dict((g, list()) for g in t.groups)
+        for s, g in enumerate(groups):
+            members[g].append(s)
+        for g in t.groups:
+            if len(members[g]) != t.size(g):
+                raise ValueError('Group %d has %d students instead of %d'
+                                 % (g, len(members[g]), t.size(g)))
+
+        self._set_assignment_start(groups)
+
+        gpa_mean = [sum(self.roster.gpa[s] for s in members[g]) / t.size(g)
+                    for g in t.groups]
+        gpa_variance = [sum(t.gpa_deviation[s] for s in members[g]) /
+                        t.size(g) for g in t.groups]
+        self.gpa_min.setInitialValue(min(gpa_mean))
+        self.gpa_max.setInitialValue(max(gpa_mean))
+        self.gpa_variance_min.setInitialValue(min(gpa_variance))
+        self.gpa_variance_max.setInitialValue(max(gpa_variance))
+
+        for balance, short, over in zip(t.balances, self.artificial_min,
+                                        self.artificial_max):
+            counts = dict((g, 0) for g in t.groups)
+            for s in balance.students:
+                counts[groups[s]] += 1
+            for g in short:
+                short[g].setInitialValue(max(0, balance.minimum - counts[g]))
+            for g in over:
+                over[g].setInitialValue(max(0, counts[g] - balance.maximum))
+        self.warm_start = True
+
+    def _set_assignment_start(self, groups):
+        for (s, g), variable in self.x.items():
+            variable.setInitialValue(1 if groups[s] == g else 0)
+
+    def _relabel(self, groups):
+        """Number the groups of each size in order of their first member."""
+        t = self.targets
+        relabel = {}
+        next_label = {t.m1: 1, t.m2: t.j1 + 1}
+        for g in groups:
+            if g not in relabel:
+                relabel[g] = next_label[t.size(g)]
+                next_label[t.size(g)] += 1
+        return [relabel[g] for g in groups]
+
+    # ========================================================================
+    #   Solve
+
+    def solve(self, time_limit=None, msg=False, seed=None, log_path=None,
+              gap=None, gap_abs=None, stall=None, target=None,
+              on_incumbent=None, solver=None, threads=None):
+        """Solve with ``solver`` and return the PuLP status string.
+
+        ``solver`` names one of the ``solvers.SOLVERS`` (CBC if None) or
+        is a ``solvers.Backend``. It stops at the first of ``time_limit``
+        seconds, a relative ``gap`` or absolute ``gap_abs`` between the
+        incumbent and the best bound, ``stall`` seconds without a better
+        incumbent, and an incumbent objective of ``target`` or less, and
+        ``stop_reason`` says which. ``threads`` is the number of threads
+        it may use (its own default if None) and ``seed`` the random seed
+        of its heuristics and cuts. Its log is written to ``log_path`` (a
+        temporary file if None) and shown with ``msg``, and ``solver_log``
+        holds what the backend's ``read_log`` finds in it, with the solver
+        and threads, and the seconds CBC took to stop after it was
+        interrupted (``interrupt_delay``). ``on_incumbent`` is called with
+        the objective of each better incumbent as CBC reports it; the
+        stall and target rules and ``on_incumbent`` are only for CBC.
+        """
+        engine = backend(solver)
+        if not engine.follows_incumbents and (
+                stall is not None or target is not None or
+                on_incumbent is not None):
+            warnings.warn('Only CBC reports its incumbents as it runs; the '
+                          'stall and objective target rules do not apply '
+                          'to %s' % engine.title)
+            stall = target = on_incumbent = None
+        if (stall is not None or target is not None) and os.name == 'nt':
+            warnings.warn('The stall and objective target rules interrupt '
+                          'CBC, which is not possible on Windows; only the '
+                          'time limit and gaps apply')
+            stall = target = None
+        if log_path is None:
+            handle, path = tempfile.mkstemp(suffix='.log')
+            os.close(handle)
+        else:
+            path = log_path
+        if os.path.exists(path):
+            os.remove(path)
+        monitor = _SolverMonitor(path, msg, stall, target, on_incumbent)
+        try:
+            status = self._run(engine, monitor, time_limit, threads, seed,
+                               gap, gap_abs, path)
+            self.solver_log = engine.read_log(path)
+        finally:
+            if log_path is None and os.path.exists(path):
+                os.remove(path)
+        self.solver_log.update(solver=engine.name, threads=threads)
+        if monitor.interrupted is not None:
+            self.solver_log['interrupt_delay'] = \
+                round(time.time() - monitor.interrupted, 3)
+        self.stop_reason = monitor.reason or \
+            stop_reason(self.solver_log['result'])
+        return status
+
+    def _run(self, engine, monitor, time_limit, threads, seed, gap, gap_abs,
+             path):
+        """Run ``engine`` on the program, following its log at ``path``
+        with ``monitor``, and return the PuLP status string."""
+        with monitor.following():
+            engine.solve(self.problem, monitor, time_limit, threads, seed,
+                         gap, gap_abs, self.warm_start, path)
+        return pulp.LpStatus[self.problem.status]
+
+    def size(self):
+        """Rows, columns, integer columns and nonzeros of the model."""
+        variables = self.problem.variables()
+        return {
+            'rows': len(self.problem.constraints),
+            'columns': len(variables),
+            'integer_columns': sum(1 for v in variables
+                                   if v.cat == pulp.LpInteger),
+            'nonzeros': sum(len(constraint) for constraint
+                            in self.problem.constraints.values()),
+        }
+
+    def assignment(self, tolerance=ASSIGNMENT_TOLERANCE):
+        """Group of each student in the solution, indexed by student.
+
+        The values of x are read in one pass, student by student, and each
+        student goes to the group where its x is largest if that is over
+        one half, else to None. Students without a clear group (see
+        ASSIGNMENT_TOLERANCE) are listed in ``unclear``.
+        """
+        t = self.targets
+        number_groups = t.number_groups
+        values = self._x_values()
+        groups = [None] * t.number_students
+        self.unclear = []
+        for s in self.roster.students:
+            row = values[s * number_groups:(s + 1) * number_groups]
+            if None in row:
+                self.unclear.append(s)
+                continue
+            largest = max(row)
+            if largest > 0.5:
+                groups[s] = t.groups[row.index(largest)]
+            if largest < 1 - tolerance or sum(row) - largest > tolerance:
+                self.unclear.append(s)
+        return groups
+
+    def _x_values(self):
+        """Values of x in the solution, student by student (None if the
+        solver gave none)."""
+        return [variable.varValue for variable in self.x.values()]
+
+    def objective(self):
+        return pulp.value(self.problem.objective)
+
+    def relaxation(self):
+        """Totals of the artificial variables of the relaxed constraints."""
+        t = self.targets
+        totals = dict((name, 0) for name in t.relaxation_names)
+        for balance, short, over in zip(t.balances, self.artificial_min,
+                                        self.artificial_max):
+            for bound, variables in (('min', short), ('max', over)):
+                if variables:
+                    totals[balance.relaxation(bound)] += sum(
+                        v.value() or 0 for v in variables.values())
+        return [(name, totals[name]) for name in t.relaxation_names]
+
+
+# Incumbents in the CBC log: those of branch and bound and a warm start,
+# the solutions of the heuristics as they find them (Cbc0038I, before CBC
+# reports them as integer solutions) and the best solution of its progress
+# lines
+INCUMBENT = re.compile(
+    r'(?:Integer solution of|solution with cost|Solution found of|'
+    r'Relaxing continuous gives|improved solution from \S+ to|'
+    r'gives a solution of|Rounding solution of|Cleaned solution of|'
+    r'exiting with objective of|best objective) '
+    r'([-+]?[0-9.]+(?:e[-+]?[0-9]+)?)'
+    r'|([-+]?[0-9.]+(?:e[-+]?[0-9]+)?) best solution,')
+
+# Objective CBC reports when it has no solution
+CBC_INFINITY = 1e50
+
+
+class _LoggedProcess(subprocess.Popen):
+    """CBC writing to a pseudo-terminal; waits for the log to be copied."""
+
+    copier = None
+
+    def wait(self, timeout=None):
+        code = subprocess.Popen.wait(self, timeout)
+        if self.copier is not None:
+            self.copier.join()
+        return code
+
+
+def _copy(master, log):
+    """Copy the output of a pseudo-terminal to the file ``log``."""
+    try:
+        while True:
+            try:
+                data = os.read(master, 65536)
+            except OSError:
+                # The terminal closes when CBC exits
+                break
+            if not data:
+                break
+            log.write(data.decode('utf-8', 'replace').replace('\r\n', '\n'))
+            log.flush()
+    finally:
+        os.close(master)
+
+
+class _SolverMonitor(object):
+    """Follows the CBC log while CBC runs.
+
+    The log is echoed with ``msg``. On a ``stall`` or reaching the
+    objective ``target`` CBC is interrupted, as with Ctrl-C, after which
+    it stops and returns its incumbent; so is it when the solve itself is
+    interrupted (see CbcBackend.run). CBC only looks for the interrupt
+    between steps of its search, and a heuristic such as the feasibility
+    pump can run on for many seconds first; ``interrupted`` is the time
+    it was interrupted. CBC is run by ``start`` so the monitor has hold
+    of the process; the log of any other solver is only followed.
+    """
+
+    def __init__(self, path, msg=False, stall=None, target=None,
+                 on_incumbent=None):
+        self.path = path
+        self.msg = msg
+        self.stall = stall
+        self.target = target
+        self.on_incumbent = on_incumbent
+        self.process = None
+        self.reason = None
+        self.interrupted = None
+        self.incumbent = None
+        self.improved = None
+        self._stop = threading.Event()
+
+    def start(self, command, log):
+        """Run ``command`` writing to the open file ``log``."""
+        if pty is None:
+            self.process = subprocess.Popen(command, stdout=log, stderr=log,
+                                            stdin=subprocess.DEVNULL)
+            return self.process
+        # CBC buffers its output to a file until it finishes, but not to a
+        # terminal, so it writes to a pseudo-terminal copied to the log
+        master, slave = pty.openpty()
+        try:
+            self.process = _LoggedProcess(command, stdout=slave,
+                                          stderr=slave,
+                                          stdin=subprocess.DEVNULL)
+        except Exception:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        self.process.copier = threading.Thread(target=_copy,
+                                               args=(master, log))
+        self.process.copier.start()
+        return self.process
+
+    @contextmanager
+    def following(self):
+        """Follow the log until the block ends."""
+        follower = threading.Thread(target=self._follow)
+        follower.start()
+        try:
+            yield
+        finally:
+            self._stop.set()
+            follower.join()
+
+    def _follow(self):
+        position = 0
+        pending = ''
+        while True:
+            finished = self._stop.is_set()
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    f.seek(position)
+                    text = f.read()
+                    position = f.tell()
+                if text and self.msg:
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+                lines = (pending + text).split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    match = INCUMBENT.search(line)
+                    if match:
+                        value = float(match.group(1) or match.group(2))
+                        if abs(value) < CBC_INFINITY:
+                            self._incumbent(value)
+            if finished:
+                return
+            self._check()
+            self._stop.wait(0.2)
+
+    def _incumbent(self, value):
+        if self.incumbent is None or value < self.incumbent - 1e-9:
+            self.incumbent = value
+            self.improved = time.time()
+            if self.on_incumbent is not None:
+                self.on_incumbent(value)
+
+    def _check(self):
+        if self.reason or self.incumbent is None or self.process is None \
+                or self.process.poll() is not None:
+            return
+        if self.target is not None and self.incumbent <= self.target:
+            self.interrupt('objective target')
+        elif self.stall is not None and \
+                time.time() - self.improved >= self.stall:
+            self.interrupt('stall')
+
+    def interrupt(self, reason):
+        """Stop the solver as Ctrl-C would, for ``reason``."""
+        if self.reason is None:
+            self.reason = reason
+        if self.process is not None and self.process.poll() is None:
+            if self.interrupted is None:
+                self.interrupted = time.time()
+            self.process.send_signal(signal.SIGINT)
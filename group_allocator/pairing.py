@@ -0,0 +1,237 @@
+# ============================================================================
+# Group Allocator - students kept together or apart
+#
+# Some students must share a group (accessibility partners) and some must
+# not (previous conflicts, last term's teammates). Students kept together
+# are merged by union-find into components, and the model has one binary
+# per component and group instead of one per student, weighted by the
+# students of the component in every count and GPA sum. So each rule that
+# keeps students together makes the model smaller. Students kept apart
+# need one constraint per group and line of the file, over the components
+# on that line.
+# ============================================================================
+import csv
+from collections import Counter
+
+import pulp
+
+from group_allocator.model import ASSIGNMENT_TOLERANCE, Model, \
+    VariableGrid
+
+
+class UnionFind(object):
+    """Disjoint sets of 0 .. size - 1, by size with path halving."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, a):
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+def read_pairs(path):
+    """Lines of student IDs from a CSV file, one rule per line; blank cells
+    and lines are skipped."""
+    with open(path, newline='') as f:
+        lines = [[cell.strip() for cell in row] for row in csv.reader(f)]
+    return [[cell for cell in line if cell] for line in lines
+            if any(line)]
+
+
+class Pairing(object):
+    """Students of ``roster`` kept ``together`` and ``apart``, each a list
+    of lines of student IDs: the students of a line of ``together`` share a
+    group and no two of a line of ``apart`` do.
+
+    ``components`` holds the students of each component, with the
+    component of each student in ``component``; ``apart`` holds the
+    distinct components of each line kept apart.
+    """
+
+    def __init__(self, roster, together=(), apart=()):
+        position = dict((i, s) for s, i in enumerate(roster.ids))
+
+        def students(line):
+            unknown = [i for i in line if i not in position]
+            if unknown:
+                raise ValueError('No student with ID %s' % ', '.join(unknown))
+            return [position[i] for i in line]
+
+        sets = UnionFind(roster.number_students)
+        for line in together:
+            line = students(line)
+            for s in line[1:]:
+                sets.union(line[0], s)
+        roots = {}
+        self.component = [roots.setdefault(sets.find(s), len(roots))
+                          for s in roster.students]
+        self.components = [list() for _ in roots]
+        for s, c in enumerate(self.component):
+            self.components[c].append(s)
+
+        self.apart = []
+        for line in apart:
+            line = students(line)
+            components = [self.component[s] for s in line]
+            if len(set(components)) < len(components):
+                raise ValueError('Students %s are kept both together and '
+                                 'apart' % ', '.join(roster.ids[s]
+                                                     for s in line))
+            if len(components) > 1:
+                self.apart.append(sorted(components))
+
+    def violations(self, groups):
+        """Lines of students split up or put together against the rules,
+        as lists of students."""
+        broken = [members for members in self.components
+                  if len(set(groups[s] for s in members)) > 1]
+        for line in self.apart:
+            used = Counter(groups[self.components[c][0]] for c in line)
+            if max(used.values()) > 1:
+                broken.append([s for c in line for s in self.components[c]])
+        return broken
+
+
+class PairedModel(Model):
+    """The ENGGEN403 model over the components of ``pairing``.
+
+    x[(c, g)] is 1 if the students of component c are in group g; every
+    count and GPA sum weights it by the students of c. Students kept apart
+    add at most one of their components to each group. There is no
+    symmetry breaking.
+    """
+
+    def __init__(self, roster, number_groups, pairing, weights=None):
+        self.pairing = pairing
+        self._count_components = {}
+        Model.__init__(self, roster, number_groups, weights)
+
+    def _add_assignment(self):
+        roster = self.roster
+        t = self.targets
+        problem = self.problem
+        components = self.pairing.components
+        groups = t.groups
+
+        # x = 1 if the students of component c are assigned to group g
+        self.x = x = VariableGrid('x', range(len(components)), groups,
+                                  pulp.LpBinary)
+        for c, members in enumerate(components):
+            problem += pulp.LpAffineExpression(
+                [(variable, 1) for variable in x.row(c)]) == 1, \
+                'single_group_%d' % c
+            if len(members) > max(t.size(g) for g in groups):
+                raise ValueError('%d students kept together do not fit in '
+                                 'a group' % len(members))
+
+        size = [len(members) for members in components]
+        gpa = [sum(roster.gpa[s] for s in members) for members in components]
+        deviation = [sum(t.gpa_deviation[s] for s in members)
+                     for members in components]
+        for g in groups:
+            column = [x[(c, g)] for c in range(len(components))]
+            problem += pulp.LpAffineExpression(zip(column, size)) == \
+                t.size(g), 'size_g%d' % g
+            self._add_gpa_bounds(g, pulp.LpAffineExpression(zip(column, gpa)),
+                                 pulp.LpAffineExpression(zip(column,
+                                                             deviation)))
+
+            # At most one component of each line kept apart
+            for i, line in enumerate(self.pairing.apart):
+                problem += pulp.LpAffineExpression(
+                    [(x[(c, g)], 1) for c in line]) <= 1, \
+                    'apart_%d_g%d' % (i, g)
+
+    def _count(self, students, g):
+        key = id(students)
+        if key not in self._count_components:
+            self._count_components[key] = (students, sorted(Counter(
+                self.pairing.component[s] for s in students).items()))
+        return pulp.LpAffineExpression(
+            [(self.x[(c, g)], n) for c, n in self._count_components[key][1]])
+
+    def _set_assignment_start(self, groups):
+        for (c, g), variable in self.x.items():
+            variable.setInitialValue(
+                1 if groups[self.pairing.components[c][0]] == g else 0)
+
+    def set_start(self, groups):
+        """As ``Model.set_start``; ``groups`` must keep to the pairing."""
+        if self.pairing.violations(groups):
+            raise ValueError('The start splits students kept together or '
+                             'joins students kept apart')
+        Model.set_start(self, groups)
+
+    def assignment(self, tolerance=ASSIGNMENT_TOLERANCE):
+        """Group of each student, indexed by student, from the group of its
+        component (see ``Model.assignment``)."""
+        t = self.targets
+        number_groups = t.number_groups
+        values = [variable.varValue for variable in self.x.values()]
+        groups = [None] * t.number_students
+        self.unclear = []
+        for c, members in enumerate(self.pairing.components):
+            row = values[c * number_groups:(c + 1) * number_groups]
+            if None in row:
+                self.unclear.extend(members)
+                continue
+            largest = max(row)
+            if largest > 0.5:
+                for s in members:
+                    groups[s] = t.groups[row.index(largest)]
+            if largest < 1 - tolerance or sum(row) - largest > tolerance:
+                self.unclear.extend(members)
+        self.unclear.sort()
+        return groups
+
+
+def paired_draft(roster, targets, pairing):
+    """An allocation that keeps to ``pairing``, for a warm start.
+
+    Components are placed largest first, then by decreasing GPA, each in
+    the group with the most room left that has room for it and none of the
+    components it is kept apart from, the lowest GPA total breaking ties.
+    """
+    apart = [set() for _ in pairing.components]
+    for line in pairing.apart:
+        for c in line:
+            apart[c].update(line)
+            apart[c].discard(c)
+    room = dict((g, targets.size(g)) for g in targets.groups)
+    gpa_total = dict((g, 0.0) for g in targets.groups)
+    placed = {}
+    groups = [None] * roster.number_students
+    order = sorted(range(len(pairing.components)), key=lambda c: (
+        -len(pairing.components[c]),
+        -sum(roster.gpa[s] for s in pairing.components[c])))
+    for c in order:
+        members = pairing.components[c]
+        taken = set(placed[d] for d in apart[c] if d in placed)
+        choices = [g for g in targets.groups
+                   if room[g] >= len(members) and g not in taken]
+        if not choices:
+            raise ValueError('No allocation keeps to the students kept '
+                             'together and apart')
+        g = min(choices, key=lambda g: (-room[g], gpa_total[g], g))
+        placed[c] = g
+        room[g] -= len(members)
+        for s in members:
+            groups[s] = g
+            gpa_total[g] += roster.gpa[s]
+    return groups
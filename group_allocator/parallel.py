@@ -0,0 +1,149 @@
+# ============================================================================
+# Group Allocator - parallel multi-start
+#
+# Runs several independent solves of the same cohort in a process pool, one
+# per core, and keeps the best. Each start numbers the students in its own
+# random order and uses its own seed for CBC, the snake draft and the local
+# search, so the starts explore different parts of the search space.
+# ============================================================================
+import math
+import multiprocessing
+import random
+import time
+
+from group_allocator.aggregate import GPA_BUCKET, AggregateModel
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import Model, Targets
+from group_allocator.score import Scorer
+from group_allocator.search import LocalSearch
+
+
+class Start(object):
+    """Result of one start: its number, solver status, objective (None if
+    no allocation was found), allocation, wall time in seconds and the rule
+    that stopped the solver or search."""
+
+    def __init__(self, start, status, objective, groups, seconds,
+                 stop_reason=None):
+        self.start = start
+        self.status = status
+        self.objective = objective
+        self.groups = groups
+        self.seconds = seconds
+        self.stop_reason = stop_reason
+
+
+def solve_start(roster, number_groups, start, weights=None, mode='mip',
+                time_limit=None, symmetry_breaking=False, warm_start=False,
+                aggregate=False, gpa_bucket=GPA_BUCKET, stopping=None):
+    """Solve one start and return its ``Start``.
+
+    Start 0 keeps the roster order; every other start shuffles the
+    students with ``start`` as the seed. The allocation is returned in the
+    order of ``roster``. With ``aggregate`` the MIP is the
+    ``AggregateModel``, and the objective is that of its allocation.
+    ``stopping`` holds the ``STOPPING_RULES`` and ``SOLVER_SETTINGS``
+    given to ``Model.solve``, of which the search takes ``stall`` and
+    ``target``.
+    """
+    stopping = stopping or {}
+    began = time.time()
+    order = list(roster.students)
+    if start:
+        random.Random(start).shuffle(order)
+        roster = roster.reordered(order)
+    if mode == 'search':
+        targets = Targets(roster, number_groups)
+        search = LocalSearch(roster, targets,
+                             snake_draft(roster, targets, seed=start),
+                             weights, seed=start)
+        groups = search.run(time_limit or 10.0,
+                            stall=stopping.get('stall'),
+                            target=stopping.get('target'))
+        status = 'Searched'
+        objective = search.best_objective
+        stop_reason = search.stop_reason
+    else:
+        if aggregate:
+            model = AggregateModel(roster, number_groups, weights,
+                                   gpa_bucket=gpa_bucket)
+        else:
+            model = Model(roster, number_groups, weights,
+                          symmetry_breaking=symmetry_breaking)
+        if warm_start:
+            model.set_start(snake_draft(roster, model.targets,
+                                        seed=start or None))
+        status = model.solve(time_limit, seed=start or None, **stopping)
+        stop_reason = model.stop_reason
+        groups = model.assignment()
+        if None in groups:
+            objective = None
+        elif aggregate:
+            objective = Scorer(roster, number_groups,
+                               weights).score(groups).objective
+        else:
+            objective = model.objective()
+    allocation = [None] * len(order)
+    for s, g in zip(order, groups):
+        allocation[s] = g
+    return Start(start, status, objective, allocation, time.time() - began,
+                 stop_reason)
+
+
+def _solve_start(arguments):
+    return solve_start(*arguments)
+
+
+def solve_all(arguments, processes=None):
+    """``solve_start`` each tuple of ``arguments``, ``processes`` at a time
+    (default one per core), and return the results in the same order."""
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(arguments)))
+    if processes == 1:
+        return [_solve_start(a) for a in arguments]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_solve_start, arguments, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def multi_start(roster, number_groups, starts, weights=None, mode='mip',
+                time_limit=None, symmetry_breaking=False, warm_start=False,
+                aggregate=False, gpa_bucket=GPA_BUCKET, processes=None,
+                stopping=None):
+    """Solve ``starts`` starts, ``processes`` at a time (default one per
+    core), each under ``time_limit`` and the ``stopping`` rules.
+
+    Returns the ``Start`` of every start, best objective first.
+    """
+    results = solve_all([(roster, number_groups, start, weights, mode,
+                          time_limit, symmetry_breaking, warm_start,
+                          aggregate, gpa_bucket, stopping)
+                         for start in range(starts)],
+                        processes)
+    results.sort(key=lambda result: (result.objective is None,
+                                     result.objective, result.start))
+    return results
+
+
+def spread(results):
+    """Best, median, mean, worst and standard deviation of the objectives
+    of the starts that found an allocation, as a dictionary."""
+    objectives = sorted(result.objective for result in results
+                        if result.objective is not None)
+    if not objectives:
+        return {}
+    n = len(objectives)
+    mean = sum(objectives) / n
+    if n % 2:
+        median = objectives[n // 2]
+    else:
+        median = (objectives[n // 2 - 1] + objectives[n // 2]) / 2.0
+    return {'best': objectives[0], 'median': median, 'mean': mean,
+            'worst': objectives[-1],
+            'stdev': math.sqrt(sum((value - mean) ** 2
+                                   for value in objectives) / n),
+            'found': n}
@@ -0,0 +1,182 @@
+# ============================================================================
+# Group Allocator - summary of an allocation and file reports
+# ============================================================================
+import csv
+import os
+
+from group_allocator.stats import GroupStatistics
+
+# Domain of the university email address built from each student's UPI
+EMAIL_DOMAIN = 'aucklanduni.ac.nz'
+
+
+class Summary(object):
+    """Per-group statistics of an allocation, as on Summary_Results.
+
+    ``extra`` lists the categories of each further attribute of the
+    roster, as (name, categories) pairs, counted after the ethnicities.
+    """
+
+    def __init__(self, roster, groups, number_groups):
+        self.roster = roster
+        self.groups = groups
+        self.group_numbers = range(1, int(number_groups) + 1)
+        self.specialisations = roster.categories('specialisation')
+        self.ethnicities = roster.categories('ethnicity')
+        self.extra = [(name, roster.categories(name))
+                      for name in roster.extra]
+
+        # Make list to hold groups
+        self.students_in_group = dict((g, list()) for g in self.group_numbers)
+        for s in roster.students:
+            if groups[s] not in self.students_in_group:
+                raise ValueError('Student %s is not allocated to one of '
+                                 'groups 1 to %d' % (roster.ids[s],
+                                                     number_groups))
+            self.students_in_group[groups[s]].append(s)
+
+        # Counts, GPA mean, variance and box plot of every group at once
+        attributes = [('gender', ['male', 'female']),
+                      ('specialisation', self.specialisations),
+                      ('ethnicity', self.ethnicities)] + self.extra
+        self.statistics = GroupStatistics(
+            groups, roster.gpa, number_groups,
+            [roster.codes(attribute, categories)
+             for attribute, categories in attributes],
+            [len(categories) for _, categories in attributes])
+        self.males = self._counts(0, ['male'])['male']
+        self.females = self._counts(0, ['male', 'female'])['female']
+        self.specialisation_counts = self._counts(1, self.specialisations)
+        self.ethnicity_counts = self._counts(2, self.ethnicities)
+        self.extra_counts = dict((name, self._counts(3 + a, categories))
+                                 for a, (name, categories)
+                                 in enumerate(self.extra))
+        self.gpa_mean = dict((g, self.statistics.mean[g])
+                             for g in self.group_numbers)
+        self.gpa_variance = dict((g, self.statistics.variance[g])
+                                 for g in self.group_numbers)
+        self.box_plot = dict((g, self.statistics.box_plot[g])
+                             for g in self.group_numbers)
+
+        self.class_gpa_mean = sum(roster.gpa) / roster.number_students
+        self.class_gpa_variance = sum(pow(value - self.class_gpa_mean, 2)
+                                      for value in roster.gpa) \
+            / roster.number_students
+
+    def _counts(self, a, categories):
+        return dict((category, dict((g, self.statistics.count(a, k, g))
+                                    for g in self.group_numbers))
+                    for k, category in enumerate(categories))
+
+    def extra_columns(self):
+        """(name, category) of each column of the extra attributes."""
+        return [(name, category) for name, categories in self.extra
+                for category in categories]
+
+    def sizes(self):
+        return dict((g, len(self.students_in_group[g]))
+                    for g in self.group_numbers)
+
+    # ========================================================================
+    #   Tables (lists of rows) shared by the file and Excel reports
+
+    def table(self):
+        """Group, student, gender, GPA and category counts per group."""
+        rows = [['Group', 'Students', 'Males', 'Females', 'Mean GPA',
+                 'GPA Variance'] + self.specialisations + self.ethnicities
+                + ['%s: %s' % column for column in self.extra_columns()]]
+        rows.append(['Whole Class', self.roster.number_students,
+                     sum(self.males.values()), sum(self.females.values()),
+                     '%.2f' % self.class_gpa_mean,
+                     '%.2f' % self.class_gpa_variance]
+                    + [sum(self.specialisation_counts[k].values())
+                       for k in self.specialisations]
+                    + [sum(self.ethnicity_counts[e].values())
+                       for e in self.ethnicities]
+                    + [sum(self.extra_counts[name][k].values())
+                       for name, k in self.extra_columns()])
+        sizes = self.sizes()
+        for g in self.group_numbers:
+            rows.append([g, sizes[g], self.males[g], self.females[g],
+                         '%.2f' % self.gpa_mean[g],
+                         '%.2f' % self.gpa_variance[g]]
+                        + [self.specialisation_counts[k][g]
+                           for k in self.specialisations]
+                        + [self.ethnicity_counts[e][g]
+                           for e in self.ethnicities]
+                        + [self.extra_counts[name][k][g]
+                           for name, k in self.extra_columns()])
+        return rows
+
+    def box_plot_table(self):
+        """GPA quartiles of each group and the differences charted."""
+        rows = [['gpa_min', 'gpa_q1', 'gpa_median', 'gpa_q3', 'gpa_max',
+                 'gpa_d_min', 'gpa_d_q1', 'gpa_d_median', 'gpa_d_q3',
+                 'gpa_d_max']]
+        for g in self.group_numbers:
+            rows.append(['%.2f' % value for value in
+                         self.box_plot[g] +
+                         self.statistics.box_plot_deltas(g)])
+        return rows
+
+    def group_list(self, group=None):
+        """Student View rows of every group, or only of ``group``."""
+        roster = self.roster
+        rows = [['Group', 'Name', 'UPI', 'Discipline', 'UoA Email']]
+        for g in self.group_numbers:
+            if group is not None and g != group:
+                continue
+            for s in self.students_in_group[g]:
+                rows.append([g, roster.names[s], roster.upi[s],
+                             roster.specialisation[s],
+                             '%s@%s' % (roster.upi[s], EMAIL_DOMAIN)])
+        return rows
+
+
+def allocation_table(roster, groups):
+    """The roster laid out like Student_Data with the allocated groups,
+    followed by the extra attributes, so it can be read back with them."""
+    extra = list(roster.extra.items())
+    rows = [['ID', 'Name', 'Gender', 'Ethnic Group', 'Cumulative GPA', 'UPI',
+             'Specialisation', 'Allocated Group'] +
+            [name for name, _ in extra]]
+    for s in roster.students:
+        rows.append([roster.ids[s], roster.names[s], roster.gender[s],
+                     roster.ethnicity[s], roster.gpa[s], roster.upi[s],
+                     roster.specialisation[s], groups[s]] +
+                    [column[s] for _, column in extra])
+    return rows
+
+
+# ============================================================================
+# File reports
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def write_results(output_dir, summary):
+    """Write the allocation, summary and group lists as CSV files.
+
+    Returns the paths written.
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    # Summary table with the box plot columns alongside; the Whole Class
+    # row has no box plot
+    table = summary.table()
+    box_plot = summary.box_plot_table()
+    summary_rows = [table[0] + box_plot[0], table[1]] + \
+        [row + box for row, box in zip(table[2:], box_plot[1:])]
+    files = [
+        ('allocation.csv', allocation_table(summary.roster, summary.groups)),
+        ('summary.csv', summary_rows),
+        ('groups.csv', summary.group_list()),
+    ]
+    paths = list()
+    for name, rows in files:
+        path = os.path.join(output_dir, name)
+        write_csv(path, rows)
+        paths.append(path)
+    return paths
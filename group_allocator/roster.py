@@ -0,0 +1,283 @@
+# ============================================================================
+# Group Allocator - student roster
+# ============================================================================
+import csv
+import os
+from array import array
+
+# Value used in the Student_Data sheet for a student without a
+# specialisation or ethnicity that should be balanced
+NOT_APPLICABLE = 'Not Applicable'
+
+# Column headings of the Student_Data sheet in Group_Allocator.xlsx and the
+# alternative spellings accepted for each (compared in lower case)
+COLUMNS = {
+    'id': ('id',),
+    'name': ('name',),
+    'gender': ('gender',),
+    'ethnicity': ('ethnic group', 'ethnicity'),
+    'gpa': ('cumulative gpa', 'gpa'),
+    'upi': ('upi',),
+    'specialisation': ('specialisation', 'specialization', 'discipline'),
+    'group': ('allocated group', 'group'),
+}
+
+REQUIRED_COLUMNS = ('id', 'gender', 'gpa')
+
+# Attributes balanced by every model, which extra attributes cannot be
+# named after
+BUILT_IN_ATTRIBUTES = ('gender', 'specialisation', 'ethnicity',
+                       'outstanding')
+
+
+class Categorical(object):
+    """A column of text values kept as small integer codes.
+
+    ``levels`` holds each distinct value once, in order of first
+    appearance, and ``codes`` the position in ``levels`` of the value of
+    each student. Indexing and iterating give the values.
+    """
+
+    __slots__ = ('levels', 'codes')
+
+    def __init__(self, values):
+        self.levels = []
+        position = {}
+        codes = []
+        for value in values:
+            k = position.get(value)
+            if k is None:
+                k = position[value] = len(self.levels)
+                self.levels.append(value)
+            codes.append(k)
+        self.codes = array('H' if len(self.levels) <= 0xFFFF else 'i', codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, s):
+        return self.levels[self.codes[s]]
+
+    def __iter__(self):
+        levels = self.levels
+        return (levels[k] for k in self.codes)
+
+
+class Roster(object):
+    """Students to allocate and the attributes balanced between groups.
+
+    Students are numbered 0 .. number_students - 1 and every attribute is
+    indexed by that number: ``gpa`` is an array of doubles, gender,
+    specialisation and ethnicity are ``Categorical`` and the rest lists.
+    ``groups`` holds an existing allocation (1-based group numbers, None if
+    unallocated). ``extra`` holds further attributes to balance, such as
+    campus or year of study, as (name, values) pairs; each is kept as a
+    ``Categorical`` in the dictionary ``extra``.
+    """
+
+    def __init__(self, ids, gpa, gender, specialisation=None, ethnicity=None,
+                 names=None, upi=None, groups=None, extra=None):
+        number_students = len(ids)
+        self.ids = list(ids)
+        self.gpa = array('d', [float(value) for value in gpa])
+        self.gender = Categorical(gender)
+        self.specialisation = Categorical(specialisation or
+                                          [NOT_APPLICABLE] * number_students)
+        self.ethnicity = Categorical(ethnicity or
+                                     [NOT_APPLICABLE] * number_students)
+        self.names = list(names or [''] * number_students)
+        self.upi = list(upi or [''] * number_students)
+        self.groups = list(groups or [None] * number_students)
+        self.extra = dict((name, Categorical(values))
+                          for name, values in dict(extra or {}).items())
+        for name in self.extra:
+            if name in BUILT_IN_ATTRIBUTES:
+                raise ValueError('%s is already balanced' % name)
+        for column in [self.gpa, self.gender, self.specialisation,
+                       self.ethnicity, self.names, self.upi, self.groups] + \
+                list(self.extra.values()):
+            if len(column) != number_students:
+                raise ValueError('Every roster column must have one entry '
+                                 'per student')
+        self._index = {}
+
+    @property
+    def number_students(self):
+        return len(self.ids)
+
+    @property
+    def students(self):
+        return range(self.number_students)
+
+    def column(self, attribute):
+        """The ``Categorical`` of ``attribute``, built in or extra."""
+        if attribute in self.extra:
+            return self.extra[attribute]
+        return getattr(self, attribute)
+
+    def index(self, attribute):
+        """Map each lowercased value of ``attribute`` to its students.
+
+        The index is built in a single pass over the codes the first time
+        it is asked for.
+        """
+        if attribute not in self._index:
+            column = self.column(attribute)
+            lists = [list() for level in column.levels]
+            for s, k in enumerate(column.codes):
+                lists[k].append(s)
+            index = {}
+            for value, students in zip(column.levels, lists):
+                if value.lower() in index:
+                    index[value.lower()] = sorted(index[value.lower()] +
+                                                  students)
+                else:
+                    index[value.lower()] = students
+            self._index[attribute] = index
+        return self._index[attribute]
+
+    def categories(self, attribute):
+        """Distinct values of ``attribute`` in order of first appearance.
+
+        Values differing only in case are treated as one category and
+        'Not Applicable' is left out.
+        """
+        seen = set([NOT_APPLICABLE.lower()])
+        categories = list()
+        for value in self.column(attribute).levels:
+            if value.lower() not in seen:
+                seen.add(value.lower())
+                categories.append(value)
+        return categories
+
+    def codes(self, attribute, categories):
+        """Position in ``categories`` of the ``attribute`` of each student,
+        ignoring case, or -1 if it is in none."""
+        column = self.column(attribute)
+        position = dict((category.lower(), k)
+                        for k, category in enumerate(categories))
+        recode = [position.get(value.lower(), -1) for value in column.levels]
+        return array('i', [recode[k] for k in column.codes])
+
+    def students_with(self, attribute, value):
+        """Students whose ``attribute`` equals ``value`` ignoring case."""
+        return self.index(attribute).get(value.lower(), [])
+
+    def outstanding(self, threshold):
+        """Students with a GPA of at least ``threshold``."""
+        return [s for s in self.students if self.gpa[s] >= threshold]
+
+    def reordered(self, order):
+        """The same students numbered in ``order`` (a list of students)."""
+        def pick(column):
+            return [column[s] for s in order]
+        return Roster(pick(self.ids), pick(self.gpa), pick(self.gender),
+                      pick(self.specialisation), pick(self.ethnicity),
+                      pick(self.names), pick(self.upi), pick(self.groups),
+                      [(name, pick(column))
+                       for name, column in self.extra.items()])
+
+
+# ============================================================================
+# Reading rosters from file
+
+def read_roster(path, sheet='Student_Data', attributes=()):
+    """Read a roster laid out like the Student_Data sheet.
+
+    ``path`` may be a CSV file or an XLSX workbook; for a workbook the
+    students are read from ``sheet``. Reading XLSX requires openpyxl.
+    ``attributes`` names further columns to balance, found by their
+    heading ignoring case; a blank cell is Not Applicable.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        rows = _read_xlsx(path, sheet)
+    elif extension in ('.csv', '.txt'):
+        rows = _read_csv(path)
+    else:
+        raise ValueError('Unsupported roster file %s (expected .csv or '
+                         '.xlsx)' % path)
+    return _parse_rows(rows, path, attributes)
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def _read_xlsx(path, sheet):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError('Reading XLSX rosters requires openpyxl '
+                          '(pip install openpyxl)')
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet not in workbook.sheetnames:
+            raise ValueError('Workbook %s has no sheet named %s'
+                             % (path, sheet))
+        return [list(row) for row in workbook[sheet].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_rows(rows, path, attributes=()):
+    if not rows:
+        raise ValueError('Roster %s is empty' % path)
+    header = [_text(value).lower() for value in rows[0]]
+    position = {}
+    for column, names in COLUMNS.items():
+        for name in names:
+            if name in header:
+                position[column] = header.index(name)
+                break
+    for column in REQUIRED_COLUMNS:
+        if column not in position:
+            raise ValueError('Roster %s has no %s column (expected one of: '
+                             '%s)' % (path, column,
+                                      ', '.join(COLUMNS[column])))
+    extra = []
+    for name in attributes:
+        if name.lower() not in header:
+            raise ValueError('Roster %s has no %s column' % (path, name))
+        extra.append((name, header.index(name.lower()), list()))
+
+    data = dict((column, list()) for column in COLUMNS)
+    for row_number, row in enumerate(rows[1:], 2):
+        values = [_text(value) for value in row]
+        values += [''] * (len(header) - len(values))
+        # Like the SolverStudio ranges, the data stops at the first row
+        # without a student ID
+        if values[position['id']] == '':
+            break
+        for column in COLUMNS:
+            if column in position:
+                data[column].append(values[position[column]])
+            else:
+                data[column].append('')
+        try:
+            data['gpa'][-1] = float(data['gpa'][-1])
+        except ValueError:
+            raise ValueError('Row %d of %s has an invalid GPA %r'
+                             % (row_number, path, data['gpa'][-1]))
+        for column in ('specialisation', 'ethnicity'):
+            if data[column][-1] == '':
+                data[column][-1] = NOT_APPLICABLE
+        group = data['group'][-1]
+        data['group'][-1] = int(float(group)) if group != '' else None
+        for _, column, cells in extra:
+            cells.append(values[column] or NOT_APPLICABLE)
+
+    return Roster(ids=data['id'], gpa=data['gpa'], gender=data['gender'],
+                  specialisation=data['specialisation'],
+                  ethnicity=data['ethnicity'], names=data['name'],
+                  upi=data['upi'], groups=data['group'],
+                  extra=[(name, values) for name, _, values in extra])
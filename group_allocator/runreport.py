@@ -0,0 +1,95 @@
+# ============================================================================
+# Group Allocator - run report
+#
+# Wall time and memory of each phase of a run (reading the roster,
+# building the model, solving, post-processing, writing results, Excel)
+# with the model size and solver outcome, written as JSON next to the
+# results so runs can be compared from term to term.
+# ============================================================================
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+REPORT_NAME = 'run_report.json'
+
+# The CBC log, written next to the report
+SOLVER_LOG = 'solver.log'
+
+
+def peak_memory():
+    """Peak resident memory in MB of this process and of the largest
+    finished child process (the solver); None where unknown."""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes, except on macOS where it is in bytes
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+class RunReport(object):
+    """Timings, memory and results of one run.
+
+    Wrap each phase in ``with report.phase(name):`` and add results with
+    ``update``; ``write`` saves the report as JSON.
+    """
+
+    def __init__(self, **settings):
+        self.began = time.time()
+        self.phases = []
+        self.values = {
+            'started': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': settings,
+        }
+
+    @contextmanager
+    def phase(self, name):
+        """Time the phase ``name``. The peak memory is the high-water
+        mark of the run so far, so the memory a phase used is its increase
+        over the peak at the start of the phase (0 if it stayed below an
+        earlier phase's peak)."""
+        began = time.time()
+        before = peak_memory()
+        try:
+            yield
+        finally:
+            after = peak_memory()
+            increase = [None if b is None else a - b
+                        for a, b in zip(after, before)]
+            self.phases.append({
+                'name': name,
+                'seconds': round(time.time() - began, 3),
+                'peak_memory_so_far_mb': after[0],
+                'peak_memory_increase_mb': increase[0],
+                'solver_peak_memory_so_far_mb': after[1],
+                'solver_peak_memory_increase_mb': increase[1],
+            })
+
+    def update(self, **values):
+        self.values.update(values)
+
+    def as_dict(self):
+        report = dict(self.values)
+        report['phases'] = list(self.phases)
+        report['total_seconds'] = round(time.time() - self.began, 3)
+        return report
+
+    def write(self, directory, name=REPORT_NAME):
+        """Write the report to ``directory`` and return its path."""
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+            f.write('\n')
+        return path
@@ -0,0 +1,146 @@
+# ============================================================================
+# Group Allocator - allocation scorer
+#
+# The ENGGEN403 objective of any allocation, wherever it came from: hand
+# edited groups, last year's groups or another tool. Students with the same
+# balanced categories share a profile, coded once. Each allocation is then
+# scored by one pass over the students for the GPA sums of each group, a
+# count of each group and profile pair (done by Counter in C), and one pass
+# over the counts of each category for the slack. Nothing is solved, so
+# millions of allocations can be scored.
+# ============================================================================
+from collections import Counter
+
+from group_allocator.model import ARTIFICIAL_PENALTY, DEFAULT_WEIGHTS, \
+    Targets
+
+
+class Score(object):
+    """Objective of an allocation and its parts, as the model has them.
+
+    ``gpa_min`` to ``variance_max`` are the lowest and highest group mean
+    GPA and GPA variance, ``relaxation`` the students short of each minimum
+    and over each maximum (as ``Model.relaxation``) and ``slack`` their
+    weighted total in the objective.
+    """
+
+    def __init__(self, objective, gpa_min, gpa_max, variance_min,
+                 variance_max, relaxation, slack):
+        self.objective = objective
+        self.gpa_min = gpa_min
+        self.gpa_max = gpa_max
+        self.variance_min = variance_min
+        self.variance_max = variance_max
+        self.relaxation = relaxation
+        self.slack = slack
+
+    def spreads(self):
+        """Biggest differences in group mean GPA and GPA variance."""
+        return (self.gpa_max - self.gpa_min,
+                self.variance_max - self.variance_min)
+
+
+class Scorer(object):
+    """Scores allocations of ``roster`` to ``number_groups`` groups under
+    ``weights`` (the defaults where not given).
+
+    ``targets`` replaces the targets of the roster, as for ``Model``. The
+    mean and variance of each group are over its students, so groups need
+    not be of the sizes the model would give them.
+    """
+
+    def __init__(self, roster, number_groups, weights=None, targets=None):
+        t = targets or Targets(roster, number_groups)
+        self.roster = roster
+        self.number_groups = t.number_groups
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        w = self.weights
+
+        # Balanced categories: the least and most of each a group should
+        # have (None if unbounded), the penalty per student outside and
+        # the relaxation totals the shortfall and excess are added to
+        self.relaxation_names = list(t.relaxation_names)
+        position = dict((name, i)
+                        for i, name in enumerate(self.relaxation_names))
+        self.limits = [(balance.minimum, balance.maximum,
+                        ARTIFICIAL_PENALTY *
+                        w.get(balance.attribute.weight, 1.0),
+                        position[balance.relaxation('min')],
+                        position.get(balance.relaxation('max')))
+                       for balance in t.balances]
+
+        profiles = {}
+        self.profiles = [profiles.setdefault(balances, len(profiles))
+                         for balances in t.incidence]
+        self.profile_categories = sorted(profiles, key=profiles.get)
+        self.gpa = list(roster.gpa)
+        self.deviation = list(t.gpa_deviation)
+
+    def allocation(self, mapping):
+        """Group of each student from ``mapping`` of student ID to group."""
+        missing = [i for i in self.roster.ids if i not in mapping]
+        if missing:
+            raise ValueError('No group for students %s'
+                             % ', '.join(str(i) for i in missing[:10]))
+        return [mapping[i] for i in self.roster.ids]
+
+    def score(self, groups):
+        """``Score`` of ``groups``, the group (1 to number_groups) of each
+        student indexed by student."""
+        number_groups = self.number_groups
+        if len(groups) != len(self.gpa):
+            raise ValueError('%d groups given for %d students'
+                             % (len(groups), len(self.gpa)))
+        try:
+            valid = 0 < min(groups) and max(groups) <= number_groups
+        except TypeError:
+            valid = False
+        if not valid:
+            raise ValueError('Every student must be in one of groups 1 to %d'
+                             % number_groups)
+
+        # Sums of each group
+        gpa_total = [0.0] * (number_groups + 1)
+        deviation_total = [0.0] * (number_groups + 1)
+        for g, gpa, deviation in zip(groups, self.gpa, self.deviation):
+            gpa_total[g] += gpa
+            deviation_total[g] += deviation
+        size = Counter(groups)
+        if len(size) < number_groups:
+            raise ValueError('Group %d has no students' % min(
+                g for g in range(1, number_groups + 1) if g not in size))
+
+        # Category counts of each group, flat by group
+        width = len(self.limits)
+        counts = [0] * ((number_groups + 1) * width)
+        profile_categories = self.profile_categories
+        for (g, profile), n in Counter(zip(groups, self.profiles)).items():
+            base = g * width
+            for c in profile_categories[profile]:
+                counts[base + c] += n
+        means = [gpa_total[g] / size[g] for g in range(1, number_groups + 1)]
+        variances = [deviation_total[g] / size[g]
+                     for g in range(1, number_groups + 1)]
+
+        # Shortfall and excess of each category over the groups
+        relaxation = [0] * len(self.relaxation_names)
+        slack = 0.0
+        for c, (minimum, maximum, penalty, short, over) in \
+                enumerate(self.limits):
+            column = counts[width + c::width]
+            shortfall = sum(minimum - n for n in column if n < minimum)
+            relaxation[short] += shortfall
+            excess = 0
+            if maximum is not None:
+                excess = sum(n - maximum for n in column if n > maximum)
+                relaxation[over] += excess
+            slack += penalty * (shortfall + excess)
+
+        score = Score(0.0, min(means), max(means), min(variances),
+                      max(variances), list(zip(self.relaxation_names, relaxation)),
+                      slack)
+        gpa_spread, variance_spread = score.spreads()
+        score.objective = self.weights['gpamean'] * gpa_spread \
+            + self.weights['gpavar'] * variance_spread + slack
+        return score
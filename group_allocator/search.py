@@ -0,0 +1,360 @@
+# ============================================================================
+# Group Allocator - swap-based local search
+#
+# An alternative to the MIP for large cohorts. Students are swapped between
+# groups (which keeps every group at its size) and each swap is scored in
+# constant time against the same weighted objective as the model, from
+# running per-group sums.
+# ============================================================================
+import heapq
+import random
+import time
+
+from group_allocator.model import ARTIFICIAL_PENALTY, DEFAULT_WEIGHTS
+
+# Number of highest and lowest group means and variances kept up to date
+EXTREMES = 4
+
+
+class LocalSearch(object):
+    """Late acceptance hill climbing over swaps of two students.
+
+    ``groups`` is the starting allocation (group of each student), which
+    must respect the group sizes of ``targets``. After ``run`` the best
+    allocation found is in ``best_groups``.
+    """
+
+    def __init__(self, roster, targets, groups, weights=None, seed=None):
+        self.roster = roster
+        self.targets = targets
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.rng = random.Random(seed)
+        w = self.weights
+
+        # Balanced categories: the least and most of each a group should
+        # have (None if unbounded), the penalty per student outside and
+        # the names of the relaxation totals of the model
+        self.minimum = [balance.minimum for balance in targets.balances]
+        self.maximum = [balance.maximum for balance in targets.balances]
+        self.penalty = [ARTIFICIAL_PENALTY *
+                        w.get(balance.attribute.weight, 1.0)
+                        for balance in targets.balances]
+        self.kinds = [(balance.relaxation('min'), balance.relaxation('max')
+                       if balance.maximum is not None else None)
+                      for balance in targets.balances]
+        self.categories = targets.incidence
+        self.category_students = [list(balance.students)
+                                  for balance in targets.balances]
+
+        self.size = dict((g, targets.size(g)) for g in targets.groups)
+        self.groups = list(groups)
+        self.members = dict((g, list()) for g in targets.groups)
+        for s, g in enumerate(self.groups):
+            self.members[g].append(s)
+        for g in targets.groups:
+            if len(self.members[g]) != targets.size(g):
+                raise ValueError('Group %d has %d students instead of %d'
+                                 % (g, len(self.members[g]), targets.size(g)))
+        self.position = [0] * roster.number_students
+        for g in targets.groups:
+            for i, s in enumerate(self.members[g]):
+                self.position[s] = i
+
+        # Running sums of each group
+        self.gpa_total = dict((g, 0.0) for g in targets.groups)
+        self.deviation_total = dict((g, 0.0) for g in targets.groups)
+        self.counts = dict((g, [0] * len(targets.balances))
+                           for g in targets.groups)
+        for s, g in enumerate(self.groups):
+            self.gpa_total[g] += roster.gpa[s]
+            self.deviation_total[g] += targets.gpa_deviation[s]
+            for c in self.categories[s]:
+                self.counts[g][c] += 1
+        self.slack_total = 0.0
+        # Groups and categories with slack, as a list for random choice and
+        # the position of each in it
+        self.violations = list()
+        self.violation_index = {}
+        for g in targets.groups:
+            for c, n in enumerate(self.counts[g]):
+                self.slack_total += self._slack(c, n)
+                self._check_violation(g, c)
+        self._update_extremes()
+        self.best_groups = list(self.groups)
+        self.best_objective = self.objective()
+
+    def _slack(self, c, count):
+        if count < self.minimum[c]:
+            return self.penalty[c] * (self.minimum[c] - count)
+        if self.maximum[c] is not None and count > self.maximum[c]:
+            return self.penalty[c] * (count - self.maximum[c])
+        return 0.0
+
+    def _check_violation(self, g, c):
+        violated = self._slack(c, self.counts[g][c]) > 0
+        if violated and (g, c) not in self.violation_index:
+            self.violation_index[(g, c)] = len(self.violations)
+            self.violations.append((g, c))
+        elif not violated and (g, c) in self.violation_index:
+            # Move the last violation into the place of this one
+            i = self.violation_index.pop((g, c))
+            last = self.violations.pop()
+            if i < len(self.violations):
+                self.violations[i] = last
+                self.violation_index[last] = i
+
+    def _update_extremes(self, changed=None):
+        # The few highest and lowest group means and variances, enough to
+        # know the spread with any two groups changed. After a swap only
+        # the ``changed`` groups are placed again, unless one of them
+        # leaves a list, when nothing is known about what replaces it.
+        size = self.size
+        groups = self.targets.groups
+        for attribute, totals in (('mean', self.gpa_total),
+                                  ('variance', self.deviation_total)):
+            for end, sign in (('low', 1), ('high', -1)):
+                name = '%s_%s' % (attribute, end)
+                extremes = getattr(self, name, None)
+                if changed is not None and extremes is not None:
+                    boundary = sign * extremes[-1][0]
+                    every_group = len(extremes) == len(groups)
+                    kept = [entry for entry in extremes
+                            if entry[1] not in changed]
+                    for g in changed:
+                        value = totals[g] / size[g]
+                        if every_group or sign * value <= boundary:
+                            kept.append((value, g))
+                    if len(kept) >= min(EXTREMES, len(groups)):
+                        kept.sort(key=lambda entry: sign * entry[0])
+                        setattr(self, name, kept[:EXTREMES])
+                        continue
+                values = ((totals[g] / size[g], g) for g in groups)
+                if sign > 0:
+                    setattr(self, name, heapq.nsmallest(EXTREMES, values))
+                else:
+                    setattr(self, name, heapq.nlargest(EXTREMES, values))
+
+    @staticmethod
+    def _spread(low, high, g1, value1, g2, value2):
+        lowest = min(value1, value2)
+        highest = max(value1, value2)
+        for value, g in low:
+            if g != g1 and g != g2:
+                lowest = min(lowest, value)
+                break
+        for value, g in high:
+            if g != g1 and g != g2:
+                highest = max(highest, value)
+                break
+        return highest - lowest
+
+    def objective(self):
+        w = self.weights
+        gpa_spread, variance_spread = self.spreads()
+        return w['gpamean'] * gpa_spread + w['gpavar'] * variance_spread \
+            + self.slack_total
+
+    def spreads(self):
+        """Biggest differences in group mean GPA and GPA variance."""
+        return (self.mean_high[0][0] - self.mean_low[0][0],
+                self.variance_high[0][0] - self.variance_low[0][0])
+
+    def relaxation(self):
+        """Students short of each minimum and over each maximum, in the
+        order of ``Model.relaxation``."""
+        totals = dict((name, 0) for name in self.targets.relaxation_names)
+        for g in self.targets.groups:
+            for c, count in enumerate(self.counts[g]):
+                if count < self.minimum[c]:
+                    totals[self.kinds[c][0]] += self.minimum[c] - count
+                elif self.maximum[c] is not None and count > self.maximum[c]:
+                    totals[self.kinds[c][1]] += count - self.maximum[c]
+        return [(name, totals[name])
+                for name in self.targets.relaxation_names]
+
+    # ========================================================================
+    #   Swaps
+
+    def swap_delta(self, s1, s2):
+        """Change in objective from swapping the groups of s1 and s2."""
+        roster = self.roster
+        t = self.targets
+        w = self.weights
+        g1 = self.groups[s1]
+        g2 = self.groups[s2]
+        size1 = self.size[g1]
+        size2 = self.size[g2]
+        gpa_change = roster.gpa[s2] - roster.gpa[s1]
+        deviation_change = t.gpa_deviation[s2] - t.gpa_deviation[s1]
+        mean1 = (self.gpa_total[g1] + gpa_change) / size1
+        mean2 = (self.gpa_total[g2] - gpa_change) / size2
+        variance1 = (self.deviation_total[g1] + deviation_change) / size1
+        variance2 = (self.deviation_total[g2] - deviation_change) / size2
+        delta = w['gpamean'] * (
+            self._spread(self.mean_low, self.mean_high, g1, mean1, g2, mean2)
+            - (self.mean_high[0][0] - self.mean_low[0][0])) \
+            + w['gpavar'] * (
+                self._spread(self.variance_low, self.variance_high, g1,
+                             variance1, g2, variance2)
+                - (self.variance_high[0][0] - self.variance_low[0][0]))
+
+        counts1 = self.counts[g1]
+        counts2 = self.counts[g2]
+        categories2 = self.categories[s2]
+        for c in self.categories[s1]:
+            if c not in categories2:
+                delta += self._slack(c, counts1[c] - 1) \
+                    - self._slack(c, counts1[c]) \
+                    + self._slack(c, counts2[c] + 1) \
+                    - self._slack(c, counts2[c])
+        categories1 = self.categories[s1]
+        for c in categories2:
+            if c not in categories1:
+                delta += self._slack(c, counts2[c] - 1) \
+                    - self._slack(c, counts2[c]) \
+                    + self._slack(c, counts1[c] + 1) \
+                    - self._slack(c, counts1[c])
+        return delta
+
+    def swap(self, s1, s2):
+        """Swap the groups of s1 and s2 and update the running sums."""
+        roster = self.roster
+        t = self.targets
+        g1 = self.groups[s1]
+        g2 = self.groups[s2]
+        for s, old, new in ((s1, g1, g2), (s2, g2, g1)):
+            self.gpa_total[old] -= roster.gpa[s]
+            self.gpa_total[new] += roster.gpa[s]
+            self.deviation_total[old] -= t.gpa_deviation[s]
+            self.deviation_total[new] += t.gpa_deviation[s]
+            for c in self.categories[s]:
+                self.slack_total -= self._slack(c, self.counts[old][c]) + \
+                    self._slack(c, self.counts[new][c])
+                self.counts[old][c] -= 1
+                self.counts[new][c] += 1
+                self.slack_total += self._slack(c, self.counts[old][c]) + \
+                    self._slack(c, self.counts[new][c])
+                self._check_violation(old, c)
+                self._check_violation(new, c)
+        i1 = self.position[s1]
+        i2 = self.position[s2]
+        self.members[g1][i1] = s2
+        self.members[g2][i2] = s1
+        self.position[s1] = i2
+        self.position[s2] = i1
+        self.groups[s1] = g2
+        self.groups[s2] = g1
+        self._update_extremes((g1, g2))
+
+    # ========================================================================
+    #   Search
+
+    def _candidate(self):
+        # A third of the time repair a group with too few or too many of a
+        # category, a third start from a group setting the GPA or variance
+        # spread, otherwise pick any two students
+        rng = self.rng
+        number_students = self.roster.number_students
+        choice = rng.random()
+        if choice < 1 / 3.0 and self.violations:
+            g, c = rng.choice(self.violations)
+            members = self.members[g]
+            if self.counts[g][c] < self.minimum[c]:
+                # Bring a student of the category in
+                s2 = rng.choice(self.category_students[c])
+                s1 = rng.choice(members)
+                for _ in range(len(members)):
+                    if c not in self.categories[s1]:
+                        break
+                    s1 = rng.choice(members)
+            else:
+                # Send a student of the category out
+                s1 = rng.choice(members)
+                for _ in range(len(members)):
+                    if c in self.categories[s1]:
+                        break
+                    s1 = rng.choice(members)
+                s2 = rng.randrange(number_students)
+        elif choice < 2 / 3.0:
+            extremes = (self.mean_low[0][1], self.mean_high[0][1],
+                        self.variance_low[0][1], self.variance_high[0][1])
+            s1 = rng.choice(self.members[rng.choice(extremes)])
+            s2 = rng.randrange(number_students)
+        else:
+            s1 = rng.randrange(number_students)
+            s2 = rng.randrange(number_students)
+        while self.groups[s2] == self.groups[s1]:
+            s2 = rng.randrange(number_students)
+        return s1, s2
+
+    def run(self, time_limit=10.0, iterations=None, history=50, stall=None,
+            target=None, on_incumbent=None, interval=1.0):
+        """Search until ``time_limit`` seconds or ``iterations`` swaps, or
+        ``stall`` seconds without a better allocation, or one with an
+        objective of ``target`` or less; ``stop_reason`` says which.
+        ``on_incumbent`` is called with the objective and allocation of the
+        best allocation so far, at most every ``interval`` seconds while it
+        improves and once at the end.
+
+        A swap is accepted if it does not make the objective worse than
+        the current one or the one ``history`` iterations ago (late
+        acceptance hill climbing). Returns the best allocation found.
+        """
+        self.stop_reason = None
+        if len(self.targets.groups) < 2:
+            return self.best_groups
+        current = self.objective()
+        recent = [current] * history
+        now = time.time()
+        deadline = now + time_limit if time_limit else None
+        improved = now
+        reported = now
+        last_reported = None
+        iteration = 0
+        at_best = current <= self.best_objective
+        while True:
+            if target is not None and self.best_objective <= target:
+                self.stop_reason = 'objective target'
+                break
+            if iterations is not None and iteration >= iterations:
+                self.stop_reason = 'iterations'
+                break
+            if iteration % 256 == 0 and (deadline or stall or on_incumbent):
+                now = time.time()
+                if on_incumbent is not None and now - reported >= interval \
+                        and self.best_objective != last_reported:
+                    reported = now
+                    last_reported = self.best_objective
+                    on_incumbent(self.best_objective, self.groups if at_best
+                                 else self.best_groups)
+                if deadline is not None and now > deadline:
+                    self.stop_reason = 'time limit'
+                    break
+                if stall is not None and now - improved > stall:
+                    self.stop_reason = 'stall'
+                    break
+            s1, s2 = self._candidate()
+            delta = self.swap_delta(s1, s2)
+            candidate = current + delta
+            slot = iteration % history
+            if candidate <= current or candidate <= recent[slot]:
+                # Keep a copy of the best allocation before leaving it
+                if at_best and delta > 0:
+                    self.best_groups = list(self.groups)
+                    at_best = False
+                self.swap(s1, s2)
+                current = self.objective()
+                if current < self.best_objective - 1e-9:
+                    self.best_objective = current
+                    at_best = True
+                    if stall is not None:
+                        improved = time.time()
+            recent[slot] = current
+            iteration += 1
+        if at_best:
+            self.best_groups = list(self.groups)
+        if on_incumbent is not None and self.best_objective != last_reported:
+            on_incumbent(self.best_objective, self.best_groups)
+        self.iterations = iteration
+        return self.best_groups
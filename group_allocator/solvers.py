@@ -0,0 +1,340 @@
+# ============================================================================
+# Group Allocator - MIP solver backends
+#
+# The models are solved through PuLP, which can hand them to any of several
+# open source MIP solvers. A backend makes the PuLP solver of one of them
+# from the same settings (time limit, threads, seed, gaps, warm start and
+# log file) and reads the outcome from the log it wrote into the summary
+# read_cbc_log gives for CBC, so the rest of the package need not know
+# which solver ran, and the benchmark can compare them on the same cases.
+# Only CBC reports each incumbent as it finds it, so the stall and
+# objective target rules follow CBC alone.
+# ============================================================================
+import os
+import re
+import shutil
+import tempfile
+import warnings
+from math import ceil
+
+import pulp
+
+# Solvers in order of preference; CBC comes with PuLP
+SOLVERS = ('cbc', 'highs', 'scip', 'glpk')
+
+DEFAULT_SOLVER = 'cbc'
+
+# Values of the log summary and their types
+SUMMARY = (('objective', float), ('bound', float), ('nodes', int),
+           ('iterations', int), ('seconds', float))
+
+# Settings not every solver can take, as the warning names them
+IGNORED = {'threads': 'more than one thread', 'gap_abs': 'an absolute gap',
+           'warm_start': 'a starting allocation'}
+
+
+class Backend(object):
+    """A MIP solver reached through PuLP.
+
+    ``solver`` makes the PuLP solver for one solve and ``read_log``
+    summarises the log it wrote as ``read_cbc_log`` does. ``path`` is the
+    solver executable, if not the one PuLP finds. Settings a solver has no
+    way to take are ignored with a warning.
+    """
+
+    name = None
+    title = None
+    # Whether the log reports incumbents as they are found (see
+    # model._SolverMonitor)
+    follows_incumbents = False
+    # Patterns of the result line and SUMMARY values in the log, and of a
+    # relative gap in percent as the solver's gap option measures it
+    log_patterns = ()
+    # Start of the result line of a solve proven optimal, in lower case
+    optimal = 'optimal'
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def available(self):
+        return bool(self.solver().available())
+
+    def solver(self, time_limit=None, threads=None, seed=None, gap=None,
+               gap_abs=None, warm_start=False, log_path=None):
+        raise NotImplementedError
+
+    def solve(self, problem, monitor, time_limit=None, threads=None,
+              seed=None, gap=None, gap_abs=None, warm_start=False,
+              log_path=None):
+        """Solve the PuLP ``problem`` with the settings of ``solver``
+        while ``monitor`` (a model._SolverMonitor) follows the log."""
+        problem.solve(self.solver(time_limit, threads, seed, gap, gap_abs,
+                                  warm_start, log_path))
+
+    def read_log(self, path):
+        return _read_log(path, self.log_patterns, self.optimal,
+                         self.relative_gap)
+
+    def relative_gap(self, objective, bound):
+        """Gap between the incumbent ``objective`` and the best ``bound``
+        as the solver's relative gap option (``gap``) measures it, for
+        logs that do not report it."""
+        return (objective - bound) / max(abs(objective), 1e-10)
+
+    def _ignore(self, **settings):
+        for name in sorted(settings):
+            if settings[name]:
+                warnings.warn('%s cannot take %s; it is ignored'
+                              % (self.title, IGNORED[name]))
+
+
+class CbcBackend(Backend):
+    """COIN-OR CBC, the solver that comes with PuLP, or another CBC
+    executable at ``path``. It runs its tree search on ``threads`` threads
+    if it was built to."""
+
+    name = 'cbc'
+    title = 'CBC'
+    follows_incumbents = True
+    log_patterns = (('result', r'^Result - (.*)$'),
+                    ('objective', r'^Objective value:\s+(\S+)'),
+                    ('bound', r'^Lower bound:\s+(\S+)'),
+                    ('nodes', r'^Enumerated nodes:\s+(\d+)'),
+                    ('iterations', r'^Total iterations:\s+(\d+)'),
+                    ('seconds', r'^Time \(Wallclock seconds\):\s+(\S+)'))
+
+    def solver(self, time_limit=None, threads=None, seed=None, gap=None,
+               gap_abs=None, warm_start=False, log_path=None):
+        options = ['randomCbcSeed %d' % seed] if seed is not None else []
+        settings = dict(msg=False, timeLimit=time_limit, gapRel=gap,
+                        gapAbs=gap_abs, warmStart=warm_start,
+                        options=options, logPath=log_path, threads=threads)
+        if self.path is None:
+            solver = pulp.PULP_CBC_CMD(**settings)
+            if solver.available():
+                return solver
+        return pulp.COIN_CMD(path=self.path, **settings)
+
+    def solve(self, problem, monitor, time_limit=None, threads=None,
+              seed=None, gap=None, gap_abs=None, warm_start=False,
+              log_path=None):
+        """Write the PuLP ``problem`` (a minimisation) as MPS, run CBC on
+        it and read the solution back as PuLP's CBC interface does. CBC is
+        run here rather than by PuLP so ``monitor`` has hold of it."""
+        interface = self.solver()
+        directory = tempfile.mkdtemp()
+        try:
+            mps, start, solution = [os.path.join(directory, 'problem.' + kind)
+                                    for kind in ('mps', 'mst', 'sol')]
+            columns, column_names, row_names, _ = problem.writeMPS(
+                mps, rename=1)
+            if warm_start:
+                interface.writesol(start, problem, columns, column_names,
+                                   row_names)
+            self.run(monitor, mps, solution, log_path,
+                     start if warm_start else None, time_limit, threads,
+                     seed, gap, gap_abs)
+            status, values, _, _, _, solution_status = \
+                interface.readsol_MPS(solution, problem, columns,
+                                      column_names, row_names)
+        finally:
+            shutil.rmtree(directory)
+        problem.assignVarsVals(values)
+        problem.assignStatus(status, solution_status)
+
+    def relative_gap(self, objective, bound):
+        """The gap CBC's -ratio stops at: objective minus bound over the
+        larger of their magnitudes. (The "Gap:" line at the end of CBC's
+        log is over the bound alone, and is not what -ratio tests.)"""
+        return (objective - bound) / max(abs(objective), abs(bound), 1e-10)
+
+    def run(self, monitor, problem, solution, log_path, start=None,
+            time_limit=None, threads=None, seed=None, gap=None,
+            gap_abs=None):
+        """Run CBC on the MPS file ``problem`` from the MIP start file
+        ``start``, if any, writing the solution to ``solution`` and the log
+        to ``log_path``. ``monitor`` starts the process. On Ctrl-C (or
+        SIGTERM, which the command line turns into Ctrl-C) CBC is
+        interrupted in turn, so it still writes its incumbent, and the
+        solve returns with the monitor's reason 'interrupted'."""
+        command = [self.solver().path, problem]
+        if start is not None:
+            command += ['-mips', start]
+        for option, value in (('sec', time_limit), ('ratio', gap),
+                              ('allow', gap_abs), ('randomCbcSeed', seed),
+                              ('threads', threads)):
+            if value is not None:
+                command += ['-' + option, str(value)]
+        command += ['-timeMode', 'elapsed', '-solve', '-printingOptions',
+                    'all', '-solution', solution]
+        with open(log_path, 'w') as log:
+            process = monitor.start(command, log)
+            try:
+                code = process.wait()
+            except KeyboardInterrupt:
+                if os.name == 'nt':
+                    raise
+                monitor.interrupt('interrupted')
+                code = process.wait()
+            if code != 0 or not os.path.exists(solution):
+                raise pulp.PulpSolverError('Error while executing %s'
+                                           % command[0])
+
+
+class HighsBackend(Backend):
+    """HiGHS, through the ``highs`` executable."""
+
+    name = 'highs'
+    title = 'HiGHS'
+    log_patterns = (('result', r'^Status\s+(.*)$'),
+                    ('objective', r'^Primal bound\s+(\S+)'),
+                    ('bound', r'^Dual bound\s+(\S+)'),
+                    ('gap', r'^Gap\s+(\S+)%'),
+                    ('nodes', r'^Nodes\s+(\d+)'),
+                    ('iterations', r'^LP iterations\s+(\d+)'),
+                    ('seconds', r'^Timing\s+(\S+)'))
+
+    def solver(self, time_limit=None, threads=None, seed=None, gap=None,
+               gap_abs=None, warm_start=False, log_path=None):
+        options = ['random_seed=%d' % seed] if seed is not None else []
+        return pulp.HiGHS_CMD(path=self.path, msg=False, timeLimit=time_limit,
+                              gapRel=gap, gapAbs=gap_abs, threads=threads,
+                              logPath=log_path, warmStart=warm_start,
+                              options=options)
+
+
+class ScipBackend(Backend):
+    """SCIP, through the ``scip`` executable. It solves on one thread and
+    cannot start from an allocation."""
+
+    name = 'scip'
+    title = 'SCIP'
+    log_patterns = (('result', r'^SCIP Status\s*:\s*(.*)$'),
+                    ('objective', r'^Primal Bound\s*:\s*(\S+)'),
+                    ('bound', r'^Dual Bound\s*:\s*(\S+)'),
+                    ('gap', r'^Gap\s*:\s*(\S+) %'),
+                    ('nodes', r'^Solving Nodes\s*:\s*(\d+)'),
+                    ('seconds', r'^Solving Time \(sec\)\s*:\s*(\S+)'))
+    optimal = 'problem is solved [optimal'
+
+    def solver(self, time_limit=None, threads=None, seed=None, gap=None,
+               gap_abs=None, warm_start=False, log_path=None):
+        self._ignore(threads=threads is not None and threads > 1,
+                     warm_start=warm_start)
+        options = ['randomization/randomseedshift=%d' % seed] \
+            if seed is not None else []
+        return pulp.SCIP_CMD(path=self.path, msg=False, timeLimit=time_limit,
+                             gapRel=gap, gapAbs=gap_abs, logPath=log_path,
+                             options=options)
+
+
+class GlpkBackend(Backend):
+    """GLPK, through the ``glpsol`` executable. It solves on one thread,
+    to whole seconds, without an absolute gap or a start."""
+
+    name = 'glpk'
+    title = 'GLPK'
+    log_patterns = (('result', r'^([A-Z][A-Z ;]+(?:FOUND|TERMINATED|'
+                               r'SOLUTION))$'),
+                    ('objective', r'.*\bmip =\s+(\S+)'),
+                    ('bound', r'.*\bmip =\s+\S+\s+>=\s+(\S+)'),
+                    ('seconds', r'^Time used:\s+(\S+) secs'))
+    optimal = 'integer optimal'
+
+    def solver(self, time_limit=None, threads=None, seed=None, gap=None,
+               gap_abs=None, warm_start=False, log_path=None):
+        self._ignore(threads=threads is not None and threads > 1,
+                     gap_abs=gap_abs is not None, warm_start=warm_start)
+        options = []
+        for option, value in (('--mipgap', gap), ('--seed', seed),
+                              ('--log', log_path)):
+            if value is not None:
+                options += [option, str(value)]
+        return pulp.GLPK_CMD(
+            path=self.path, msg=False, options=options,
+            timeLimit=None if time_limit is None else int(ceil(time_limit)))
+
+
+BACKENDS = dict((backend.name, backend) for backend in (
+    CbcBackend, HighsBackend, ScipBackend, GlpkBackend))
+
+
+def backend(solver=None, path=None):
+    """The ``Backend`` of ``solver``, a name in SOLVERS (DEFAULT_SOLVER if
+    None) or a backend already. Raises ValueError if the solver is unknown
+    or not installed."""
+    if isinstance(solver, Backend):
+        return solver
+    name = (solver or DEFAULT_SOLVER).lower()
+    if name not in BACKENDS:
+        raise ValueError('Unknown solver %s (expected one of: %s)'
+                         % (name, ', '.join(SOLVERS)))
+    chosen = BACKENDS[name](path)
+    if not chosen.available():
+        raise ValueError('%s is not installed (installed: %s)'
+                         % (chosen.title, ', '.join(available_solvers())))
+    return chosen
+
+
+def available_solvers():
+    """Names of the solvers in SOLVERS that PuLP can run here."""
+    return [name for name in SOLVERS if BACKENDS[name]().available()]
+
+
+# ============================================================================
+# Solver logs
+
+def read_cbc_log(path):
+    """Outcome of a CBC run from its log.
+
+    Returns a dictionary of the result line, objective value, lower bound,
+    relative gap (as -ratio measures it, see CbcBackend.relative_gap; 0
+    when proven optimal), enumerated nodes, iterations and wall time, each
+    None if not in the log.
+    """
+    return CbcBackend().read_log(path)
+
+
+def _read_log(path, patterns, optimal, relative_gap):
+    found = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                for name, pattern in patterns:
+                    match = re.match(pattern, line.strip())
+                    if match:
+                        found[name] = match.group(1)
+    summary = {'result': found.get('result')}
+    for name, kind in SUMMARY:
+        try:
+            summary[name] = kind(found[name]) if name in found else None
+        except ValueError:
+            summary[name] = None
+    # A solve stopped within the gap tolerance is reported as optimal too,
+    # so the bound comes first
+    summary['gap'] = None
+    if re.match(r'^[0-9.eE+-]+$', found.get('gap', '')):
+        summary['gap'] = float(found['gap']) / 100
+    elif summary['objective'] is not None and summary['bound'] is not None:
+        summary['gap'] = relative_gap(summary['objective'], summary['bound'])
+    elif summary['result'] and \
+            summary['result'].lower().startswith(optimal):
+        summary['gap'] = 0.0
+    return summary
+
+
+def stop_reason(result):
+    """Which rule stopped the solver, from the result line of its log."""
+    if result is None:
+        return None
+    result = result.lower()
+    for phrase, reason in (('gap', 'gap'), ('optimal', 'optimal'),
+                           ('time', 'time limit'),
+                           ('ctrl-c', 'interrupted'),
+                           ('interrupt', 'interrupted'),
+                           ('infeasible', 'infeasible'),
+                           ('no integer feasible', 'infeasible'),
+                           ('no primal feasible', 'infeasible')):
+        if phrase in result:
+            return reason
+    return result
@@ -0,0 +1,383 @@
+# ============================================================================
+# Group Allocator - streaming model writer
+#
+# Model builds the ENGGEN403 program as PuLP objects: a variable per
+# student and group, an expression per constraint and the same again when
+# PuLP writes them out for CBC. On large cohorts these objects take most of
+# the memory and build time before CBC even starts. StreamModel writes the
+# same program straight to an MPS file instead, one column at a time from
+# the GPA arrays and the incidence of the targets, so it never holds more
+# than one column. Rows and columns are coded as PuLP codes them for CBC,
+# and only the values of the solution that are needed are read back.
+# ============================================================================
+import os
+import shutil
+import tempfile
+from array import array
+
+import pulp
+
+from group_allocator.model import ARTIFICIAL_PENALTY, DEFAULT_WEIGHTS, Model
+from group_allocator.solvers import CbcBackend
+
+# Rows of each group besides the balance rows, as in Model (size_g,
+# calculate_min_gpa_g, calculate_max_gpa_g, calculate_gpa_variance_min_g
+# and calculate_gpa_variance_max_g): their sense and the coefficient of
+# each student, 1 or their GPA (0) or squared deviation (1)
+GROUP_ROWS = (('E', None), ('G', 0), ('L', 0), ('G', 1), ('L', 1))
+
+
+class Column(object):
+    """A continuous column of a StreamModel, standing in for the PuLP
+    variable of the same name. An artificial variable is in the one
+    ``row`` of its constraint, with ``coefficient``."""
+
+    def __init__(self, name, low, up, coefficient=None):
+        self.name = name.translate(pulp.LpElement.trans)
+        self.lowBound = low
+        self.upBound = up
+        self.coefficient = coefficient
+        self.row = None
+        self.varValue = None
+
+    def value(self):
+        return self.varValue
+
+
+class StreamModel(Model):
+    """The ENGGEN403 model written straight to an MPS file for CBC.
+
+    It is the program of ``Model`` with the same options and presolve, but
+    no PuLP problem is built: ``write`` produces the file when it is
+    solved. x is coded as X<k> with k = s * number_groups + g - 1, the
+    continuous columns as C<k> and the rows as R<k>.
+    """
+
+    def _build(self):
+        t = self.targets
+        self._presolve()
+        self.problem = None
+        self.start = None
+        self.values = None
+
+        # The continuous columns: the GPA and variance bounds, then the
+        # artificial variables of each balance in order of their rows
+        gpa_min, gpa_max, variance_min, variance_max = self.gpa_bounds
+        self.gpa_min = Column('gpa_min', *gpa_min)
+        self.gpa_max = Column('gpa_max', *gpa_max)
+        self.gpa_variance_min = Column('gpa_variance_min', *variance_min)
+        self.gpa_variance_max = Column('gpa_variance_max', *variance_max)
+        self.columns = [self.gpa_min, self.gpa_max, self.gpa_variance_min,
+                        self.gpa_variance_max]
+        self.artificial_min = []
+        self.artificial_max = []
+        for balance, short, over in zip(t.balances, self.short_bounds,
+                                        self.over_bounds):
+            for bound, bounds, coefficient, columns in (
+                    ('min', short, 1, self.artificial_min),
+                    ('max', over, -1, self.artificial_max)):
+                columns.append(dict(
+                    (g, Column(balance.variable(bound, g), 0, upper,
+                               coefficient))
+                    for g, upper in sorted(bounds.items())))
+                self.columns.extend(columns[-1].values())
+
+        # Rows: one per student, the group rows, then the balance rows of
+        # each group that presolve kept
+        n = t.number_students
+        self.group_rows = [None] + [
+            ['R%d' % (n + (g - 1) * len(GROUP_ROWS) + k)
+             for k in range(len(GROUP_ROWS))] for g in t.groups]
+        number_rows = n + t.number_groups * len(GROUP_ROWS)
+        for g in t.groups:
+            for short, over in zip(self.artificial_min, self.artificial_max):
+                for bounds in (short, over):
+                    if g in bounds:
+                        bounds[g].row = 'R%d' % number_rows
+                        number_rows += 1
+        self.number_rows = number_rows
+
+    def set_weights(self, weights):
+        """Change the weighting factors of the next ``write``."""
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+
+    def set_start(self, groups):
+        """Start the solver from the allocation ``groups`` (relabelled for
+        the symmetry breaking as by ``Model.set_start``)."""
+        t = self.targets
+        if self.symmetry_breaking:
+            groups = self._relabel(groups)
+        sizes = dict((g, 0) for g in t.groups)
+        for g in groups:
+            sizes[g] += 1
+        for g in t.groups:
+            if sizes[g] != t.size(g):
+                raise ValueError('Group %d has %d students instead of %d'
+                                 % (g, sizes[g], t.size(g)))
+        self.start = list(groups)
+        self.warm_start = True
+
+    # ========================================================================
+    #   Writing
+
+    def _costs(self):
+        """Objective coefficient of each continuous column."""
+        w = self.weights
+        costs = [-w['gpamean'], w['gpamean'], -w['gpavar'], w['gpavar']]
+        for balance, short, over in zip(self.targets.balances,
+                                        self.artificial_min,
+                                        self.artificial_max):
+            penalty = ARTIFICIAL_PENALTY * w.get(balance.attribute.weight,
+                                                 1.0)
+            costs.extend([penalty] * (len(short) + len(over)))
+        return costs
+
+    def write(self, path):
+        """Write the program to ``path`` as an MPS file and return its size,
+        as ``Model.size``."""
+        t = self.targets
+        n = t.number_students
+        groups = t.groups
+        gpa = self.roster.gpa
+        deviation = t.gpa_deviation
+        group_rows = self.group_rows
+        size = {'rows': self.number_rows, 'columns': 0,
+                'integer_columns': 0, 'nonzeros': 0}
+
+        # Rows of each balance in each group, where presolve kept them
+        balance_rows = [dict((g, list()) for g in groups)
+                        for _ in t.balances]
+        for b, (short, over) in enumerate(zip(self.artificial_min,
+                                              self.artificial_max)):
+            for g, column in short.items():
+                balance_rows[b][g].append(column.row)
+            for g, column in over.items():
+                balance_rows[b][g].append(column.row)
+
+        with open(path, 'w') as f:
+            f.write('NAME          ENGGEN403\nROWS\n N  objective\n')
+            for s in range(n):
+                f.write(' E  R%d\n' % s)
+            for g in groups:
+                for row, (sense, _) in zip(group_rows[g], GROUP_ROWS):
+                    f.write(' %s  %s\n' % (sense, row))
+            for g in groups:
+                for short, over in zip(self.artificial_min,
+                                       self.artificial_max):
+                    if g in short:
+                        f.write(' G  %s\n' % short[g].row)
+                    if g in over:
+                        f.write(' L  %s\n' % over[g].row)
+
+            # Columns in the order PuLP writes them, which is by name: the
+            # continuous columns named before x, x one column at a time,
+            # then the rest
+            costs = self._costs()
+            order = sorted(range(len(self.columns)),
+                           key=lambda k: self.columns[k].name)
+            before = [k for k in order if self.columns[k].name < 'x_(']
+            after = [k for k in order if self.columns[k].name >= 'x_(']
+            students = sorted(range(n), key=str)
+            group_order = sorted(groups, key=str)
+            number_groups = t.number_groups
+            f.write('COLUMNS\n')
+            size['nonzeros'] += self._write_columns(f, before, costs)
+            f.write('    MARKER  \'MARKER\'  \'INTORG\'\n')
+            for s in students:
+                values = (gpa[s], deviation[s])
+                balances = t.incidence[s]
+                for g in group_order:
+                    name = 'X%d' % (s * number_groups + g - 1)
+                    lines = ['    %s  R%d  1\n' % (name, s)]
+                    for row, (_, value) in zip(group_rows[g], GROUP_ROWS):
+                        coefficient = 1 if value is None else values[value]
+                        if coefficient:
+                            lines.append('    %s  %s  %.13g\n'
+                                         % (name, row, coefficient))
+                    for b in balances:
+                        for row in balance_rows[b][g]:
+                            lines.append('    %s  %s  1\n' % (name, row))
+                    f.write(''.join(lines))
+                    size['nonzeros'] += len(lines)
+            f.write('    MARKER  \'MARKER\'  \'INTEND\'\n')
+            size['nonzeros'] += self._write_columns(f, after, costs)
+            size['integer_columns'] = n * number_groups
+            size['columns'] = n * number_groups + len(self.columns)
+
+            f.write('RHS\n')
+            for s in range(n):
+                f.write('    RHS  R%d  1\n' % s)
+            for g in groups:
+                f.write('    RHS  %s  %d\n' % (group_rows[g][0], t.size(g)))
+            for balance, short, over in zip(t.balances, self.artificial_min,
+                                            self.artificial_max):
+                for bounds, limit in ((short, balance.minimum),
+                                      (over, balance.maximum)):
+                    if limit:
+                        for column in bounds.values():
+                            f.write('    RHS  %s  %d\n' % (column.row, limit))
+
+            # Bounds in the same order, x binary or fixed at 0 by the
+            # symmetry breaking
+            f.write('BOUNDS\n')
+            self._write_bounds(f, before)
+            for s in students:
+                for g in group_order:
+                    f.write((' FX BND  X%d  0\n' if self._fixed(s, g)
+                             else ' BV BND  X%d\n')
+                            % (s * number_groups + g - 1))
+            self._write_bounds(f, after)
+            f.write('ENDATA\n')
+        return size
+
+    def _write_columns(self, f, columns, costs):
+        """Write the continuous ``columns`` (by position) to ``f`` and
+        return their nonzeros."""
+        t = self.targets
+        nonzeros = 0
+        for k in columns:
+            name = 'C%d' % k
+            if k < len(GROUP_ROWS) - 1:
+                # A GPA or variance bound, in its row of every group
+                for g in t.groups:
+                    f.write('    %s  %s  %d\n' % (
+                        name, self.group_rows[g][k + 1], -t.size(g)))
+                    nonzeros += 1
+            else:
+                column = self.columns[k]
+                f.write('    %s  %s  %d\n' % (name, column.row,
+                                              column.coefficient))
+                nonzeros += 1
+            if costs[k]:
+                f.write('    %s  objective  %.13g\n' % (name, costs[k]))
+        return nonzeros
+
+    def _write_bounds(self, f, columns):
+        for k in columns:
+            column = self.columns[k]
+            if column.lowBound:
+                f.write(' LO BND  C%d  %.13g\n' % (k, column.lowBound))
+            f.write(' UP BND  C%d  %.13g\n' % (k, column.upBound))
+
+    def _fixed(self, s, g):
+        """Whether symmetry breaking keeps student ``s`` out of group ``g``:
+        the k-th student can only be in the first k groups of each size."""
+        if not self.symmetry_breaking:
+            return False
+        t = self.targets
+        position = g - 1 if g <= t.j1 else g - t.j1 - 1
+        return position > s
+
+    def _write_start(self, path):
+        """Write the start as a CBC solution file, as PuLP does."""
+        t = self.targets
+        groups = self.start
+        members = dict((g, list()) for g in t.groups)
+        for s, g in enumerate(groups):
+            members[g].append(s)
+        gpa_mean = [sum(self.roster.gpa[s] for s in members[g]) / t.size(g)
+                    for g in t.groups]
+        gpa_variance = [sum(t.gpa_deviation[s] for s in members[g]) /
+                        t.size(g) for g in t.groups]
+        values = [min(gpa_mean), max(gpa_mean), min(gpa_variance),
+                  max(gpa_variance)]
+        for balance, short, over in zip(t.balances, self.artificial_min,
+                                        self.artificial_max):
+            counts = dict((g, 0) for g in t.groups)
+            for s in balance.students:
+                counts[groups[s]] += 1
+            values.extend(max(0, balance.minimum - counts[g]) for g in short)
+            values.extend(max(0, counts[g] - balance.maximum) for g in over)
+
+        index = 0
+        with open(path, 'w') as f:
+            f.write('Stopped on time - objective value 0\n')
+            for s, group in enumerate(groups):
+                for g in t.groups:
+                    f.write('%7d X%d %15d %23d\n' % (index, index,
+                                                     group == g, 0))
+                    index += 1
+            for k, value in enumerate(values):
+                f.write('%7d C%d %15.13g %23d\n' % (index, k, value, 0))
+                index += 1
+
+    # ========================================================================
+    #   Solve
+
+    def _run(self, engine, monitor, time_limit, threads, seed, gap, gap_abs,
+             path):
+        """Write the program, solve it with CBC and return the PuLP status
+        string, for ``Model.solve``. The program is written for CBC, so
+        ``engine`` can only be CBC."""
+        if not isinstance(engine, CbcBackend):
+            raise ValueError('StreamModel writes its program for CBC, not %s'
+                             % engine.title)
+        directory = tempfile.mkdtemp()
+        try:
+            problem = os.path.join(directory, 'ENGGEN403.mps')
+            solution = os.path.join(directory, 'ENGGEN403.sol')
+            self._size = self.write(problem)
+            start = None
+            if self.start is not None:
+                start = os.path.join(directory, 'start.mst')
+                self._write_start(start)
+            with monitor.following():
+                engine.run(monitor, problem, solution, path, start,
+                           time_limit, threads, seed, gap, gap_abs)
+            return self._read_solution(solution)
+        finally:
+            shutil.rmtree(directory)
+
+    def _read_solution(self, path):
+        """Read the values of x and the continuous columns, and return the
+        status as PuLP reads it."""
+        t = self.targets
+        with open(path) as f:
+            words = f.readline().split()
+            status = {'Optimal': 'Optimal', 'Infeasible': 'Infeasible',
+                      'Integer': 'Infeasible', 'Unbounded': 'Unbounded'
+                      }.get(words[0], 'Not Solved')
+            if words[0] == 'Stopped' and len(words) >= 5 and \
+                    words[4] == 'objective':
+                status = 'Optimal'
+            if status != 'Optimal':
+                self.values = None
+                for column in self.columns:
+                    column.varValue = None
+                return status
+            self.values = array('d', [0.0]) * (t.number_students *
+                                               t.number_groups)
+            for column in self.columns:
+                column.varValue = 0.0
+            for line in f:
+                cells = line.split()
+                if cells and cells[0] == '**':
+                    cells = cells[1:]
+                if len(cells) < 3:
+                    continue
+                name = cells[1]
+                if name[0] == 'X':
+                    self.values[int(name[1:])] = float(cells[2])
+                elif name[0] == 'C':
+                    self.columns[int(name[1:])].varValue = float(cells[2])
+        return status
+
+    def size(self):
+        """Rows, columns, integer columns and nonzeros of the program, from
+        its last ``write`` (or a write to nowhere)."""
+        if not hasattr(self, '_size'):
+            self._size = self.write(os.devnull)
+        return self._size
+
+    def _x_values(self):
+        t = self.targets
+        if self.values is None:
+            return [None] * (t.number_students * t.number_groups)
+        return self.values
+
+    def objective(self):
+        if self.values is None:
+            return None
+        return sum(cost * column.varValue
+                   for column, cost in zip(self.columns, self._costs()))
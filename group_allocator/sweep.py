@@ -0,0 +1,284 @@
+# ============================================================================
+# Group Allocator - weighting factor sweep
+#
+# Solves the same cohort for many sets of weighting factors, a grid or a
+# random sample, in a process pool. Each worker builds the model once and
+# only changes its objective between solves, and each solve starts from
+# the allocation of the nearest set of weights already solved. The result
+# is the trade-off between GPA spread, GPA variance spread and slack in
+# the balance constraints: the allocations that no other allocation beats
+# on all three (the Pareto frontier).
+# ============================================================================
+import itertools
+import math
+import multiprocessing
+import queue
+import random
+import time
+
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import DEFAULT_WEIGHTS, Model, Targets
+from group_allocator.score import Scorer
+from group_allocator.search import LocalSearch
+
+# Each set of weights solved, with its measures, and the allocations of
+# the Pareto frontier (SWEEP_ALLOCATION % point)
+SWEEP_RESULTS = 'sweep.csv'
+SWEEP_ALLOCATION = 'sweep_%d_allocation.csv'
+
+# Added to the weights before comparing their logarithms, so a weight of
+# zero has neighbours
+WEIGHT_OFFSET = 1e-3
+
+
+def weight_grid(values, weights=None):
+    """Every combination of the factor ``values`` (a dictionary of lists),
+    with the other factors from ``weights`` or the defaults."""
+    base = dict(DEFAULT_WEIGHTS)
+    base.update(weights or {})
+    names = sorted(values)
+    grid = []
+    for combination in itertools.product(*[values[name] for name in names]):
+        point = dict(base)
+        point.update(zip(names, combination))
+        grid.append(point)
+    return grid
+
+
+def weight_sample(values, samples, weights=None, seed=None):
+    """``samples`` sets of weights with each factor of ``values`` drawn
+    between its least and greatest value, uniformly in its logarithm."""
+    rng = random.Random(seed)
+    base = dict(DEFAULT_WEIGHTS)
+    base.update(weights or {})
+    points = []
+    for _ in range(samples):
+        point = dict(base)
+        for name in sorted(values):
+            low = math.log(min(values[name]) + WEIGHT_OFFSET)
+            high = math.log(max(values[name]) + WEIGHT_OFFSET)
+            point[name] = round(math.exp(rng.uniform(low, high)) -
+                                WEIGHT_OFFSET, 6)
+        points.append(point)
+    return points
+
+
+def distance(a, b):
+    """Distance between two sets of weights, in their logarithms."""
+    return sum(abs(math.log((a[name] + WEIGHT_OFFSET) /
+                            (b[name] + WEIGHT_OFFSET))) for name in a)
+
+
+class Point(object):
+    """One set of ``weights`` of a sweep and its allocation, found from the
+    allocation of point ``neighbour`` (None if from scratch).
+
+    The measures of the frontier are ``gpa_spread``, ``variance_spread``
+    and ``slack``, the total of the artificial variables; ``objective`` is
+    under the point's own weights. ``pareto`` is set by ``pareto_front``.
+    """
+
+    def __init__(self, point, weights, neighbour=None):
+        self.point = point
+        self.weights = weights
+        self.neighbour = neighbour
+        self.status = None
+        self.stop_reason = None
+        self.groups = None
+        self.objective = None
+        self.gpa_spread = None
+        self.variance_spread = None
+        self.slack = None
+        self.seconds = None
+        self.pareto = False
+
+    def measures(self):
+        return (self.gpa_spread, self.variance_spread, self.slack)
+
+
+# Model of each worker, built once by _start_worker
+_worker = {}
+
+
+def _start_worker(roster, number_groups, mode, time_limit, warm_start,
+                  stopping):
+    targets = Targets(roster, number_groups)
+    _worker.update(roster=roster, targets=targets, mode=mode,
+                   time_limit=time_limit, warm_start=warm_start,
+                   stopping=stopping or {}, model=None)
+    if mode != 'search':
+        _worker['model'] = Model(roster, number_groups)
+
+
+def _solve_point(arguments):
+    """Solve one point, given as its number, weights and start."""
+    point, weights, start = arguments
+    began = time.time()
+    roster = _worker['roster']
+    targets = _worker['targets']
+    stopping = _worker['stopping']
+    if start is None and (_worker['mode'] == 'search' or
+                          _worker['warm_start']):
+        start = snake_draft(roster, targets)
+    if _worker['mode'] == 'search':
+        search = LocalSearch(roster, targets, start, weights, seed=point)
+        groups = search.run(_worker['time_limit'] or 10.0,
+                            stall=stopping.get('stall'),
+                            target=stopping.get('target'))
+        status = 'Searched'
+        stop_reason = search.stop_reason
+    else:
+        model = _worker['model']
+        model.set_weights(weights)
+        if start is None:
+            model.warm_start = False
+        else:
+            model.set_start(start)
+        status = model.solve(_worker['time_limit'], **stopping)
+        stop_reason = model.stop_reason
+        groups = model.assignment()
+        if None in groups:
+            groups = None
+    return point, status, stop_reason, groups, time.time() - began
+
+
+def _failed(point, error):
+    """The outcome of a point whose worker raised ``error``."""
+    return point, 'Failed', '%s: %s' % (type(error).__name__, error), \
+        None, None
+
+
+def sweep(roster, number_groups, points, mode='mip', time_limit=None,
+          warm_start=False, processes=None, stopping=None):
+    """Solve ``roster`` for each set of weights in ``points``, ``processes``
+    at a time (default one per core), each under ``time_limit`` and the
+    ``stopping`` rules, which may also hold the ``SOLVER_SETTINGS``.
+
+    The first solves start from scratch (from a snake draft with
+    ``warm_start`` or for the search). Every later one starts from the
+    allocation of the nearest solved point, so points are started in order
+    of their distance from the solved ones. A point whose solve raises is
+    recorded as 'Failed', with the error as its stop reason. Returns the
+    ``Point`` of every set of weights, in order, with its frontier marked.
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(points)))
+    results = [Point(i, weights) for i, weights in enumerate(points)]
+    initializer = (roster, number_groups, mode, time_limit, warm_start,
+                   stopping)
+    waiting = set(range(len(points)))
+    solved = []
+    # Distance from each waiting point to its nearest solved point, and
+    # that point, kept up to date as points are solved
+    nearest = {}
+
+    def task():
+        # The waiting point nearest a solved point, with its start
+        if not solved:
+            point = min(waiting)
+            waiting.remove(point)
+            return point, points[point], None
+        point = min(waiting, key=lambda p: (nearest[p][0], p))
+        waiting.remove(point)
+        neighbour = nearest.pop(point)[1]
+        results[point].neighbour = neighbour
+        return point, points[point], results[neighbour].groups
+
+    def finish(outcome):
+        point, status, stop_reason, groups, seconds = outcome
+        result = results[point]
+        result.status = status
+        result.stop_reason = stop_reason
+        result.groups = groups
+        result.seconds = seconds
+        if groups is not None:
+            score = Scorer(roster, number_groups,
+                           result.weights).score(groups)
+            result.objective = score.objective
+            result.gpa_spread, result.variance_spread = score.spreads()
+            result.slack = sum(total for _, total in score.relaxation)
+            solved.append(point)
+            for p in waiting:
+                entry = (distance(points[p], points[point]), point)
+                if p not in nearest or entry < nearest[p]:
+                    nearest[p] = entry
+
+    if processes == 1:
+        _start_worker(*initializer)
+        while waiting:
+            arguments = task()
+            try:
+                outcome = _solve_point(arguments)
+            except Exception as error:
+                outcome = _failed(arguments[0], error)
+            finish(outcome)
+    else:
+        done = queue.Queue()
+        pool = multiprocessing.Pool(processes, _start_worker, initializer)
+
+        def submit(arguments):
+            # A failed point must still reach done, or done.get() waits
+            # for it forever
+            point = arguments[0]
+            pool.apply_async(_solve_point, (arguments,), callback=done.put,
+                             error_callback=lambda error: done.put(
+                                 _failed(point, error)))
+
+        try:
+            # The first round starts from scratch, spread over the points
+            running = 0
+            first = sorted(waiting)[::max(1, len(points) // processes)]
+            for point in first[:processes]:
+                waiting.remove(point)
+                submit((point, points[point], None))
+                running += 1
+            while running:
+                finish(done.get())
+                running -= 1
+                while waiting and running < processes:
+                    submit(task())
+                    running += 1
+        finally:
+            pool.close()
+            pool.join()
+    pareto_front(results)
+    return results
+
+
+def pareto_front(results):
+    """Mark the results with an allocation that no other beats on every
+    measure, and return them by increasing GPA spread."""
+    found = [result for result in results if result.groups is not None]
+
+    def beats(other, result):
+        # Repeats of the same measures keep the first point
+        if other.measures() == result.measures():
+            return other.point < result.point
+        return all(a <= b for a, b in zip(other.measures(),
+                                          result.measures()))
+
+    for result in found:
+        result.pareto = not any(beats(other, result) for other in found)
+    return sorted((result for result in found if result.pareto),
+                  key=lambda result: result.measures())
+
+
+def sweep_table(results):
+    """Rows of SWEEP_RESULTS: the weights and measures of each point."""
+    names = sorted(results[0].weights if results else DEFAULT_WEIGHTS)
+    rows = [['Point'] + ['factor_%s' % name for name in names] +
+            ['Start From', 'Status', 'Stopped On', 'Objective', 'GPA Spread',
+             'Variance Spread', 'Slack', 'Seconds', 'Pareto']]
+    for result in results:
+        def measure(value):
+            return '' if value is None else '%.6f' % value
+        rows.append([result.point] +
+                    [result.weights[name] for name in names] +
+                    ['' if result.neighbour is None else result.neighbour,
+                     result.status, result.stop_reason,
+                     measure(result.objective), measure(result.gpa_spread),
+                     measure(result.variance_spread), measure(result.slack),
+                     '' if result.seconds is None else
+                     '%.2f' % result.seconds, int(result.pareto)])
+    return rows
@@ -0,0 +1,94 @@
+# ============================================================================
+# Group Allocator - synthetic cohorts
+#
+# Seeded generator of realistic rosters for benchmarks, following
+# data_analysis/data_gen.xlsx: normally distributed GPAs, a 20% female
+# cohort, and the specialisation and ethnicity frequencies of that sheet,
+# with a share of outstanding students above OUTSTANDING_GPA.
+#
+#   python -m group_allocator.synthetic 2000 students.csv --seed 1
+# ============================================================================
+import argparse
+import random
+
+from group_allocator.model import OUTSTANDING_GPA
+from group_allocator.report import allocation_table, write_csv
+from group_allocator.roster import NOT_APPLICABLE, Roster
+
+# Students of each specialisation in data_gen.xlsx
+SPECIALISATIONS = (
+    ('Engineering Science', 30),
+    ('Biomedical', 25),
+    ('Electrical', 100),
+    ('Computer Systems', 50),
+    ('Software', 50),
+    ('Chemmat', 50),
+    ('Civil', 200),
+    ('Mechanical', 100),
+    ('Mechatronics', 80),
+)
+
+# Share of each ethnicity in data_gen.xlsx
+ETHNICITIES = (
+    ('European', 0.5),
+    ('Asian', 0.2),
+    ('Pacific', 0.1),
+    ('Indian', 0.2),
+)
+
+
+def synthetic_roster(number_students, seed=0, female_share=0.2,
+                     gpa_mean=5.0, gpa_deviation=1.0, outstanding_share=0.05,
+                     not_applicable_share=0.05):
+    """A roster of ``number_students`` made up students.
+
+    GPAs are normal with ``gpa_mean`` and ``gpa_deviation``, kept within
+    0 to 9 and below OUTSTANDING_GPA, except for ``outstanding_share`` of
+    the students whose GPA is uniform from OUTSTANDING_GPA to 9. A
+    ``not_applicable_share`` of students have no specialisation, and as
+    many no ethnicity. The same arguments always give the same roster.
+    """
+    rng = random.Random(seed)
+    specialisations = [name for name, _ in SPECIALISATIONS]
+    specialisation_weights = [float(n) for _, n in SPECIALISATIONS]
+    ethnicities = [name for name, _ in ETHNICITIES]
+    ethnicity_weights = [share for _, share in ETHNICITIES]
+    columns = dict((name, list()) for name in (
+        'ids', 'names', 'gender', 'gpa', 'specialisation', 'ethnicity',
+        'upi'))
+    for s in range(number_students):
+        if rng.random() < outstanding_share:
+            gpa = rng.uniform(OUTSTANDING_GPA, 9.0)
+        else:
+            gpa = min(max(rng.gauss(gpa_mean, gpa_deviation), 0.0),
+                      OUTSTANDING_GPA - 0.01)
+        columns['ids'].append(str(1000000 + s))
+        columns['names'].append('Student %d' % (s + 1))
+        columns['gender'].append('Female' if rng.random() < female_share
+                                 else 'Male')
+        columns['gpa'].append(round(gpa, 2))
+        columns['specialisation'].append(
+            NOT_APPLICABLE if rng.random() < not_applicable_share else
+            rng.choices(specialisations, specialisation_weights)[0])
+        columns['ethnicity'].append(
+            NOT_APPLICABLE if rng.random() < not_applicable_share else
+            rng.choices(ethnicities, ethnicity_weights)[0])
+        columns['upi'].append('syn%05d' % (s + 1))
+    return Roster(**columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='group_allocator.synthetic',
+        description='Write a synthetic roster laid out like Student_Data.')
+    parser.add_argument('students', type=int, help='number of students')
+    parser.add_argument('path', help='CSV file to write')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    roster = synthetic_roster(args.students, seed=args.seed)
+    write_csv(args.path, allocation_table(roster, roster.groups))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
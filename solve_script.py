@@ -32,7 +32,69 @@
 from pulp import *
 from math import ceil
 from System import Array
+from System.Diagnostics import Process
 import datetime
+import json
+import os
+import re
+import time
+
+
+# ============================================================================
+# Run report: wall time and memory of each phase, written as
+# run_report.json next to the Student View workbook
+run_report = {'started': datetime.datetime.now().isoformat(), 'phases': []}
+
+
+def peak_memory():
+    """Peak working set in MB of Excel's process so far."""
+    return Process.GetCurrentProcess().PeakWorkingSet64 / (1024.0 * 1024.0)
+
+
+def start_phase(name):
+    """End the current phase of the run report and start phase name (None
+    to only end the current one). The peak working set only ever rises, so
+    a phase's memory is its increase over the peak at its start."""
+    now = time.time()
+    memory = peak_memory()
+    phases = run_report['phases']
+    if phases and 'seconds' not in phases[-1]:
+        phases[-1]['seconds'] = round(now - phases[-1].pop('began'), 3)
+        phases[-1]['peak_memory_so_far_mb'] = memory
+        phases[-1]['peak_memory_increase_mb'] = \
+            memory - phases[-1].pop('memory')
+    if name is not None:
+        phases.append({'name': name, 'began': now, 'memory': memory})
+
+
+def read_solver_log(log_path):
+    """CBC's result line, lower bound and MIP gap from its log at log_path,
+    each None if there is no log (older PuLP). The gap is the one CBC's
+    -ratio stopping rule uses: objective minus bound over the larger of
+    their magnitudes, and 0 when proven optimal."""
+    found = {'result': None, 'objective': None, 'bound': None}
+    if os.path.exists(log_path):
+        for line in open(log_path):
+            for name, pattern in (('result', r'^Result - (.*)$'),
+                                  ('objective', r'^Objective value:\s+(\S+)'),
+                                  ('bound', r'^Lower bound:\s+(\S+)')):
+                match = re.match(pattern, line.strip())
+                if match:
+                    found[name] = match.group(1)
+    objective, bound = [None if found[name] is None else float(found[name])
+                        for name in ('objective', 'bound')]
+    # A solve stopped within the gap tolerance is reported as optimal too,
+    # so the bound comes first
+    gap = None
+    if objective is not None and bound is not None:
+        gap = (objective - bound) / max(abs(objective), abs(bound), 1e-10)
+    elif found['result'] and found['result'].lower().startswith('optimal'):
+        gap = 0.0
+    return {'solver_result': found['result'], 'bound': bound,
+            'mip_gap': gap}
+
+
+start_phase('build model')
 problem = LpProblem('ENGGEN403', LpMinimize)
 print('Creating model...')
 
@@ -90,22 +152,49 @@ GROUPS2 = range(j1 + 1, int(number_groups) + 1)
 # Average GPA of all students
 gpa_mean = sum([gpa[i] for i in STUDENTS]) / number_students
 
+# Squared deviation of each student's GPA from the class mean
+gpa_deviation = {}
+for s in STUDENTS:
+    gpa_deviation[s] = pow(gpa[s] - gpa_mean, 2)
+
 # Total GPA variance
-gpa_variance_total = (sum(pow(gpa[s] - gpa_mean, 2)
-                          for s in STUDENTS)) \
+gpa_variance_total = sum(gpa_deviation[s] for s in STUDENTS) \
     / number_students
 
+# Index students by each (lowercased) attribute in a single pass so that the
+# counts and constraints below only touch the students they apply to
+gender_index = {}
+specialisation_index = {}
+ethnicity_index = {}
+OUTSTANDING_STUDENTS = list()
+for s in STUDENTS:
+    gender_index.setdefault(gender[s].lower(), []).append(s)
+    specialisation_index.setdefault(specialisation[s].lower(), []).append(s)
+    ethnicity_index.setdefault(ethnicity[s].lower(), []).append(s)
+    if gpa[s] >= outstanding_gpa:
+        OUTSTANDING_STUDENTS.append(s)
+
+MALE_STUDENTS = gender_index.get('male', [])
+FEMALE_STUDENTS = gender_index.get('female', [])
+
+SPECIALISATION_STUDENTS = {}
+for k in SPECIALISATIONS:
+    SPECIALISATION_STUDENTS[k] = specialisation_index.get(k.lower(), [])
+
+ETHNICITY_STUDENTS = {}
+for e in ETHNICITIES:
+    ETHNICITY_STUDENTS[e] = ethnicity_index.get(e.lower(), [])
+
 # Minimum number of females and males in each group
-number_males = sum([gender[i].lower() == 'male' for i in STUDENTS])
+number_males = len(MALE_STUDENTS)
 male_min = int(number_males / number_groups)
-number_females = sum([gender[i].lower() == 'female' for i in STUDENTS])
+number_females = len(FEMALE_STUDENTS)
 female_min = int(number_females / number_groups)
 
 # Number in each specialisation
 specialisation_counts = {}
 for s in SPECIALISATIONS:
-    specialisation_counts[s] = sum([specialisation[i].lower()
-                                   == s.lower() for i in STUDENTS])
+    specialisation_counts[s] = len(SPECIALISATION_STUDENTS[s])
 
 # Minimum number of each specialisation in each group
 specialisation_min = {}
@@ -118,8 +207,7 @@ for s in SPECIALISATIONS:
 # Number from each ethnicity
 ethnicity_counts = {}
 for e in ETHNICITIES:
-    ethnicity_counts[e] = sum([ethnicity[i].lower()
-                              == e.lower() for i in STUDENTS])
+    ethnicity_counts[e] = len(ETHNICITY_STUDENTS[e])
 
 # Minimum number of each ethnicity in each group
 ethnicity_min = {}
@@ -129,10 +217,7 @@ for e in ETHNICITIES:
     ethnicity_max[e] = int(ceil(ethnicity_counts[e] / number_groups) + beta)
 
 # Number of outstanding students in each group
-oustanding_count = 0
-for s in STUDENTS:
-    if gpa[s] >= outstanding_gpa:
-        oustanding_count += 1
+oustanding_count = len(OUTSTANDING_STUDENTS)
 
 oustanding_gpa_min = int(oustanding_count / number_groups)
 
@@ -207,110 +292,153 @@ if chart_only != "Yes":
         # Size if group is m1
         problem += lpSum([x[(s, g)] for s in STUDENTS]) == m1, 'size_g%d' % g
 
+        # Total GPA and squared deviation of the group, shared by the
+        # min and max rows below
+        group_gpa = lpSum([gpa[s] * x[(s, g)] for s in STUDENTS])
+        group_deviation = lpSum([gpa_deviation[s] * x[(s, g)]
+                                 for s in STUDENTS])
+
         # Minimum GPA is given by group with lowest GPA
-        problem += lpSum([gpa[s] * x[(s, g)] for s in STUDENTS]) >= m1 * gpa_min, \
-            'calculate_min_gpa_g%d' % g
+        problem += group_gpa >= m1 * gpa_min, 'calculate_min_gpa_g%d' % g
 
         # Maximum GPA is given by group with highest GPA
-        problem += lpSum([gpa[s] * x[(s, g)] for s in STUDENTS]) <= m1 * gpa_max, \
-            'calculate_max_gpa_g%d' % g
+        problem += group_gpa <= m1 * gpa_max, 'calculate_max_gpa_g%d' % g
 
         # Minimum variance of GPA is given by group with lowest variance
-        problem += lpSum([pow(gpa[s] - gpa_mean, 2) * x[(s, g)] for s in STUDENTS]) \
-            >= m1 * gpa_variance_min, 'calculate_gpa_variance_min_g%d' % g
+        problem += group_deviation >= m1 * gpa_variance_min, \
+            'calculate_gpa_variance_min_g%d' % g
 
         # Maximum variance of GPA is given by group with highest variance
-        problem += lpSum([pow(gpa[s] - gpa_mean, 2) * x[(s, g)] for s in STUDENTS]) \
-            <= m1 * gpa_variance_max, 'calculate_gpa_variance_max_g%d' % g
+        problem += group_deviation <= m1 * gpa_variance_max, \
+            'calculate_gpa_variance_max_g%d' % g
 
     # Constraint for second group size
     for g in GROUPS2:
         # Size if group is m2
         problem += lpSum([x[(s, g)] for s in STUDENTS]) == m2, 'size_g%d' % g
 
+        # Total GPA and squared deviation of the group, shared by the
+        # min and max rows below
+        group_gpa = lpSum([gpa[s] * x[(s, g)] for s in STUDENTS])
+        group_deviation = lpSum([gpa_deviation[s] * x[(s, g)]
+                                 for s in STUDENTS])
+
         # Minimum GPA is given by group with lowest GPA
-        problem += lpSum([gpa[s] * x[(s, g)] for s in STUDENTS]) >= m2 * gpa_min, \
-            'calculate_min_gpa_g%d' % g
+        problem += group_gpa >= m2 * gpa_min, 'calculate_min_gpa_g%d' % g
 
         # Maximum GPA is given by group with highest GPA
-        problem += lpSum([gpa[s] * x[(s, g)] for s in STUDENTS]) <= m2 * gpa_max, \
-            'calculate_max_gpa_g%d' % g
+        problem += group_gpa <= m2 * gpa_max, 'calculate_max_gpa_g%d' % g
 
         # Minimum variance of GPA is given by group with lowest variance
-        problem += lpSum([pow(gpa[s] - gpa_mean, 2) * x[(s, g)] for s in STUDENTS]) \
-            >= m2 * gpa_variance_min, 'calculate_gpa_variance_min_g%d' % g
+        problem += group_deviation >= m2 * gpa_variance_min, \
+            'calculate_gpa_variance_min_g%d' % g
      
         # Maximum variance of GPA is given by group with highest variance
-        problem += lpSum([pow(gpa[s] - gpa_mean, 2) * x[(s, g)] for s in STUDENTS]) \
-            <= m2 * gpa_variance_max, 'calculate_gpa_variance_max_g%d' % g
+        problem += group_deviation <= m2 * gpa_variance_max, \
+            'calculate_gpa_variance_max_g%d' % g
 
     # Semi-relaxed constraints to enforce gender,
     # specialisation and ethnicity distribution
     for g in GROUPS:
         # Gender must be at least minimum (relaxed)
-        problem += lpSum([x[(s, g)] for s in STUDENTS if gender[s].lower() == 'female']) \
+        problem += lpSum([x[(s, g)] for s in FEMALE_STUDENTS]) \
             + female_artificial[g] >= female_min, \
             'min_females_g%d' % g
 
-        problem += lpSum([x[(s, g)] for s in STUDENTS if gender[s].lower() == 'male']) \
+        problem += lpSum([x[(s, g)] for s in MALE_STUDENTS]) \
             + male_artificial[g] >= male_min, \
             'min_males_g%d' % g
 
         # Number from each specialisation must be at least min (relaxed)
         for k in SPECIALISATIONS:
-            problem += lpSum([x[(s, g)] for s in STUDENTS
-                             if specialisation[s].lower() == k.lower()]) \
+            problem += lpSum([x[(s, g)] for s in SPECIALISATION_STUDENTS[k]]) \
                 + specialisation_artificial_min[(k, g)] >= specialisation_min[k], \
                 'min_spec%s_g%d' % (k, g)
 
         # Number from each specialisation must be at most max (relaxed)
         for k in SPECIALISATIONS:
-            problem += lpSum([x[(s, g)] for s in STUDENTS
-                             if specialisation[s].lower() == k.lower()]) \
+            problem += lpSum([x[(s, g)] for s in SPECIALISATION_STUDENTS[k]]) \
                 - specialisation_artificial_max[(k, g)] <= specialisation_max[k], \
                 'max_spec%s_g%d' % (k, g)
 
         # Number from each ethnicity must be at least min (relaxed)
         for e in ETHNICITIES:
-            problem += lpSum([x[(s, g)] for s in STUDENTS
-                             if ethnicity[s].lower() == e.lower()]) \
+            problem += lpSum([x[(s, g)] for s in ETHNICITY_STUDENTS[e]]) \
                 + ethnicity_artificial_min[(e, g)] >= ethnicity_min[e], \
                 'min_eth%s_g%d' % (e, g)
 
         # Number from each ethnicity must be at most max (relaxed)
         for e in ETHNICITIES:
-            problem += lpSum([x[(s, g)] for s in STUDENTS
-                             if ethnicity[s].lower() == e.lower()]) \
+            problem += lpSum([x[(s, g)] for s in ETHNICITY_STUDENTS[e]]) \
                 - ethnicity_artificial_max[(e, g)] <= ethnicity_max[e], \
                 'max_eth%s_g%d' % (e, g)
 
         # Number of oustanding students must be at least min (relaxed)
-        problem += lpSum([x[(s, g)] for s in STUDENTS
-                         if gpa[s] >= outstanding_gpa]) \
+        problem += lpSum([x[(s, g)] for s in OUTSTANDING_STUDENTS]) \
             + oustanding_gpa_artificial[g] >= oustanding_gpa_min, \
             'out_gpa%s_g%d' % (e, g)
 
     # ============================================================================
     #   Solve
 
+    run_report['model'] = {
+        'rows': len(problem.constraints),
+        'columns': len(problem.variables()),
+        'nonzeros': sum(len(c) for c in problem.constraints.values())}
+    start_phase('solve')
     print('Solving . . .')
+    solver_log = '%s\\solver.log' % Application.ActiveWorkbook.path
+    if os.path.exists(solver_log):
+        os.remove(solver_log)
     try:
-        # SolverStudio version < 0.6
-        problem.solve(solvers.PULP_CBC_CMD(msg=1, maxSeconds=time_limit))
-    except:
-        # new version >= 0.6
-        problem.solve(COIN_CMD(msg=1, maxSeconds=time_limit))
+        # PuLP 2 writes CBC's log to a file, read back for the MIP gap
+        solver = COIN_CMD(msg=1, timeLimit=time_limit, logPath=solver_log)
+    except TypeError:
+        solver = None
+    if solver is not None:
+        problem.solve(solver)
+    else:
+        try:
+            # SolverStudio version < 0.6
+            problem.solve(solvers.PULP_CBC_CMD(msg=1, maxSeconds=time_limit))
+        except:
+            # new version >= 0.6
+            problem.solve(COIN_CMD(msg=1, maxSeconds=time_limit))
 
     # ============================================================================
     #   Solution Post Processing and Display in Excel spreadsheet
 
     print('Finished Solving')
+    start_phase('post-processing')
+    run_report['status'] = LpStatus[problem.status]
+    run_report['objective'] = value(problem.objective)
+    run_report.update(read_solver_log(solver_log))
 
 
-    # Write group number for each student and add to group list
-    for s, g in STUDENT_GROUP:
-        if x[(s, g)].value() == 1:
-            groups[s] = g
+    # Write group number for each student: the group with the largest x,
+    # read once per variable. A student is flagged unless that x is within
+    # ASSIGNMENT_TOLERANCE of 1 and the others of 0.
+    ASSIGNMENT_TOLERANCE = 1e-4
+    unclear_students = list()
+    for s in STUDENTS:
+        row = [x[(s, g)].varValue for g in GROUPS]
+        if None in row:
+            groups[s] = None
+            unclear_students.append(s)
+            continue
+        largest = max(row)
+        if largest > 0.5:
+            groups[s] = GROUPS[row.index(largest)]
+        else:
+            groups[s] = None
+        if largest < 1 - ASSIGNMENT_TOLERANCE or \
+                sum(row) - largest > ASSIGNMENT_TOLERANCE:
+            unclear_students.append(s)
+    if unclear_students:
+        print('Warning: %d students have no clear group in the solution: %s'
+              % (len(unclear_students),
+                 ', '.join(UPI[s] for s in unclear_students)))
+    run_report['unclear_students'] = [UPI[s] for s in unclear_students]
 
     gpa_difference = gpa_max.value() - gpa_min.value()
     gpa_variance_difference = gpa_variance_max.value() - gpa_variance_min.value()
@@ -339,6 +467,8 @@ if chart_only != "Yes":
     print('Oustanding GPA Min: %.0f' %
           sum([oustanding_gpa_artificial[i].value() for i in GROUPS]))
     print('\n')
+    run_report['gpa_difference'] = gpa_difference
+    run_report['gpa_variance_difference'] = gpa_variance_difference
 
 
 # ============================================================================
@@ -346,190 +476,171 @@ if chart_only != "Yes":
 
 # If charting only, code will continue here
 
-# Make list to hold groups
-students_in_group = {}
+# Every student needs a group for the statistics: stop if the solver gave
+# some none, or the Allocated Group column has blanks when charting only
+no_group = [s for s in STUDENTS if groups[s] not in GROUPS]
+if no_group:
+    raise ValueError('%d students have no group from 1 to %d, so there are '
+                     'no group statistics: %s'
+                     % (len(no_group), number_groups,
+                        ', '.join(UPI[s] for s in no_group)))
+
+# Group statistics in one pass over the students, with each category as
+# an integer code and the counts of every group in a flat list
+GENDER_CODE = {'male': 0, 'female': 1}
+specialisation_code = dict((k, i) for i, k in enumerate(SPECIALISATIONS))
+ethnicity_code = dict((e, i) for i, e in enumerate(ETHNICITIES))
+number_specialisations = len(SPECIALISATIONS)
+number_ethnicities = len(ETHNICITIES)
 
+students_in_group = {}
 for g in GROUPS:
     students_in_group[g] = list()
-
+students_count = [0] * (number_groups + 1)
+gender_count = [0] * (2 * (number_groups + 1))
+specialisation_count = [0] * (number_specialisations * (number_groups + 1))
+ethnicity_count = [0] * (number_ethnicities * (number_groups + 1))
+gpa_total = [0.0] * (number_groups + 1)
 for s in STUDENTS:
-    for g in GROUPS:
-        if groups[s] == g:
-            students_in_group[g].append(s)
+    g = groups[s]
+    students_in_group[g].append(s)
+    students_count[g] += 1
+    gpa_total[g] += gpa[s]
+    k = GENDER_CODE.get(gender[s].lower())
+    if k is not None:
+        gender_count[2 * g + k] += 1
+    k = specialisation_code.get(specialisation[s])
+    if k is not None:
+        specialisation_count[number_specialisations * g + k] += 1
+    k = ethnicity_code.get(ethnicity[s])
+    if k is not None:
+        ethnicity_count[number_ethnicities * g + k] += 1
+
+# Average GPA, and squared deviations from it, of each group
+gpa_deviation_total = [0.0] * (number_groups + 1)
+for s in STUDENTS:
+    g = groups[s]
+    gpa_deviation_total[g] += pow(gpa[s] - gpa_total[g] / students_count[g],
+                                  2)
 
-# Perform calculations for each group
 students_group = {}
 males_group = {}
 females_group = {}
-gpa_total_group = {}
+gpa_mean_group = {}
+gpa_variance_group = {}
 specialisations_group = {}
-for s in SPECIALISATIONS:
-    specialisations_group[s] = {}
 ethnicities_group = {}
+for k in SPECIALISATIONS:
+    specialisations_group[k] = {}
 for e in ETHNICITIES:
     ethnicities_group[e] = {}
-
-# Initialise python sets
-for g in GROUPS:
-    students_group[g] = 0
-    males_group[g] = 0
-    females_group[g] = 0
-    gpa_total_group[g] = float(0.00)
-    for s in SPECIALISATIONS:
-        specialisations_group[s][g] = 0
-    for e in ETHNICITIES:
-        ethnicities_group[e][g] = 0
-
-# Count the number of males, females etc in each group
-for s in STUDENTS:
-    g = groups[s]
-    if gender[s].lower() == 'female':
-        females_group[g] += 1
-    elif gender[s].lower() == 'male':
-        males_group[g] += 1
-    gpa_total_group[g] += gpa[s]
-    for k in SPECIALISATIONS:
-        if specialisation[s] == k:
-            specialisations_group[k][g] += 1
-    for e in ETHNICITIES:
-        if ethnicity[s] == e:
-            ethnicities_group[e][g] += 1
-    students_group[g] += 1
-
-# Compute average GPA for each group
-gpa_mean_group = {}
 for g in GROUPS:
-    gpa_mean_group[g] = float(gpa_total_group[g]) / float(students_group[g])
-
-# Compute GPA variance for each group
-gpa_variance_group = {}
+    students_group[g] = students_count[g]
+    males_group[g] = gender_count[2 * g]
+    females_group[g] = gender_count[2 * g + 1]
+    gpa_mean_group[g] = gpa_total[g] / float(students_count[g])
+    gpa_variance_group[g] = gpa_deviation_total[g] / float(students_count[g])
+    for i, k in enumerate(SPECIALISATIONS):
+        specialisations_group[k][g] = \
+            specialisation_count[number_specialisations * g + i]
+    for i, e in enumerate(ETHNICITIES):
+        ethnicities_group[e][g] = ethnicity_count[number_ethnicities * g + i]
+
+
+def quartile(values, q):
+    """Quartile q (0-4) of sorted values, as WorksheetFunction.Quartile."""
+    position = (len(values) - 1) * q / 4.0
+    lower = int(position)
+    if lower + 1 >= len(values):
+        return values[lower]
+    return values[lower] + (position - lower) * (values[lower + 1] -
+                                                 values[lower])
+
+
+# GPAs of each group in increasing order, from a single sort of the class
+gpas_in_group = {}
 for g in GROUPS:
-    gpa_variance_group[g] = float((sum(pow(gpa[s] - gpa_mean_group[g], 2)
-                                  for s in students_in_group[g]))) \
-        / float(len(students_in_group[g]))
+    gpas_in_group[g] = list()
+for s in sorted(STUDENTS, key=lambda s: gpa[s]):
+    gpas_in_group[groups[s]].append(gpa[s])
 
+# Print data to spreadsheet
+# Every table is built in memory and written to its range in one call, as
+# each COM call is a round trip to Excel
+def write_table(ws, row, column, table):
+    """Write table (a list of equal-length rows) to ws with its top left
+    cell at (row, column), and return the range written."""
+    values = Array.CreateInstance(object, len(table), len(table[0]))
+    for i in range(len(table)):
+        for j in range(len(table[i])):
+            values[i, j] = table[i][j]
+    table_range = ws.Range(ws.Cells(row, column),
+                           ws.Cells(row + len(table) - 1,
+                                    column + len(table[0]) - 1))
+    table_range.Value = values
+    return table_range
 
 
-# Print data to spreadsheet
 # Summary Results
+start_phase('summary results')
 ws = Application.Worksheets('Summary_Results')
 ws.Cells.Clear()
 
-# Results for each group
-ws.Cells(1, 1).Value = 'Group'
-ws.Cells(1, 1).Font.Bold = True
-# Rows of table
-ws.Cells(2, 1).Value = 'Whole Class'
-cell_index = 2
-for g in GROUPS:
-    cell_index += 1
-    ws.Cells(cell_index, 1).Value = g
-
 # Columns of Table
-ws.Cells(1, 2).Value = 'Students'
-ws.Cells(1, 2).Font.Bold = True
-ws.Cells(1, 3).Value = 'Males'
-ws.Cells(1, 3).Font.Bold = True
-ws.Cells(1, 4).Value = 'Females'
-ws.Cells(1, 4).Font.Bold = True
-ws.Cells(1, 5).Value = 'Mean GPA'
-ws.Cells(1, 5).Font.Bold = True
-ws.Cells(1, 6).Value = 'GPA Variance'
-ws.Cells(1, 6).Font.Bold = True
-cell_index = 6
-for s in SPECIALISATIONS:
-    cell_index += 1
-    ws.Cells(1, cell_index).Value = s
-    ws.Cells(1, cell_index).Font.Bold = True
-    ws.Range(ws.Cells(1, cell_index),
-             ws.Cells(1, cell_index)).Interior.ThemeColor = 5
-for e in ETHNICITIES:
-    cell_index += 1
-    ws.Cells(1, cell_index).Value = e
-    ws.Cells(1, cell_index).Font.Bold = True
-    ws.Range(ws.Cells(1, cell_index),
-             ws.Cells(1, cell_index)).Interior.ThemeColor = 6
+summary_table = [['Group', 'Students', 'Males', 'Females', 'Mean GPA',
+                  'GPA Variance'] + SPECIALISATIONS + ETHNICITIES]
 
-# Fill in table data by column
 # Whole Class frst
-ws.Cells(2, 2).Value = number_students
-ws.Cells(2, 3).Value = number_males
-ws.Cells(2, 4).Value = number_females
-ws.Cells(2, 5).Value = '%.2f' % gpa_mean
-ws.Cells(2, 6).Value = '%.2f' % gpa_variance_total
-cell_index = 6
-for s in SPECIALISATIONS:
-    cell_index += 1
-    ws.Cells(2, cell_index).Value = specialisation_counts[s]
+summary_table.append(['Whole Class', number_students, number_males,
+                      number_females, '%.2f' % gpa_mean,
+                      '%.2f' % gpa_variance_total]
+                     + [specialisation_counts[s] for s in SPECIALISATIONS]
+                     + [ethnicity_counts[e] for e in ETHNICITIES])
 
-for e in ETHNICITIES:
-    cell_index += 1
-    ws.Cells(2, cell_index).Value = ethnicity_counts[e]
-
-    # Each group
-cell_index = 2
+# Each group
 for g in GROUPS:
-    cell_index += 1
-    ws.Cells(cell_index, 2).Value = students_group[g]
-    ws.Cells(cell_index, 3).Value = males_group[g]
-    ws.Cells(cell_index, 4).Value = females_group[g]
-    ws.Cells(cell_index, 5).Value = '%.2f' % gpa_mean_group[g]
-    ws.Cells(cell_index, 6).Value = '%.2f' % gpa_variance_group[g]
-    col_index = 6
-    for s in SPECIALISATIONS:
-        col_index += 1
-        ws.Cells(cell_index, col_index).Value = specialisations_group[s][g]
-    for e in ETHNICITIES:
-        col_index += 1
-        ws.Cells(cell_index, col_index).Value = ethnicities_group[e][g]
+    summary_table.append([g, students_group[g], males_group[g],
+                          females_group[g], '%.2f' % gpa_mean_group[g],
+                          '%.2f' % gpa_variance_group[g]]
+                         + [specialisations_group[s][g]
+                            for s in SPECIALISATIONS]
+                         + [ethnicities_group[e][g] for e in ETHNICITIES])
+
+write_table(ws, 1, 1, summary_table)
+ws.Range(ws.Cells(1, 1), ws.Cells(1, len(summary_table[0]))).Font.Bold = True
+col_index = 6
+if len(SPECIALISATIONS) > 0:
+    ws.Range(ws.Cells(1, col_index + 1),
+             ws.Cells(1, col_index + len(SPECIALISATIONS))
+             ).Interior.ThemeColor = 5
+col_index += len(SPECIALISATIONS)
+if len(ETHNICITIES) > 0:
+    ws.Range(ws.Cells(1, col_index + 1),
+             ws.Cells(1, col_index + len(ETHNICITIES))).Interior.ThemeColor = 6
+col_index += len(ETHNICITIES)
 
 # Insert data for box plots
 col_index += 1
-ws.Cells(1, col_index + 1).Value = 'gpa_min'
-ws.Cells(1, col_index + 2).Value = 'gpa_q1'
-ws.Cells(1, col_index + 3).Value = 'gpa_median'
-ws.Cells(1, col_index + 4).Value = 'gpa_q3'
-ws.Cells(1, col_index + 5).Value = 'gpa_max'
-ws.Cells(1, col_index + 6).Value = 'gpa_d_min'
-ws.Cells(1, col_index + 7).Value = 'gpa_d_q1'
-ws.Cells(1, col_index + 8).Value = 'gpa_d_median'
-ws.Cells(1, col_index + 9).Value = 'gpa_d_q3'
-ws.Cells(1, col_index + 10).Value = 'gpa_d_max'
-
-# Create array for each group containing gpas
+write_table(ws, 1, col_index + 1,
+            [['gpa_min', 'gpa_q1', 'gpa_median', 'gpa_q3', 'gpa_max',
+              'gpa_d_min', 'gpa_d_q1', 'gpa_d_median', 'gpa_d_q3',
+              'gpa_d_max']])
+
+# Minimum, quartiles and maximum of the GPAs of each group
 data_summary = {}
 for g in GROUPS:
-    array = Array.CreateInstance(object, len(students_in_group[g]))
-    for i in range(len(students_in_group[g])):
-        student = students_in_group[g][i]
-        array[i] = gpa[student]
-    min_gpa = Application.WorksheetFunction.Min(array)
-    q1_gpa = Application.WorksheetFunction.Quartile(array, 1)
-    med_gpa = Application.WorksheetFunction.Median(array)
-    q3_gpa = Application.WorksheetFunction.Quartile(array, 3)
-    max_gpa = Application.WorksheetFunction.Max(array)
-    data_summary[g] = [min_gpa, q1_gpa, med_gpa, q3_gpa, max_gpa]
-
-row_index = 2
+    data_summary[g] = [quartile(gpas_in_group[g], q) for q in range(5)]
+
+box_plot_table = list()
 for g in GROUPS:
-    row_index += 1
-    ws.Cells(row_index, col_index + 1).Value = '%.2f' % data_summary[g][0]
-    ws.Cells(row_index, col_index + 2).Value = '%.2f' % data_summary[g][1]
-    ws.Cells(row_index, col_index + 3).Value = '%.2f' % data_summary[g][2]
-    ws.Cells(row_index, col_index + 4).Value = '%.2f' % data_summary[g][3]
-    ws.Cells(row_index, col_index + 5).Value = '%.2f' % data_summary[g][4]
-
-    # Differences needed for charting
-    ws.Cells(row_index, col_index + 6).Value = '%.2f' \
-        % data_summary[g][0]
-    ws.Cells(row_index, col_index + 7).Value = '%.2f' \
-        % (data_summary[g][1] - data_summary[g][0])
-    ws.Cells(row_index, col_index + 8).Value = '%.2f' \
-        % (data_summary[g][2] - data_summary[g][1])
-    ws.Cells(row_index, col_index + 9).Value = '%.2f' \
-        % (data_summary[g][3] - data_summary[g][2])
-    ws.Cells(row_index, col_index + 10).Value = '%.2f' \
-        % (data_summary[g][4] - data_summary[g][3])
+    box_plot_table.append(['%.2f' % value for value in data_summary[g]]
+                          # Differences needed for charting
+                          + ['%.2f' % data_summary[g][0],
+                             '%.2f' % (data_summary[g][1] - data_summary[g][0]),
+                             '%.2f' % (data_summary[g][2] - data_summary[g][1]),
+                             '%.2f' % (data_summary[g][3] - data_summary[g][2]),
+                             '%.2f' % (data_summary[g][4] - data_summary[g][3])])
+write_table(ws, 3, col_index + 1, box_plot_table)
 
 # Autofit columns in Summary_Results
 ws.Activate()
@@ -557,6 +668,7 @@ for sheet in Application.Charts:
 
 
 # GPA Box Plot Chart
+start_phase('charts')
 print('Charting GPA . . .')
 # Select data range
 # ws.Range(ws.Cells(3, col_index + 6), ws.Cells(2 + number_groups,
@@ -899,6 +1011,7 @@ save_path_student = '%s\\%s' % (path, student_workbook_name)
 
 # Student View
 # Create new workbook
+start_phase('student view')
 Application.Workbooks.Add()
 Application.ActiveWorkbook.SaveAs(Filename=save_path_student)
 wb = Application.Workbooks(student_workbook_name)
@@ -908,38 +1021,21 @@ wb.Sheets.Add()
 wb.ActiveSheet.Name = 'All_Groups'
 ws = wb.Worksheets('All_Groups')
 
-# Headers
-ws.Cells(1, 1).Value = 'Group'
-ws.Cells(1, 1).Font.Bold = True
-
-ws.Cells(1, 2).Value = 'Name'
-ws.Cells(1, 2).Font.Bold = True
-
-# ws.Cells(1, 3).Value = 'Gender'
-# ws.Cells(1, 3).Font.Bold = True
-
-ws.Cells(1, 3).Value = 'UPI'
-ws.Cells(1, 3).Font.Bold = True
 
-ws.Cells(1, 4).Value = 'Discipline'
-ws.Cells(1, 4).Font.Bold = True
+def group_list(group_numbers):
+    """Header and a row for each student of the groups in group_numbers."""
+    table = [['Group', 'Name', 'UPI', 'Discipline', 'UoA Email']]
+    for g in group_numbers:
+        for s in students_in_group[g]:
+            table.append([g, NAMES[s], UPI[s], specialisation[s],
+                          '%s@aucklanduni.ac.nz' % UPI[s]])
+    return table
 
-ws.Cells(1, 5).Value = 'UoA Email'
-ws.Cells(1, 5).Font.Bold = True
 
-# Data
-row_index = 1
-for g in GROUPS:
-    for s in students_in_group[g]:
-        row_index += 1
-        ws.Cells(row_index, 1).Value = g
-        ws.Cells(row_index, 2).Value = NAMES[s]
-        # ws.Cells(row_index, 3).Value = gender[s]
-        ws.Cells(row_index, 3).Value = UPI[s]
-        ws.Cells(row_index, 4).Value = specialisation[s]
-        ws.Cells(row_index, 5).Value = '%s@aucklanduni.ac.nz' % UPI[s]
-        # Space between each group
-    #row_index += 1
+# Headers and data
+all_groups_table = group_list(GROUPS)
+write_table(ws, 1, 1, all_groups_table)
+ws.Range(ws.Cells(1, 1), ws.Cells(1, len(all_groups_table[0]))).Font.Bold = True
 
 ws.Activate()
 ws.Cells.Select()
@@ -961,31 +1057,10 @@ for g in GROUPS:
     wb.ActiveSheet.Name = wb_name
     ws = wb.Worksheets(wb_name)
 
-    # Headers
-    ws.Cells(1, 1).Value = 'Group'
-    ws.Cells(1, 1).Font.Bold = True
-
-    ws.Cells(1, 2).Value = 'Name'
-    ws.Cells(1, 2).Font.Bold = True
-
-    ws.Cells(1, 3).Value = 'UPI'
-    ws.Cells(1, 3).Font.Bold = True
-
-    ws.Cells(1, 4).Value = 'Discipline'
-    ws.Cells(1, 4).Font.Bold = True
-
-    ws.Cells(1, 5).Value = 'UoA Email'
-    ws.Cells(1, 5).Font.Bold = True
-
-    # Data
-    row_index = 1
-    for s in students_in_group[g]:
-        row_index += 1
-        ws.Cells(row_index, 1).Value = g
-        ws.Cells(row_index, 2).Value = NAMES[s]
-        ws.Cells(row_index, 3).Value = UPI[s]
-        ws.Cells(row_index, 4).Value = specialisation[s]
-        ws.Cells(row_index, 5).Value = '%s@aucklanduni.ac.nz' % UPI[s]
+    # Headers and data
+    group_table = group_list([g])
+    write_table(ws, 1, 1, group_table)
+    ws.Range(ws.Cells(1, 1), ws.Cells(1, len(group_table[0]))).Font.Bold = True
 
     # Activate
     ws.Activate()
@@ -995,3 +1070,8 @@ for g in GROUPS:
 
 wb.Worksheets('All_Groups').Activate()
 wb.Save()
+start_phase(None)
+
+report_file = open('%s\\run_report.json' % path, 'w')
+json.dump(run_report, report_file, indent=2, sort_keys=True)
+report_file.close()
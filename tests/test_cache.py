@@ -0,0 +1,154 @@
+# ============================================================================
+# Group Allocator - tests of the model cache
+# ============================================================================
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from group_allocator import cache as cache_module
+from group_allocator.aggregate import AggregateModel
+from group_allocator.cache import ModelCache, cached_model, model_key
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import Model
+from group_allocator.roster import Roster
+from group_allocator.synthetic import synthetic_roster
+
+WEIGHTS = {'gpamean': 3.0, 'gpavar': 0.2, 'spec': 0.5, 'gender': 2.0,
+           'eth': 1.0, 'out': 0.0, 'campus': 1.5}
+
+
+def campus_roster(number_students, seed=1):
+    roster = synthetic_roster(number_students, seed=seed)
+    campus = ['City' if s % 3 else 'Grafton' for s in roster.students]
+    return Roster(roster.ids, roster.gpa, roster.gender,
+                  roster.specialisation, roster.ethnicity,
+                  extra=[('campus', campus)])
+
+
+def program(model):
+    """The objective, constraints and bounds of ``model`` by name."""
+    problem = model.problem
+    objective = dict((v.name, c) for v, c in problem.objective.items())
+    constraints = dict(
+        (name, (dict((v.name, c) for v, c in constraint.items()),
+                constraint.sense, constraint.constant))
+        for name, constraint in problem.constraints.items())
+    bounds = dict((v.name, (v.lowBound, v.upBound, v.cat))
+                  for v in problem.variables())
+    return objective, constraints, bounds
+
+
+class TestModelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ModelCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_hit(self, roster, number_groups, aggregate=False,
+                  symmetry_breaking=False):
+        # The model from the cache with new weights is the model built
+        # with them
+        model, key, hit = cached_model(self.cache, roster, number_groups,
+                                       aggregate=aggregate,
+                                       symmetry_breaking=symmetry_breaking)
+        self.assertFalse(hit)
+        cached, cached_key, hit = cached_model(
+            self.cache, roster, number_groups, WEIGHTS, aggregate=aggregate,
+            symmetry_breaking=symmetry_breaking)
+        self.assertTrue(hit)
+        self.assertEqual(cached_key, key)
+        if aggregate:
+            built = AggregateModel(roster, number_groups, WEIGHTS)
+        else:
+            built = Model(roster, number_groups, WEIGHTS,
+                          symmetry_breaking=symmetry_breaking)
+        self.assertEqual(program(cached), program(built))
+        self.assertNotEqual(program(cached)[0], program(model)[0])
+        self.assertFalse(cached.warm_start)
+        return key
+
+    def test_hit_same_as_rebuild(self):
+        self.check_hit(campus_roster(40), 8)
+
+    def test_hit_symmetry_breaking(self):
+        self.check_hit(synthetic_roster(42, seed=2), 8,
+                       symmetry_breaking=True)
+
+    def test_hit_aggregate(self):
+        self.check_hit(campus_roster(60), 10, aggregate=True)
+
+    def test_start(self):
+        roster = campus_roster(40)
+        key = self.check_hit(roster, 8)
+        model = Model(roster, 8)
+        draft = snake_draft(roster, model.targets)
+        self.cache.store_start(key, draft)
+        cached, _, hit = cached_model(self.cache, roster, 8, WEIGHTS)
+        self.assertTrue(hit and cached.warm_start)
+        model.set_start(draft)
+        self.assertEqual(
+            [v.varValue for v in cached.problem.variables()],
+            [v.varValue for v in model.problem.variables()])
+
+    def test_key(self):
+        roster = campus_roster(20)
+        key = model_key(roster, 4)
+        self.assertEqual(model_key(campus_roster(20), 4), key)
+        for other in (model_key(roster, 5),
+                      model_key(roster, 4, symmetry_breaking=True),
+                      model_key(roster, 4, aggregate=True),
+                      model_key(synthetic_roster(20, seed=1), 4)):
+            self.assertNotEqual(other, key)
+        version = cache_module.CACHE_VERSION
+        cache_module.CACHE_VERSION = version + 1
+        try:
+            self.assertNotEqual(model_key(roster, 4), key)
+        finally:
+            cache_module.CACHE_VERSION = version
+
+    def test_unreadable(self):
+        roster = synthetic_roster(20, seed=1)
+        key = model_key(roster, 4)
+        path = os.path.join(self.directory, key + '.model')
+        with open(path, 'wb') as f:
+            f.write(b'not a model')
+        self.assertEqual(self.cache.load(key), (None, None))
+        self.assertFalse(os.path.exists(path))
+        _, _, hit = cached_model(self.cache, roster, 4)
+        self.assertFalse(hit)
+
+    def test_least_recently_used(self):
+        rosters = [synthetic_roster(20, seed=seed) for seed in range(3)]
+        keys = [cached_model(self.cache, roster, 4)[1]
+                for roster in rosters[:2]]
+        self.cache.store_start(keys[1], [1] * 20)
+        # The first model was used long ago and the second since, then
+        # the first is loaded again
+        now = time.time()
+        for key, age in zip(keys, (200, 100)):
+            for suffix in ('.model', '.start.json'):
+                path = os.path.join(self.directory, key + suffix)
+                if os.path.exists(path):
+                    os.utime(path, (now - age, now - age))
+        self.assertIsNotNone(self.cache.load(keys[0])[0])
+
+        # Room for two models: adding a third evicts the second, with its
+        # start, and never the one just added
+        size = max(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory))
+        self.cache.max_bytes = int(2.5 * size)
+        keys.append(cached_model(self.cache, rosters[2], 4)[1])
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted([keys[0] + '.model', keys[2] + '.model']))
+        self.cache.max_bytes = 0
+        self.cache.evict(keep=keys[2])
+        self.assertEqual(os.listdir(self.directory), [keys[2] + '.model'])
+
+
+if __name__ == '__main__':
+    unittest.main()
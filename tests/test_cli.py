@@ -0,0 +1,90 @@
+# ============================================================================
+# Group Allocator - tests that the command line reports bad input
+# ============================================================================
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from group_allocator.cli import main
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import Targets
+from group_allocator.report import allocation_table, write_csv
+from group_allocator.synthetic import synthetic_roster
+
+
+class TestBadInput(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        roster = synthetic_roster(24, seed=1)
+        self.roster = self.write('roster.csv',
+                                 allocation_table(roster, roster.groups))
+        self.published = self.write('published.csv', allocation_table(
+            roster, snake_draft(roster, Targets(roster, 4))))
+        self.ids = roster.ids
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        write_csv(path, rows)
+        return path
+
+    def assertReports(self, argv, message):
+        """The command line stops with ``message`` and exit code 1."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = main(argv + ['--output-dir',
+                                os.path.join(self.directory, 'out')])
+        self.assertEqual(code, 1)
+        self.assertIn(message, output.getvalue())
+
+    def test_roster(self):
+        path = self.write('names.csv', [['ID', 'Name'], ['1', 'A']])
+        self.assertReports([path, '--groups', '2'], 'has no gender column')
+        self.assertReports([self.roster, '--groups', '25'],
+                           'Cannot split 24 students into 25 groups')
+
+    def test_balance(self):
+        self.assertReports([self.roster, '--groups', '4', '--balance',
+                            'gender'], 'already balanced')
+        self.assertReports([self.roster, '--groups', '4', '--balance',
+                            'campus=many'], 'must be a number')
+        self.assertReports([self.roster, '--groups', '4', '--balance',
+                            'campus'], 'has no campus column')
+
+    def test_pairing(self):
+        unknown = self.write('unknown.csv', [[self.ids[0], 'nobody']])
+        self.assertReports([self.roster, '--groups', '4', '--together',
+                            unknown], 'No student with ID nobody')
+        pair = self.write('pair.csv', [self.ids[:2]])
+        self.assertReports([self.roster, '--groups', '4', '--together', pair,
+                            '--apart', pair], 'both together and apart')
+        block = self.write('block.csv', [self.ids[:7]])
+        self.assertReports([self.roster, '--groups', '4', '--together',
+                            block], '7 students kept together do not fit')
+
+    def test_incremental(self):
+        incremental = [self.published, '--mode', 'incremental']
+        self.assertReports(incremental + ['--groups', '4', '--drop',
+                                          'nobody'],
+                           'No student with ID nobody to drop')
+        self.assertReports(incremental + ['--groups', '3'],
+                           'Published groups 4 are not among groups 1 to 3')
+        path = self.write('names.csv', [['ID', 'Name'], ['1', 'A']])
+        self.assertReports(incremental + ['--groups', '4', '--add', path],
+                           'has no gender column')
+
+    def test_sweep(self):
+        sweep = [self.roster, '--groups', '4', '--sweep', 'gpamean=1,2']
+        for options in (['--mode', 'decompose'], ['--mode', 'incremental'],
+                        ['--starts', '2'], ['--aggregate'], ['--stream']):
+            self.assertReports(sweep + options, '--sweep solves the model')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# ============================================================================
+# Group Allocator - tests of incremental re-allocation
+# ============================================================================
+import unittest
+
+from group_allocator.heuristics import snake_draft
+from group_allocator.incremental import PartialTargets, _fill, plan_sizes, \
+    reallocate, update_roster
+from group_allocator.model import Targets
+from group_allocator.roster import Roster
+from group_allocator.synthetic import synthetic_roster
+
+GROUPS = 8
+
+
+def published_roster(number_students, seed=1):
+    """A synthetic roster with the groups of a snake draft."""
+    roster = synthetic_roster(number_students, seed=seed)
+    groups = snake_draft(roster, Targets(roster, GROUPS))
+    return Roster(roster.ids, roster.gpa, roster.gender,
+                  roster.specialisation, roster.ethnicity, groups=groups)
+
+
+def late_roster(number_students):
+    """Late enrolments, with IDs no published student has."""
+    roster = synthetic_roster(number_students, seed=99)
+    return Roster(['L%d' % s for s in roster.students], roster.gpa,
+                  roster.gender, roster.specialisation, roster.ethnicity)
+
+
+class TestReallocate(unittest.TestCase):
+
+    def check(self, published, added=None, dropped=()):
+        roster = update_roster(published, added, dropped)
+        dropped_groups = set(published.groups[s]
+                             for s in published.students
+                             if published.ids[s] in dropped)
+        sizes, affected = plan_sizes(roster, Targets(roster, GROUPS),
+                                     dropped_groups)
+        groups, targets, freed, model = reallocate(
+            roster, GROUPS, dropped_groups=dropped_groups, time_limit=5)
+        self.assertTrue(affected <= set(freed))
+        self.assertEqual(len(freed), len(affected) + 2)
+
+        # Students of the kept groups stay, the freed groups and late
+        # enrolments fill the freed groups at the planned sizes
+        for s in roster.students:
+            if roster.groups[s] is not None and roster.groups[s] not in freed:
+                self.assertEqual(groups[s], roster.groups[s])
+            else:
+                self.assertIn(groups[s], freed)
+        for g in targets.groups:
+            self.assertEqual(groups.count(g), sizes[g])
+            self.assertEqual(targets.size(g), sizes[g])
+        self.assertEqual(sorted(sizes.values()),
+                         sorted(Targets(roster, GROUPS).size(g)
+                                for g in range(1, GROUPS + 1)))
+
+        # The greedy fill the solve starts from is a feasible allocation
+        # of the freed part
+        label = dict((g, i + 1) for i, g in enumerate(freed))
+        students = [s for s in roster.students
+                    if roster.groups[s] is None or roster.groups[s] in label]
+        partial = PartialTargets(Targets(roster, GROUPS), students,
+                                 [sizes[g] for g in freed])
+        start = _fill(roster, students, label, partial)
+        for g in partial.groups:
+            self.assertEqual(start.count(g), partial.size(g))
+        kept = sum(1 for i, s in enumerate(students)
+                   if label.get(roster.groups[s]) == start[i])
+        self.assertEqual(kept, sum(min(partial.size(label[g]), sum(
+            1 for s in students if roster.groups[s] == g)) for g in freed))
+        return roster, groups, freed
+
+    def test_add(self):
+        published = published_roster(40)
+        roster, groups, freed = self.check(published, late_roster(3))
+        late = [s for s in roster.students if roster.groups[s] is None]
+        self.assertEqual(len(late), 3)
+        # 43 students: three groups grow to 6
+        self.assertEqual(sorted(groups.count(g) for g in freed)[-3:],
+                         [6, 6, 6])
+
+    def test_drop(self):
+        published = published_roster(40)
+        dropped = [published.ids[5]]
+        roster, groups, freed = self.check(published, dropped=dropped)
+        self.assertIn(published.groups[5], freed)
+        self.assertNotIn(published.ids[5], roster.ids)
+
+    def test_add_and_drop(self):
+        published = published_roster(40)
+        dropped = [published.ids[0], published.ids[17]]
+        roster, groups, freed = self.check(published, late_roster(2),
+                                           dropped)
+        for s in (0, 17):
+            self.assertIn(published.groups[s], freed)
+
+    def test_sizes_change(self):
+        # 42 students in groups of 5 and 6 (j2 = 2); with 3 late it is 45,
+        # so three more groups must grow (j2 = 5)
+        published = published_roster(42)
+        targets = Targets(published, GROUPS)
+        self.assertEqual(targets.j2, 2)
+        roster, groups, freed = self.check(published, late_roster(3))
+        self.assertEqual(Targets(roster, GROUPS).j2, 5)
+        self.assertEqual(sum(1 for g in range(1, GROUPS + 1)
+                             if groups.count(g) == 6), 5)
+
+
+class TestUpdateRoster(unittest.TestCase):
+
+    def test_order_and_groups(self):
+        published = published_roster(10)
+        roster = update_roster(published, late_roster(2),
+                               [published.ids[3]])
+        self.assertEqual(roster.ids, published.ids[:3] +
+                         published.ids[4:] + ['L0', 'L1'])
+        self.assertEqual(roster.groups, published.groups[:3] +
+                         published.groups[4:] + [None, None])
+
+    def test_errors(self):
+        published = published_roster(10)
+        with self.assertRaisesRegex(ValueError, 'No student with ID nobody'):
+            update_roster(published, dropped=['nobody'])
+        duplicate = Roster([published.ids[0]], [5.0], ['Male'])
+        with self.assertRaisesRegex(ValueError, 'ID of an enrolled'):
+            update_roster(published, duplicate)
+        campus = Roster(['L0'], [5.0], ['Male'], extra=[('campus', ['x'])])
+        with self.assertRaisesRegex(ValueError, 'Late enrolments'):
+            update_roster(published, campus)
+
+
+if __name__ == '__main__':
+    unittest.main()
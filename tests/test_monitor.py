@@ -0,0 +1,92 @@
+# ============================================================================
+# Group Allocator - tests of following and reading the CBC log
+# ============================================================================
+import os
+import tempfile
+import unittest
+
+from group_allocator.model import _SolverMonitor
+from group_allocator.solvers import CbcBackend, read_cbc_log, stop_reason
+
+# Log of CBC solving a cohort of 150 students in 30 groups, whose first
+# solutions come from the feasibility pump
+PUMP_LOG = os.path.join(os.path.dirname(__file__), 'data',
+                        'cbc_feasibility_pump.log')
+
+
+def incumbents(path):
+    """Incumbents the monitor finds in the log at ``path``."""
+    found = []
+    monitor = _SolverMonitor(path, on_incumbent=found.append)
+    monitor._stop.set()
+    monitor._follow()
+    return found
+
+
+class TestIncumbents(unittest.TestCase):
+
+    def test_heuristic_solutions(self):
+        # The pump's solutions are reported by Cbc0038I lines seconds
+        # before the Cbc0012I integer solution of 7.040508
+        self.assertEqual(incumbents(PUMP_LOG),
+                         [410010, 369009, 330008, 264007, 250010, 7.04051,
+                          7.040508])
+
+    def test_progress_without_solution(self):
+        handle, path = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(handle, 'w') as f:
+            f.write('Cbc0010I After 0 nodes, 1 on tree, 1e+50 best '
+                    'solution, best possible 0.1 (2.48 seconds)\n'
+                    'Cbc0010I After 100 nodes, 12 on tree, 1.2899813 best '
+                    'solution, best possible 0.1 (9.01 seconds)\n'
+                    'Cbc0038I Full problem 109 rows 125 columns, reduced to '
+                    '62 rows 38 columns - 3 fixed gives 0, 0 - ok now\n')
+        try:
+            self.assertEqual(incumbents(path), [1.2899813])
+        finally:
+            os.remove(path)
+
+
+class TestReadLog(unittest.TestCase):
+
+    def read(self, text):
+        handle, path = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(handle, 'w') as f:
+            f.write(text)
+        try:
+            return read_cbc_log(path)
+        finally:
+            os.remove(path)
+
+    def test_interrupted(self):
+        summary = read_cbc_log(PUMP_LOG)
+        self.assertEqual(stop_reason(summary['result']), 'interrupted')
+        # Not the 7.92 of the log's "Gap:" line, which is over the bound
+        self.assertAlmostEqual(summary['gap'], (7.040508 - 0.79) / 7.040508)
+
+    def test_within_gap_tolerance(self):
+        # CBC run with -ratio 0.05 stopped at a gap under 0.05 as -ratio
+        # measures it, while its "Gap:" line rounds 0.051 to 0.05
+        summary = self.read(
+            'Cbc0011I Exiting as integer gap of 64.849586 less than 1e-10 '
+            'or 5%\n'
+            'Result - Optimal solution found (within gap tolerance)\n'
+            'Objective value:                1337.00000000\n'
+            'Lower bound:                    1272.150\n'
+            'Gap:                            0.05\n')
+        self.assertEqual(stop_reason(summary['result']), 'gap')
+        self.assertAlmostEqual(summary['gap'], (1337 - 1272.15) / 1337)
+        self.assertLess(summary['gap'], 0.05)
+
+    def test_optimal(self):
+        summary = self.read('Result - Optimal solution found\n'
+                            'Objective value:                0.85023867\n')
+        self.assertEqual(summary['gap'], 0.0)
+
+    def test_negative_objective(self):
+        # Over the larger magnitude, the bound's here
+        self.assertAlmostEqual(CbcBackend().relative_gap(-8.0, -10.0), 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# ============================================================================
+# Group Allocator - tests of students kept together or apart
+# ============================================================================
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from group_allocator.cli import main
+from group_allocator.model import Targets
+from group_allocator.pairing import Pairing, PairedModel, paired_draft
+from group_allocator.report import allocation_table, write_csv
+from group_allocator.roster import Roster, read_roster
+from group_allocator.synthetic import synthetic_roster
+
+
+class TestPairing(unittest.TestCase):
+
+    def setUp(self):
+        self.roster = synthetic_roster(30, seed=2)
+        self.ids = self.roster.ids
+
+    def test_chained_lines(self):
+        # a-b, b-c and d-a chain into one component; e-f is another
+        i = self.ids
+        pairing = Pairing(self.roster, [[i[0], i[1]], [i[1], i[2]],
+                                        [i[3], i[0]], [i[4], i[5]]])
+        self.assertEqual(len(pairing.components), 30 - 3 - 1)
+        self.assertEqual(sorted(pairing.components[pairing.component[2]]),
+                         [0, 1, 2, 3])
+        self.assertEqual(pairing.components[pairing.component[5]], [4, 5])
+        self.assertEqual(sorted(s for members in pairing.components
+                                for s in members),
+                         list(self.roster.students))
+
+    def test_together_and_apart(self):
+        i = self.ids
+        with self.assertRaisesRegex(ValueError, 'both together and apart'):
+            Pairing(self.roster, [[i[0], i[1]], [i[1], i[2]]],
+                    [[i[2], i[7], i[0]]])
+        with self.assertRaisesRegex(ValueError, 'No student with ID x'):
+            Pairing(self.roster, [[i[0], 'x']])
+        # A line kept apart of one component has nothing to keep apart
+        pairing = Pairing(self.roster, [[i[0], i[1]]], [[i[0]], [i[1]]])
+        self.assertEqual(pairing.apart, [])
+
+    def test_solved(self):
+        i = self.ids
+        pairing = Pairing(self.roster,
+                          [[i[0], i[1]], [i[1], i[2]], [i[10], i[11]]],
+                          [[i[0], i[3], i[4]], [i[10], i[5]],
+                           [i[20], i[21], i[22], i[23]]])
+        model = PairedModel(self.roster, 6, pairing)
+        model.solve(3, seed=1)
+        groups = model.assignment()
+        self.assertNotIn(None, groups)
+        self.assertEqual(model.unclear, [])
+        self.assertEqual(pairing.violations(groups), [])
+        for g in model.targets.groups:
+            self.assertEqual(groups.count(g), model.targets.size(g))
+
+        # Splitting a component or joining students kept apart is found
+        broken = list(groups)
+        other = next(s for s in self.roster.students
+                     if groups[s] != groups[0])
+        broken[1], broken[other] = broken[other], broken[1]
+        self.assertIn(pairing.components[pairing.component[0]],
+                      pairing.violations(broken))
+        broken = list(groups)
+        broken[20] = broken[21]
+        self.assertIn([20, 21, 22, 23], pairing.violations(broken))
+
+    def test_draft(self):
+        i = self.ids
+        pairing = Pairing(self.roster, [[i[0], i[1], i[2]]],
+                          [[i[0], i[3]], [i[3], i[4], i[5]]])
+        targets = Targets(self.roster, 6)
+        groups = paired_draft(self.roster, targets, pairing)
+        self.assertEqual(pairing.violations(groups), [])
+        for g in targets.groups:
+            self.assertEqual(groups.count(g), targets.size(g))
+
+
+class TestDraftFallback(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        write_csv(path, rows)
+        return path
+
+    def test_solves_from_scratch(self):
+        # Two groups of four. a, b and c go together, so the draft puts
+        # them in group 1 and d, the best of the rest, in group 2; then e,
+        # kept apart from both a and d, has nowhere to go. Only d with a,
+        # b and c and e in the other group keeps to the rules.
+        ids = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+        roster = Roster(ids, [5.0, 5.0, 5.0, 8.0, 6.0, 4.0, 3.0, 2.0],
+                        ['Male', 'Female'] * 4)
+        path = self.write('roster.csv',
+                          allocation_table(roster, roster.groups))
+        together = self.write('together.csv', [['a', 'b', 'c']])
+        apart = self.write('apart.csv', [['d', 'e'], ['e', 'a']])
+        pairing = Pairing(roster, [['a', 'b', 'c']], [['d', 'e'], ['e', 'a']])
+        with self.assertRaises(ValueError):
+            paired_draft(roster, Targets(roster, 2), pairing)
+
+        output_dir = os.path.join(self.directory, 'out')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = main([path, '--groups', '2', '--together', together,
+                         '--apart', apart, '--warm-start', '--time-limit',
+                         '20', '--output-dir', output_dir])
+        self.assertEqual(code, 0)
+        self.assertIn('Warning: no paired draft', output.getvalue())
+        groups = read_roster(os.path.join(output_dir,
+                                          'allocation.csv')).groups
+        self.assertEqual(pairing.violations(groups), [])
+        self.assertEqual(len(set(groups[s] for s in range(4))), 1)
+        self.assertEqual(sorted(groups), [1, 1, 1, 1, 2, 2, 2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
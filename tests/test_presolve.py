@@ -0,0 +1,116 @@
+# ============================================================================
+# Group Allocator - tests that presolve leaves out only what cannot bind
+# ============================================================================
+import unittest
+
+from group_allocator.model import Model
+from group_allocator.roster import Roster
+from group_allocator.synthetic import synthetic_roster
+
+WEIGHTS = {'gpamean': 2.0, 'gpavar': 0.5, 'campus': 1.5}
+
+
+def small_roster(number_students):
+    """A roster with categories of every size: one student, a few, most
+    of the class and all of it."""
+    n = number_students
+    return Roster(
+        [str(s) for s in range(n)],
+        [8.5 if s == 2 else (s * 37 % 11) * 0.7 for s in range(n)],
+        ['Female' if s % 4 == 1 else 'Male' for s in range(n)],
+        ['Civil' if s == 0 else 'Software' if s % 3 == 0 else 'Mechanical'
+         for s in range(n)],
+        ['Asian' if s < 2 else 'European' for s in range(n)],
+        extra=[('campus', ['City'] * n)])
+
+
+def allocations(sizes, number_students):
+    """Every allocation of the students to groups of ``sizes``."""
+    room = list(sizes)
+    groups = [0] * number_students
+
+    def place(s):
+        if s == number_students:
+            yield list(groups)
+            return
+        for g, left in enumerate(room):
+            if left:
+                room[g] -= 1
+                groups[s] = g + 1
+                for allocation in place(s + 1):
+                    yield allocation
+                room[g] += 1
+    return place(0)
+
+
+class TestPresolve(unittest.TestCase):
+
+    def check_bounds(self, roster, number_groups):
+        # Over every allocation, the constraints presolve left out hold and
+        # the bounds it set are never cut into
+        model = Model(roster, number_groups)
+        t = model.targets
+        sizes = [t.size(g) for g in t.groups]
+        gpa_min, gpa_max, variance_min, variance_max = model.gpa_bounds
+        for groups in allocations(sizes, roster.number_students):
+            members = dict((g, [s for s in roster.students
+                                if groups[s] == g]) for g in t.groups)
+            means = [sum(roster.gpa[s] for s in members[g]) / t.size(g)
+                     for g in t.groups]
+            variances = [sum(t.gpa_deviation[s] for s in members[g]) /
+                         t.size(g) for g in t.groups]
+            self.assertTrue(gpa_min[0] <= min(means) <= gpa_min[1])
+            self.assertTrue(gpa_max[0] <= max(means) <= gpa_max[1])
+            self.assertTrue(variance_min[0] <= min(variances) <=
+                            variance_min[1])
+            self.assertTrue(variance_max[0] <= max(variances) <=
+                            variance_max[1])
+            for balance, short, over in zip(t.balances, model.short_bounds,
+                                            model.over_bounds):
+                for g in t.groups:
+                    count = sum(1 for s in balance.students
+                                if groups[s] == g)
+                    self.assertLessEqual(balance.minimum - count,
+                                         short.get(g, 0))
+                    if balance.maximum is not None:
+                        self.assertLessEqual(count - balance.maximum,
+                                             over.get(g, 0))
+        return model
+
+    def test_one_size(self):
+        model = self.check_bounds(small_roster(9), 3)
+        self.assertEqual(model.targets.m1 * 3, 9)
+        self.assertGreater(model.presolved['rows'], 0)
+        self.assertTrue(any(model.short_bounds) or any(model.over_bounds))
+
+    def test_two_sizes(self):
+        model = self.check_bounds(small_roster(10), 3)
+        self.assertEqual((model.targets.j1, model.targets.j2), (2, 1))
+
+    def test_groups_of_one(self):
+        self.check_bounds(small_roster(5), 5)
+
+    def test_one_group(self):
+        model = self.check_bounds(small_roster(6), 1)
+        # Every balance holds with the whole class in one group
+        self.assertEqual(model.short_bounds + model.over_bounds,
+                         [{}] * (2 * len(model.targets.balances)))
+
+    def check_optimum(self, roster, number_groups):
+        objectives = []
+        for presolve in (True, False):
+            model = Model(roster, number_groups, WEIGHTS, presolve=presolve)
+            self.assertEqual(model.solve(60, seed=1), 'Optimal')
+            self.assertEqual(model.stop_reason, 'optimal')
+            objectives.append(model.objective())
+        self.assertAlmostEqual(objectives[0], objectives[1], places=6)
+
+    def test_same_optimum_one_size(self):
+        self.check_optimum(synthetic_roster(16, seed=1), 4)
+
+    def test_same_optimum_two_sizes(self):
+        self.check_optimum(small_roster(14), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# ============================================================================
+# Group Allocator - tests of the allocation and summary reports
+# ============================================================================
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from group_allocator.cli import main
+from group_allocator.report import Summary, allocation_table, write_csv
+from group_allocator.roster import read_roster
+from group_allocator.synthetic import synthetic_roster
+
+CAMPUSES = ('City', 'Grafton', 'Tamaki')
+
+
+def write_campus_roster(path, number_students=40):
+    """A synthetic roster with a campus column to balance."""
+    rows = allocation_table(synthetic_roster(number_students, seed=3),
+                            [''] * number_students)
+    rows[0].append('Campus')
+    for s, row in enumerate(rows[1:]):
+        row.append(CAMPUSES[s % 7 % 3])
+    write_csv(path, rows)
+
+
+def run(argv):
+    """Exit code of the command line, keeping its output quiet."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main(argv)
+
+
+class TestBalancedReports(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.roster = os.path.join(self.directory, 'roster.csv')
+        write_campus_roster(self.roster)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_allocation_keeps_extra_columns(self):
+        roster = read_roster(self.roster, attributes=['campus'])
+        rows = allocation_table(roster, [1] * roster.number_students)
+        self.assertEqual(rows[0][-2:], ['Allocated Group', 'campus'])
+        self.assertEqual(rows[1][-1], 'City')
+
+    def test_summary_counts_extra_categories(self):
+        roster = read_roster(self.roster, attributes=['campus'])
+        groups = [s % 4 + 1 for s in roster.students]
+        table = Summary(roster, groups, 4).table()
+        columns = ['campus: %s' % campus for campus in CAMPUSES]
+        self.assertEqual(table[0][-3:], columns)
+        for k, campus in enumerate(CAMPUSES):
+            column = len(table[0]) - 3 + k
+            expected = [s for s in roster.students
+                        if roster.extra['campus'][s] == campus]
+            self.assertEqual(table[1][column], len(expected))
+            for g in range(1, 5):
+                self.assertEqual(table[g + 1][column],
+                                 sum(1 for s in expected if groups[s] == g))
+
+    def test_incremental_from_balanced_allocation(self):
+        first = os.path.join(self.directory, 'first')
+        second = os.path.join(self.directory, 'second')
+        self.assertEqual(run([self.roster, '--groups', '8', '--balance',
+                              'campus=2', '--time-limit', '5', '--quiet',
+                              '--output-dir', first]), 0)
+        allocation = os.path.join(first, 'allocation.csv')
+        published = read_roster(allocation, attributes=['campus'])
+        self.assertNotIn(None, published.groups)
+        self.assertEqual(run([allocation, '--groups', '8', '--balance',
+                              'campus=2', '--mode', 'incremental', '--drop',
+                              published.ids[0], '--time-limit', '5',
+                              '--quiet', '--output-dir', second]), 0)
+        updated = read_roster(os.path.join(second, 'allocation.csv'),
+                              attributes=['campus'])
+        self.assertEqual(updated.ids, published.ids[1:])
+        self.assertEqual(list(updated.extra['campus']),
+                         list(published.extra['campus'])[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+# ============================================================================
+# Group Allocator - tests of the memory of each phase in the run report
+# ============================================================================
+import unittest
+
+from group_allocator.runreport import RunReport, peak_memory
+
+
+@unittest.skipIf(peak_memory()[0] is None, 'no resource module')
+class TestPhaseMemory(unittest.TestCase):
+
+    def test_increase(self):
+        report = RunReport()
+        with report.phase('large'):
+            block = b'x' * (200 * 1024 * 1024)
+            del block
+        with report.phase('small'):
+            block = b'x' * (20 * 1024 * 1024)
+            del block
+        large, small = report.as_dict()['phases']
+        # The large phase raises the peak; the small one stays below it,
+        # so the peak so far is unchanged and it shows no increase
+        self.assertGreater(large['peak_memory_increase_mb'], 150)
+        self.assertEqual(small['peak_memory_increase_mb'], 0)
+        self.assertEqual(small['peak_memory_so_far_mb'],
+                         large['peak_memory_so_far_mb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# ============================================================================
+# Group Allocator - tests that Scorer scores allocations as the model does
+# ============================================================================
+import random
+import unittest
+
+from group_allocator.incremental import PartialTargets
+from group_allocator.model import ARTIFICIAL_PENALTY, Model, Targets
+from group_allocator.roster import Roster
+from group_allocator.score import Scorer
+from group_allocator.synthetic import synthetic_roster
+
+WEIGHTS = {'gpamean': 2.0, 'gpavar': 0.5, 'spec': 0.3, 'campus': 1.5}
+
+
+def campus_roster(number_students, seed):
+    """A synthetic roster with a campus to balance as well."""
+    roster = synthetic_roster(number_students, seed=seed)
+    rng = random.Random(seed)
+    campus = [rng.choice(('City', 'City', 'Grafton', 'Tamaki'))
+              for s in roster.students]
+    return Roster(roster.ids, roster.gpa, roster.gender,
+                  roster.specialisation, roster.ethnicity,
+                  extra=[('campus', campus)])
+
+
+def random_allocation(targets, seed):
+    """Groups of the sizes of ``targets`` with students at random."""
+    groups = [g for g in targets.groups for _ in range(targets.size(g))]
+    random.Random(seed).shuffle(groups)
+    return groups
+
+
+def model_score(model, groups):
+    """Objective and relaxation of ``model`` with x fixed at ``groups``."""
+    for (s, g), variable in model.x.items():
+        variable.lowBound = variable.upBound = int(groups[s] == g)
+    model.solve(30)
+    return model.objective(), model.relaxation()
+
+
+class TestScorer(unittest.TestCase):
+
+    def assertSameScore(self, score, objective, relaxation):
+        self.assertAlmostEqual(score.objective, objective, places=6)
+        self.assertEqual([name for name, _ in score.relaxation],
+                         [name for name, _ in relaxation])
+        for (_, total), (_, expected) in zip(score.relaxation, relaxation):
+            self.assertAlmostEqual(total, expected, places=6)
+
+    def test_solved_allocation(self):
+        roster = campus_roster(60, seed=1)
+        model = Model(roster, 12, WEIGHTS)
+        self.assertEqual(model.solve(10, seed=1), 'Optimal')
+        score = Scorer(roster, 12, WEIGHTS).score(model.assignment())
+        self.assertSameScore(score, model.objective(), model.relaxation())
+
+    def test_random_allocations(self):
+        # Random groups break many balances, over capped maxima as well as
+        # short of minima
+        roster = campus_roster(45, seed=2)
+        scorer = Scorer(roster, 6, WEIGHTS)
+        for seed in range(3):
+            groups = random_allocation(Targets(roster, 6), seed)
+            score = scorer.score(groups)
+            self.assertGreater(score.slack, 0)
+            self.assertSameScore(score, *model_score(
+                Model(roster, 6, WEIGHTS), groups))
+
+    def test_capped_maximum(self):
+        # 6 of 12 students on one campus: 2 in each of 3 groups at most
+        roster = Roster([str(s) for s in range(12)], [5.0] * 12,
+                        ['Male'] * 12,
+                        extra=[('campus', ['City'] * 6 + ['Tamaki'] * 6)])
+        score = Scorer(roster, 3, {'campus': 2.0}).score(
+            [1] * 4 + [2, 2, 3, 3, 2, 2, 3, 3])
+        relaxation = dict(score.relaxation)
+        self.assertEqual(relaxation['Campus Max'], 2 + 2)
+        self.assertEqual(relaxation['Campus Min'], 2 + 2)
+        self.assertEqual(score.slack, ARTIFICIAL_PENALTY * 2.0 * 8)
+        self.assertEqual(score.spreads(), (0.0, 0.0))
+
+    def test_targets_of_other_sizes(self):
+        # The group sizes of an incremental allocation, not those Targets
+        # would give
+        roster = campus_roster(24, seed=3)
+        targets = PartialTargets(Targets(roster, 4), roster.students,
+                                 [5, 7, 6, 6])
+        groups = random_allocation(targets, 4)
+        score = Scorer(roster, 4, WEIGHTS, targets).score(groups)
+        self.assertSameScore(score, *model_score(
+            Model(roster, 4, WEIGHTS, targets=targets), groups))
+
+    def test_allocation_from_ids(self):
+        roster = synthetic_roster(6, seed=5)
+        scorer = Scorer(roster, 2)
+        mapping = dict((i, 1 + s % 2) for s, i in enumerate(roster.ids))
+        self.assertEqual(scorer.allocation(mapping), [1, 2, 1, 2, 1, 2])
+        del mapping[roster.ids[3]]
+        with self.assertRaisesRegex(ValueError, roster.ids[3]):
+            scorer.allocation(mapping)
+
+    def test_invalid_allocations(self):
+        scorer = Scorer(synthetic_roster(6, seed=5), 3)
+        for groups, message in (([1, 2, 3, 1, 2], '5 groups given'),
+                                ([1, 2, 3, 1, 2, None], 'groups 1 to 3'),
+                                ([1, 2, 3, 1, 2, 0], 'groups 1 to 3'),
+                                ([1, 2, 3, 1, 2, 4], 'groups 1 to 3'),
+                                ([1, 1, 3, 1, 3, 3], 'Group 2 has no')):
+            with self.assertRaisesRegex(ValueError, message):
+                scorer.score(groups)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# ============================================================================
+# Group Allocator - tests of the running sums of the local search
+# ============================================================================
+import random
+import unittest
+
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import Targets
+from group_allocator.roster import Roster
+from group_allocator.score import Scorer
+from group_allocator.search import EXTREMES, LocalSearch
+from group_allocator.synthetic import synthetic_roster
+
+WEIGHTS = {'gpamean': 3.0, 'gpavar': 0.7, 'eth': 0.2, 'campus': 1.5}
+
+
+def campus_roster(number_students, seed):
+    """A synthetic roster with a campus to balance as well."""
+    roster = synthetic_roster(number_students, seed=seed)
+    rng = random.Random(seed)
+    campus = [rng.choice(('City', 'City', 'Grafton', 'Tamaki'))
+              for s in roster.students]
+    return Roster(roster.ids, roster.gpa, roster.gender,
+                  roster.specialisation, roster.ethnicity,
+                  extra=[('campus', campus)])
+
+
+def random_allocation(targets, rng):
+    """Groups of the sizes of ``targets`` with students at random."""
+    groups = [g for g in targets.groups for _ in range(targets.size(g))]
+    rng.shuffle(groups)
+    return groups
+
+
+class TestLocalSearch(unittest.TestCase):
+
+    def assertClose(self, value, expected):
+        self.assertAlmostEqual(value, expected,
+                               delta=1e-7 * max(1.0, abs(expected)))
+
+    def assertTracked(self, search, scorer):
+        """The running sums of ``search`` agree with scoring afresh."""
+        score = scorer.score(search.groups)
+        self.assertClose(search.objective(), score.objective)
+        for spread, expected in zip(search.spreads(), score.spreads()):
+            self.assertClose(spread, expected)
+        self.assertEqual(search.relaxation(), score.relaxation)
+        violations = set((g, c) for g in search.targets.groups
+                         for c, count in enumerate(search.counts[g])
+                         if search._slack(c, count) > 0)
+        self.assertEqual(set(search.violations), violations)
+        for (g, c), i in search.violation_index.items():
+            self.assertEqual(search.violations[i], (g, c))
+
+    def check_swaps(self, number_students, number_groups, seed, swaps=400):
+        # Swaps at random, good or bad, each checked against its delta
+        # and a fresh score
+        roster = campus_roster(number_students, seed)
+        targets = Targets(roster, number_groups)
+        scorer = Scorer(roster, number_groups, WEIGHTS)
+        rng = random.Random(seed)
+        search = LocalSearch(roster, targets,
+                             random_allocation(targets, rng), WEIGHTS)
+        self.assertTracked(search, scorer)
+        for _ in range(swaps):
+            s1, s2 = rng.sample(range(number_students), 2)
+            if search.groups[s1] == search.groups[s2]:
+                continue
+            expected = search.objective() + search.swap_delta(s1, s2)
+            search.swap(s1, s2)
+            self.assertClose(search.objective(), expected)
+            self.assertTracked(search, scorer)
+
+    def test_swaps_few_groups(self):
+        # Every group is among the extremes
+        self.check_swaps(20, EXTREMES - 1, seed=1)
+
+    def test_swaps_many_groups(self):
+        # Groups leave and join the extremes, with groups of two sizes
+        self.check_swaps(123, 25, seed=2)
+
+    def test_swaps_pairs(self):
+        self.check_swaps(40, 20, seed=3)
+
+    def test_candidate_swaps(self):
+        # The swaps the search itself proposes, mostly repairs
+        roster = campus_roster(90, 4)
+        targets = Targets(roster, 15)
+        scorer = Scorer(roster, 15, WEIGHTS)
+        rng = random.Random(4)
+        search = LocalSearch(roster, targets,
+                             random_allocation(targets, rng), WEIGHTS,
+                             seed=4)
+        for _ in range(300):
+            s1, s2 = search._candidate()
+            expected = search.objective() + search.swap_delta(s1, s2)
+            search.swap(s1, s2)
+            self.assertClose(search.objective(), expected)
+        self.assertTracked(search, scorer)
+
+    def test_run_never_worse_than_start(self):
+        for seed in range(4):
+            roster = campus_roster(60, seed)
+            targets = Targets(roster, 12)
+            scorer = Scorer(roster, 12, WEIGHTS)
+            for start in (snake_draft(roster, targets),
+                          random_allocation(targets, random.Random(seed))):
+                search = LocalSearch(roster, targets, start, WEIGHTS,
+                                     seed=seed)
+                groups = search.run(None, iterations=3000)
+                self.assertEqual(search.stop_reason, 'iterations')
+                self.assertEqual(sorted(groups), sorted(start))
+                best = scorer.score(groups).objective
+                self.assertClose(best, search.best_objective)
+                self.assertLessEqual(
+                    best, scorer.score(start).objective + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# ============================================================================
+# Group Allocator - tests that StreamModel writes the program of Model
+# ============================================================================
+import os
+import shutil
+import tempfile
+import unittest
+
+import pulp
+
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import Model
+from group_allocator.roster import Roster
+from group_allocator.stream import StreamModel
+from group_allocator.synthetic import synthetic_roster
+
+# Names of the group rows of Model, in the order of stream.GROUP_ROWS
+GROUP_ROW_NAMES = ('size_g%d', 'calculate_min_gpa_g%d',
+                   'calculate_max_gpa_g%d', 'calculate_gpa_variance_min_g%d',
+                   'calculate_gpa_variance_max_g%d')
+
+WEIGHTS = {'gpamean': 2.0, 'spec': 0.5, 'campus': 3.0}
+
+
+def campus_roster(number_students, seed):
+    """A synthetic roster with a campus to balance as well."""
+    roster = synthetic_roster(number_students, seed=seed)
+    campus = [('City', 'Grafton', 'Tamaki')[s % 5 % 3]
+              for s in roster.students]
+    return Roster(roster.ids, roster.gpa, roster.gender,
+                  roster.specialisation, roster.ethnicity,
+                  extra=[('campus', campus)])
+
+
+def stream_names(stream):
+    """Model's names of the columns and rows of ``stream``."""
+    t = stream.targets
+    number_groups = t.number_groups
+    columns = dict(('X%d' % k, 'x_(%d,_%d)' % (k // number_groups,
+                                               k % number_groups + 1))
+                   for k in range(t.number_students * number_groups))
+    columns.update(('C%d' % k, column.name)
+                   for k, column in enumerate(stream.columns))
+    rows = dict(('R%d' % s, 'single_group_%d' % s)
+                for s in range(t.number_students))
+    for g in t.groups:
+        rows.update(zip(stream.group_rows[g],
+                        [name % g for name in GROUP_ROW_NAMES]))
+    for balance, short, over in zip(t.balances, stream.artificial_min,
+                                    stream.artificial_max):
+        rows.update((column.row, balance.constraint('min', g))
+                    for g, column in short.items())
+        rows.update((column.row, balance.constraint('max', g))
+                    for g, column in over.items())
+    # As PuLP names the rows of Model
+    rows = dict((code, name.translate(pulp.LpElement.trans))
+                for code, name in rows.items())
+    return columns, rows
+
+
+def column_order(path):
+    """Columns of the MPS file at ``path`` in the order they are written."""
+    order = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith('COLUMNS'):
+                break
+        for line in f:
+            if not line.startswith(' '):
+                break
+            name, field = line.split()[:2]
+            if field != "'MARKER'" and (not order or order[-1] != name):
+                order.append(name)
+    return order
+
+
+def read_program(path, columns=None, rows=None):
+    """Objective, rows and bounds of the MPS file at ``path``, under
+    Model's names."""
+    def column(name):
+        return columns[name] if columns else name
+
+    def row(name):
+        return rows[name] if rows else name
+
+    _, problem = pulp.LpProblem.fromMPS(path)
+    objective = dict((column(v.name), c)
+                     for v, c in problem.objective.items() if c)
+    constraints = dict(
+        (row(name), (dict((column(v.name), round(c, 9))
+                          for v, c in constraint.items() if c),
+                     constraint.sense, round(-constraint.constant, 9)))
+        for name, constraint in problem.constraints.items())
+    bounds = dict((column(v.name), (v.lowBound or 0, v.upBound, v.cat))
+                  for v in problem.variables())
+    return objective, constraints, bounds
+
+
+class TestStreamModel(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSameProgram(self, roster, number_groups, symmetry_breaking):
+        model_path = os.path.join(self.directory, 'model.mps')
+        stream_path = os.path.join(self.directory, 'stream.mps')
+        model = Model(roster, number_groups, WEIGHTS,
+                      symmetry_breaking=symmetry_breaking)
+        model.problem.writeMPS(model_path)
+        stream = StreamModel(roster, number_groups, WEIGHTS,
+                             symmetry_breaking=symmetry_breaking)
+        size = stream.write(stream_path)
+        self.assertEqual(size, model.size())
+        columns, rows = stream_names(stream)
+        # The same columns in the same order, as CBC's search depends on
+        # it, and the same objective, rows and bounds
+        self.assertEqual([columns[name] for name in
+                          column_order(stream_path)],
+                         column_order(model_path))
+        self.assertEqual(read_program(stream_path, columns, rows),
+                         read_program(model_path))
+
+    def test_small_cohort(self):
+        roster = synthetic_roster(24, seed=1)
+        for symmetry_breaking in (False, True):
+            self.assertSameProgram(roster, 4, symmetry_breaking)
+
+    def test_cohort(self):
+        roster = synthetic_roster(150, seed=2)
+        for symmetry_breaking in (False, True):
+            self.assertSameProgram(roster, 30, symmetry_breaking)
+
+    def test_extra_attribute(self):
+        roster = campus_roster(150, seed=3)
+        for symmetry_breaking in (False, True):
+            self.assertSameProgram(roster, 30, symmetry_breaking)
+
+    def test_uneven_groups(self):
+        self.assertSameProgram(campus_roster(62, seed=4), 8, True)
+
+    def test_solve_from_start(self):
+        roster = synthetic_roster(24, seed=5)
+        model = StreamModel(roster, 4, WEIGHTS)
+        model.set_start(snake_draft(roster, model.targets))
+        self.assertEqual(model.solve(10, seed=1), 'Optimal')
+        groups = model.assignment()
+        self.assertEqual(model.unclear, [])
+        self.assertEqual(sorted(groups.count(g) for g in range(1, 5)),
+                         [6, 6, 6, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# ============================================================================
+# Group Allocator - tests of the order a sweep solves its points in
+# ============================================================================
+import unittest
+
+from group_allocator import sweep as sweep_module
+from group_allocator.heuristics import snake_draft
+from group_allocator.model import DEFAULT_WEIGHTS, Targets
+from group_allocator.sweep import distance, sweep, weight_grid
+from group_allocator.synthetic import synthetic_roster
+
+
+class TestSweepOrder(unittest.TestCase):
+
+    def setUp(self):
+        self.roster = synthetic_roster(20, seed=1)
+        self.draft = snake_draft(self.roster, Targets(self.roster, 4))
+        self.order = []
+        self.saved = (sweep_module._solve_point, sweep_module._start_worker)
+        sweep_module._solve_point = self.solve
+        sweep_module._start_worker = lambda *arguments: None
+
+    def tearDown(self):
+        sweep_module._solve_point, sweep_module._start_worker = self.saved
+
+    def solve(self, arguments):
+        # Every seventh point fails, so it is never a start
+        point, weights, start = arguments
+        self.order.append(point)
+        if point % 7 == 3:
+            raise RuntimeError('no solution')
+        return point, 'Optimal', None, self.draft, 0.0
+
+    def test_nearest_solved_start(self):
+        values = {'gpamean': [0.5, 1, 2, 4], 'spec': [0.1, 1, 10],
+                  'eth': [1, 3, 9]}
+        points = weight_grid(values, DEFAULT_WEIGHTS)
+        results = sweep(self.roster, 4, points, mode='search', processes=1)
+        self.assertEqual(sorted(self.order), list(range(len(points))))
+        solved = []
+        for point in self.order:
+            result = results[point]
+            if not solved:
+                self.assertIsNone(result.neighbour)
+            else:
+                # The waiting point nearest any solved one goes next, from
+                # that solved point
+                self.assertEqual(result.neighbour, min(
+                    solved, key=lambda q: (distance(points[point],
+                                                    points[q]), q)))
+                waiting = [p for p in range(len(points))
+                           if p not in self.order[:self.order.index(point)]]
+                self.assertEqual(point, min(waiting, key=lambda p: (min(
+                    distance(points[p], points[q]) for q in solved), p)))
+            if result.status == 'Failed':
+                self.assertEqual(result.stop_reason,
+                                 'RuntimeError: no solution')
+            else:
+                solved.append(point)
+
+
+if __name__ == '__main__':
+    unittest.main()